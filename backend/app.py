@@ -16,6 +16,7 @@ from jarvis.equation_solver import EquationSolver
 from jarvis.wiki_researcher import WikipediaSearch
 from jarvis.github_learning import GitHubLearning
 from jarvis.auto_repair import CodeAnalyzer
+from riley.learning.analysis_jobs import AnalysisJobQueue, JobQueueFull
 
 # Load environment variables
 load_dotenv()
@@ -39,8 +40,15 @@ invention_engine = InventionEngine()
 equation_solver = EquationSolver()
 wiki_researcher = WikipediaSearch()
 github_learning = GitHubLearning()
+github_jobs = AnalysisJobQueue(github_learning)
 code_analyzer = CodeAnalyzer()
 
+# Seconds between keep-alive comments on idle event streams
+SSE_KEEPALIVE = 15
+
+# Titles, and stored searches to draw titles from, per refresh request
+MAX_REFRESH_TITLES = 5000
+
 # Get allowed tools from environment
 allowed_tools = os.getenv('ALLOWED_TOOLS', '["invention", "web_search", "wiki"]')
 try:
@@ -177,7 +185,9 @@ def solve_equation():
     {
         "user_id": "string",  // Unique identifier for the user
         "equation": "string", // The equation or problem to solve
-        "format": "string"    // Optional: Output format (default: "text", options: "text", "latex", "steps")
+        "format": "string",   // Optional: Output format (default: "text", options: "text", "latex", "steps", "numeric")
+        "grid": {},           // Optional: For "numeric", variable name to {"start", "stop", "num"}
+        "values": {}          // Optional: For "numeric", variable name to an array of values
     }
     """
     try:
@@ -185,19 +195,27 @@ def solve_equation():
         user_id = data.get('user_id', 'anonymous')
         equation = data.get('equation', '')
         output_format = data.get('format', 'text')
+        evaluation = {
+            "grid": data.get('grid'),
+            "values": data.get('values')
+        }
         
         # Log the request
         logger.info(f"Equation request from user {user_id}: {equation}")
         
         # Solve the equation
-        solution = equation_solver.solve(equation, output_format)
+        solution = equation_solver.solve(equation, output_format, evaluation)
         
-        # Store in memory
+        # Store in memory; numeric results can be very large, so only their
+        # expression, variables and shape are kept
+        stored = solution
+        if output_format == 'numeric' and 'columns' in solution:
+            stored = {key: value for key, value in solution.items() if key != 'columns'}
         memory_engine.store_memory(
             user_id=user_id,
             memory_type="equation",
             key=equation,
-            value=solution
+            value=stored
         )
         
         return jsonify(solution)
@@ -208,6 +226,190 @@ def solve_equation():
             "details": str(e)
         }), 500
 
+# Vectorized expression evaluation endpoint
+@app.route('/api/equation/evaluate', methods=['POST'])
+def evaluate_expression():
+    """
+    Evaluate an expression over a grid or explicit arrays of inputs
+    
+    Request body:
+    {
+        "user_id": "string",    // Unique identifier for the user
+        "expression": "string", // The expression, or an equation like "y = f(x)"
+        "grid": {},             // Optional: Variable name to {"start", "stop", "num"}
+        "values": {},           // Optional: Variable name to an array of values
+        "format": "string"      // Optional: "columnar" (default) or "binary"
+    }
+    
+    The binary format returns little-endian float64 columns packed back to
+    back, described by the X-Riley-Columns and X-Riley-Shape headers.
+    """
+    try:
+        data = request.json
+        user_id = data.get('user_id', 'anonymous')
+        expression = data.get('expression', '')
+        output_format = data.get('format', 'columnar')
+        
+        # Log the request
+        logger.info(f"Evaluation request from user {user_id}: {expression}")
+        
+        # Evaluate the expression (results are not stored in memory, they can be very large)
+        evaluation = equation_solver.evaluate(
+            expression,
+            grid=data.get('grid'),
+            values=data.get('values'),
+            output_format=output_format
+        )
+        
+        if 'error' in evaluation:
+            return jsonify(evaluation), 400
+        
+        if output_format == 'binary':
+            return Response(
+                evaluation['content'],
+                mimetype='application/octet-stream',
+                headers={
+                    "X-Riley-Columns": ",".join(evaluation['columns']),
+                    "X-Riley-Shape": ",".join(str(dim) for dim in evaluation['shape']),
+                    "X-Riley-Dtype": evaluation['dtype']
+                }
+            )
+        
+        return jsonify(evaluation)
+    except Exception as e:
+        logger.error(f"Error in evaluate endpoint: {str(e)}")
+        return jsonify({
+            "error": "Failed to evaluate expression",
+            "details": str(e)
+        }), 500
+
+# Linear algebra endpoint
+@app.route('/api/equation/matrix', methods=['POST'])
+def matrix_operation():
+    """
+    Run a linear algebra operation on a matrix
+    
+    Request body:
+    {
+        "user_id": "string",   // Unique identifier for the user
+        "operation": "string", // solve, inverse, det, eig, lstsq, lu, qr, svd, cholesky or rank
+        "matrix": [[]],        // The matrix, as nested arrays or text like "1 2; 3 4"
+        "rhs": []              // Optional: Right-hand side for solve and lstsq
+    }
+    """
+    try:
+        data = request.json
+        user_id = data.get('user_id', 'anonymous')
+        operation = data.get('operation', '')
+        matrix = data.get('matrix')
+        
+        if matrix is None:
+            return jsonify({
+                "error": "No matrix provided"
+            }), 400
+        
+        # Log the request
+        logger.info(f"Matrix request from user {user_id}: {operation}")
+        
+        # Run the operation (results are not stored in memory, they can be very large)
+        result = equation_solver.linear_algebra(operation, matrix, data.get('rhs'))
+        
+        if 'error' in result:
+            return jsonify(result), 400
+        
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Error in matrix endpoint: {str(e)}")
+        return jsonify({
+            "error": "Failed to run matrix operation",
+            "details": str(e)
+        }), 500
+
+# Equation solver metrics endpoint
+@app.route('/api/equation/metrics', methods=['GET'])
+def equation_metrics():
+    """
+    Get equation solver stage metrics and routing decisions
+    """
+    try:
+        return jsonify(equation_solver.get_metrics())
+    except Exception as e:
+        logger.error(f"Error in equation metrics endpoint: {str(e)}")
+        return jsonify({
+            "error": "Failed to get equation metrics",
+            "details": str(e)
+        }), 500
+
+# Batch equation solving endpoint
+@app.route('/api/equation/batch', methods=['POST'])
+def solve_equation_batch():
+    """
+    Solve a list of equations, streaming results back as they complete
+    
+    Request body:
+    {
+        "user_id": "string",     // Unique identifier for the user
+        "equations": ["string"], // The equations or problems to solve
+        "format": "string"       // Optional: Output format (default: "text", options: "text", "latex", "steps")
+    }
+    
+    Response is NDJSON, one {"index", "equation", "solution"} object per line
+    in completion order, followed by {"done": true, "count": number}.
+    """
+    try:
+        data = request.json
+        user_id = data.get('user_id', 'anonymous')
+        equations = data.get('equations', [])
+        output_format = data.get('format', 'text')
+        
+        if not isinstance(equations, list) or not equations:
+            return jsonify({
+                "error": "No equations provided",
+                "details": "Send a non-empty list of equations"
+            }), 400
+        
+        if len(equations) > equation_solver.batch_limit:
+            return jsonify({
+                "error": "Too many equations",
+                "details": f"A batch may contain at most {equation_solver.batch_limit} equations"
+            }), 400
+        
+        equations = [str(equation) for equation in equations]
+        
+        # Log the request
+        logger.info(f"Batch equation request from user {user_id}: {len(equations)} equations")
+        
+        def generate():
+            count = 0
+            for index, solution in equation_solver.solve_batch(equations, output_format):
+                yield json.dumps({
+                    "index": index,
+                    "equation": equations[index],
+                    "solution": solution
+                }) + "\n"
+                count += 1
+                
+                # Store in memory, without cutting the stream short on failure
+                try:
+                    memory_engine.store_memory(
+                        user_id=user_id,
+                        memory_type="equation",
+                        key=equations[index],
+                        value=solution
+                    )
+                except Exception as e:
+                    logger.warning(f"Failed to store batch equation result: {str(e)}")
+            
+            yield json.dumps({"done": True, "count": count}) + "\n"
+        
+        return Response(generate(), mimetype='application/x-ndjson')
+    except Exception as e:
+        logger.error(f"Error in batch equation endpoint: {str(e)}")
+        return jsonify({
+            "error": "Failed to solve equations",
+            "details": str(e)
+        }), 500
+
 # Wikipedia search endpoint
 @app.route('/api/search', methods=['POST'])
 def search():
@@ -216,8 +418,12 @@ def search():
     
     Request body:
     {
-        "user_id": "string", // Unique identifier for the user
-        "query": "string"    // The search query
+        "user_id": "string",          // Unique identifier for the user
+        "query": "string",            // The search query
+        "summarizer": "string",       // Optional: "llm", "extractive" or "auto" (default: WIKIPEDIA_SUMMARIZER)
+        "latency_budget_ms": "number", // Optional: Time budget for auto mode (default: WIKIPEDIA_LATENCY_BUDGET_MS)
+        "mode": "string",             // Optional: "summary" or "research" (default: "summary")
+        "top_k": "number"             // Optional: Articles used in research mode (default: WIKIPEDIA_RESEARCH_TOP_K)
     }
     """
     try:
@@ -231,12 +437,35 @@ def search():
         data = request.json
         user_id = data.get('user_id', 'anonymous')
         query = data.get('query', '')
+        summarizer = data.get('summarizer')
+        latency_budget_ms = data.get('latency_budget_ms')
+        mode = data.get('mode', 'summary')
+        
+        if summarizer is not None and summarizer not in ('llm', 'extractive', 'auto'):
+            return jsonify({
+                "error": "Invalid summarizer",
+                "details": "summarizer must be one of: llm, extractive, auto"
+            }), 400
+        
+        if mode not in ('summary', 'research'):
+            return jsonify({
+                "error": "Invalid mode",
+                "details": "mode must be one of: summary, research"
+            }), 400
         
         # Log the request
         logger.info(f"Search request from user {user_id}: {query}")
         
         # Search Wikipedia
-        results = wiki_researcher.search(query)
+        if mode == 'research':
+            results = wiki_researcher.research(
+                query,
+                top_k=data.get('top_k'),
+                summarizer=summarizer,
+                latency_budget_ms=latency_budget_ms
+            )
+        else:
+            results = wiki_researcher.search(query, summarizer=summarizer, latency_budget_ms=latency_budget_ms)
         
         # Store in memory
         memory_engine.store_memory(
@@ -254,6 +483,90 @@ def search():
             "details": str(e)
         }), 500
 
+# Wikipedia search metrics endpoint
+@app.route('/api/search/metrics', methods=['GET'])
+def search_metrics():
+    """
+    Get Wikipedia HTTP, connection pool and cache metrics
+    """
+    try:
+        return jsonify(wiki_researcher.get_metrics())
+    except Exception as e:
+        logger.error(f"Error in search metrics endpoint: {str(e)}")
+        return jsonify({
+            "error": "Failed to get search metrics",
+            "details": str(e)
+        }), 500
+
+# Wikipedia refresh endpoint
+@app.route('/api/search/refresh', methods=['POST'])
+def search_refresh():
+    """
+    Queue cached Wikipedia articles to be re-fetched in the background
+    
+    Request body:
+    {
+        "titles": ["string"],  // Optional, defaults to recently searched articles
+        "limit": 500           // Optional, searches to draw titles from
+    }
+    
+    Returns 202 once the titles are queued.
+    """
+    try:
+        # Check if web search tool is allowed
+        if "web_search" not in ALLOWED_TOOLS and "wiki" not in ALLOWED_TOOLS:
+            return jsonify({
+                "error": "Web search tool is not allowed",
+                "allowed_tools": ALLOWED_TOOLS
+            }), 403
+        
+        data = request.json or {}
+        titles = data.get('titles')
+        limit = data.get('limit', 500)
+        
+        if not isinstance(limit, int) or isinstance(limit, bool) or not 1 <= limit <= MAX_REFRESH_TITLES:
+            return jsonify({
+                "error": "Invalid limit",
+                "details": f"limit must be an integer from 1 to {MAX_REFRESH_TITLES}"
+            }), 400
+        
+        if titles is None:
+            # Articles behind recent summary and research searches
+            titles = []
+            for search in memory_engine.retrieve_memory('search', limit=limit):
+                results = search['value'] if isinstance(search['value'], dict) else {}
+                titles.append(results.get('title'))
+                titles.extend(source.get('title') for source in results.get('sources', []))
+            titles = titles[:MAX_REFRESH_TITLES]
+        elif not isinstance(titles, list) or not all(isinstance(title, str) for title in titles):
+            return jsonify({
+                "error": "Invalid titles",
+                "details": "titles must be a list of strings"
+            }), 400
+        elif len(titles) > MAX_REFRESH_TITLES:
+            return jsonify({
+                "error": "Too many titles",
+                "details": f"At most {MAX_REFRESH_TITLES} titles can be refreshed per request"
+            }), 400
+        
+        logger.info(f"Queueing {len(titles)} Wikipedia articles for refresh")
+        
+        result = wiki_researcher.queue_refresh(titles)
+        if 'error' in result:
+            return jsonify(result), 400
+        if result['dropped'] and not result['queued'] and not result['already_queued']:
+            return jsonify({
+                "error": "Too many articles waiting to be refreshed",
+                "details": f"{result['dropped']} titles were not queued; try again once the queue drains"
+            }), 503
+        return jsonify(result), 202
+    except Exception as e:
+        logger.error(f"Error in search refresh endpoint: {str(e)}")
+        return jsonify({
+            "error": "Failed to refresh Wikipedia articles",
+            "details": str(e)
+        }), 500
+
 # GitHub learning endpoint
 @app.route('/api/github', methods=['POST'])
 def github():
@@ -263,7 +576,9 @@ def github():
     Request body:
     {
         "user_id": "string",  // Unique identifier for the user
-        "repo_url": "string"  // The GitHub repository URL
+        "repo_url": "string",  // The GitHub repository URL
+        "ref": "string",       // Optional branch, tag or commit SHA
+        "force": false         // Optional: analyze again even if the commit was analyzed before
     }
     """
     try:
@@ -281,8 +596,21 @@ def github():
         # Log the request
         logger.info(f"GitHub analysis request from user {user_id}: {repo_url}")
         
-        # Analyze GitHub repository
-        analysis = github_learning.analyze_repo(repo_url)
+        # Analyze GitHub repository on the job pool, joining any identical
+        # analysis already running
+        try:
+            job = github_jobs.submit(repo_url, ref=data.get('ref'), force=bool(data.get('force', False)))
+        except ValueError as e:
+            return jsonify({
+                "error": "Invalid repository URL",
+                "details": str(e)
+            }), 400
+        except JobQueueFull as e:
+            return jsonify({
+                "error": "Too many repository analyses",
+                "details": str(e)
+            }), 503
+        analysis = job.wait()
         
         # Store in memory
         memory_engine.store_memory(
@@ -300,6 +628,222 @@ def github():
             "details": str(e)
         }), 500
 
+@app.route('/api/github/jobs', methods=['POST'])
+def github_job_submit():
+    """
+    Start a GitHub repository analysis in the background
+    
+    Request body:
+    {
+        "user_id": "string",   // Unique identifier for the user
+        "repo_url": "string",  // The GitHub repository URL
+        "ref": "string",       // Optional branch, tag or commit SHA
+        "force": false         // Optional: analyze again even if the commit was analyzed before
+    }
+    
+    Returns 202 with the job id straight away. Follow the job with
+    GET /api/github/jobs/<job_id> or its event stream.
+    """
+    try:
+        # Check if GitHub tool is allowed
+        if "github" not in ALLOWED_TOOLS:
+            return jsonify({
+                "error": "GitHub tool is not allowed",
+                "allowed_tools": ALLOWED_TOOLS
+            }), 403
+        
+        data = request.json or {}
+        user_id = data.get('user_id', 'anonymous')
+        repo_url = data.get('repo_url', '')
+        
+        logger.info(f"GitHub analysis job from user {user_id}: {repo_url}")
+        
+        def store(analysis):
+            memory_engine.store_memory(
+                user_id=user_id,
+                memory_type="github",
+                key=repo_url,
+                value=analysis
+            )
+        
+        try:
+            job = github_jobs.submit(repo_url, ref=data.get('ref'), force=bool(data.get('force', False)), on_complete=store)
+        except ValueError as e:
+            return jsonify({
+                "error": "Invalid repository URL",
+                "details": str(e)
+            }), 400
+        except JobQueueFull as e:
+            return jsonify({
+                "error": "Too many repository analyses",
+                "details": str(e)
+            }), 503
+        
+        status = job.to_dict(include_result=False)
+        return jsonify({
+            "job_id": job.id,
+            "status": status['status'],
+            "deduplicated": status['deduplicated'] > 0,
+            "status_url": f"/api/github/jobs/{job.id}",
+            "events_url": f"/api/github/jobs/{job.id}/events"
+        }), 202
+    except Exception as e:
+        logger.error(f"Error in GitHub job endpoint: {str(e)}")
+        return jsonify({
+            "error": "Failed to start repository analysis",
+            "details": str(e)
+        }), 500
+
+@app.route('/api/github/jobs/<job_id>', methods=['GET'])
+def github_job_status(job_id):
+    """
+    Get an analysis job's status, stage timings and (once finished) result
+    
+    Query parameters:
+        result: "false" leaves the analysis out of finished jobs
+    """
+    try:
+        # Check if GitHub tool is allowed
+        if "github" not in ALLOWED_TOOLS:
+            return jsonify({
+                "error": "GitHub tool is not allowed",
+                "allowed_tools": ALLOWED_TOOLS
+            }), 403
+        
+        include_result = request.args.get('result', 'true').lower() != 'false'
+        job = github_jobs.get_status(job_id, include_result=include_result)
+        if job is None:
+            return jsonify({
+                "error": "Job not found",
+                "details": f"No analysis job with id {job_id}"
+            }), 404
+        return jsonify(job)
+    except Exception as e:
+        logger.error(f"Error in GitHub job status endpoint: {str(e)}")
+        return jsonify({
+            "error": "Failed to get analysis job",
+            "details": str(e)
+        }), 500
+
+@app.route('/api/github/jobs/<job_id>/events', methods=['GET'])
+def github_job_events(job_id):
+    """
+    Stream an analysis job's progress as server-sent events
+    
+    Sends each "status" and "stage" event (with the stage's duration once
+    it ends) as it happens, then a final "done" event with the whole job.
+    Events the job had before the stream was opened are sent first.
+    """
+    try:
+        # Check if GitHub tool is allowed
+        if "github" not in ALLOWED_TOOLS:
+            return jsonify({
+                "error": "GitHub tool is not allowed",
+                "allowed_tools": ALLOWED_TOOLS
+            }), 403
+        
+        job = github_jobs.get(job_id)
+        stored = None if job is not None else github_jobs.get_status(job_id)
+        if job is None and stored is None:
+            return jsonify({
+                "error": "Job not found",
+                "details": f"No analysis job with id {job_id}"
+            }), 404
+        
+        def event(name, payload):
+            return f"event: {name}\ndata: {json.dumps(payload)}\n\n"
+        
+        def generate():
+            if job is None:
+                # Finished long enough ago to be read back from the store
+                for item in stored['events']:
+                    yield event(item['type'], item)
+                yield event("done", stored)
+                return
+            
+            index = 0
+            while True:
+                events, finished = job.events_after(index, timeout=SSE_KEEPALIVE)
+                for item in events:
+                    yield event(item['type'], item)
+                index += len(events)
+                if finished:
+                    yield event("done", job.to_dict())
+                    return
+                if not events:
+                    yield ": keep-alive\n\n"
+        
+        return Response(generate(), mimetype='text/event-stream', headers={
+            "Cache-Control": "no-cache",
+            # Stops nginx from buffering the stream
+            "X-Accel-Buffering": "no"
+        })
+    except Exception as e:
+        logger.error(f"Error in GitHub job events endpoint: {str(e)}")
+        return jsonify({
+            "error": "Failed to stream analysis job",
+            "details": str(e)
+        }), 500
+
+@app.route('/api/github/tree', methods=['GET'])
+def github_tree():
+    """
+    Expand part of an analyzed repository's directory tree
+    
+    Query parameters:
+        repo_url: The GitHub repository URL
+        commit: Optional commit SHA or ref (default: the last analyzed commit)
+        path: Optional directory to expand (default: the root)
+        depth: Optional directory levels to expand
+    """
+    try:
+        # Check if GitHub tool is allowed
+        if "github" not in ALLOWED_TOOLS:
+            return jsonify({
+                "error": "GitHub tool is not allowed",
+                "allowed_tools": ALLOWED_TOOLS
+            }), 403
+        
+        repo_url = request.args.get('repo_url', '')
+        if not repo_url:
+            return jsonify({
+                "error": "Missing repository URL",
+                "details": "Pass the repository as repo_url"
+            }), 400
+        
+        depth = request.args.get('depth')
+        if depth is not None:
+            try:
+                depth = int(depth)
+            except ValueError:
+                depth = 0
+            if depth < 1:
+                return jsonify({
+                    "error": "Invalid depth",
+                    "details": "depth must be a positive integer"
+                }), 400
+        
+        path = request.args.get('path', '')
+        try:
+            tree = github_learning.get_tree(repo_url, commit=request.args.get('commit'), path=path, depth=depth)
+        except ValueError as e:
+            return jsonify({
+                "error": "Invalid repository URL",
+                "details": str(e)
+            }), 400
+        if tree is None:
+            return jsonify({
+                "error": "Tree not found",
+                "details": f"No commit or directory {path or '/'} in {repo_url}"
+            }), 404
+        return jsonify(tree)
+    except Exception as e:
+        logger.error(f"Error in GitHub tree endpoint: {str(e)}")
+        return jsonify({
+            "error": "Failed to get repository tree",
+            "details": str(e)
+        }), 500
+
 # Code repair endpoint
 @app.route('/api/repair', methods=['POST'])
 def repair():
@@ -0,0 +1,254 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import contextlib
+from types import SimpleNamespace
+from datetime import datetime, timezone
+
+# Run from anywhere: make the backend importable and keep OpenAI() from
+# refusing to construct without a key (the stub below replaces the client)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark-stub')
+
+import numpy as np
+import sympy as sp
+from jarvis.equation_solver import EquationSolver
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'equation_corpus.jsonl')
+
+# Marks solutions produced by the stub so fallbacks can be counted
+STUB_METHOD = "llm_stub"
+
+# Relative difference allowed between a local answer and the expected value
+ANSWER_TOLERANCE = 1e-6
+
+class StubCompletions:
+    def __init__(self, latency):
+        """
+        Stand-in for client.chat.completions that sleeps instead of calling OpenAI
+        """
+        self.latency = latency
+
+    def create(self, model, messages, **kwargs):
+        time.sleep(self.latency)
+        problem = messages[-1]['content'].replace("Solve this: ", "", 1)
+        content = json.dumps({
+            "equation": problem,
+            "solution": "stub",
+            "method": STUB_METHOD
+        })
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+class StubLLM:
+    def __init__(self, latency):
+        """
+        Minimal OpenAI client replacement used by the benchmark
+        """
+        self.chat = SimpleNamespace(completions=StubCompletions(latency))
+
+def load_corpus(path, limit=None):
+    """
+    Load benchmark problems from a JSONL file
+
+    With a limit, problems are taken at an even stride so every category
+    stays represented.
+    """
+    with open(path) as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    if not limit or limit >= len(corpus):
+        return corpus
+    return corpus[::len(corpus) // limit][:limit]
+
+def run_once(corpus, workers, llm_latency, llm_concurrency):
+    """
+    Solve the whole corpus with one worker count
+
+    Returns:
+        dict: Timing, per-item outcome and stage metrics for the run
+    """
+    solver = EquationSolver()
+    solver.client = StubLLM(llm_latency)
+    solver.batch_workers = workers
+    solver.llm_concurrency = llm_concurrency
+
+    # Start the worker processes before timing
+    list(solver.solve_batch(["x + 1 = 2"] * workers))
+    solver.metrics.reset()
+
+    equations = [item['equation'] for item in corpus]
+    outcomes = [None] * len(corpus)
+
+    started = time.perf_counter()
+    for index, solution in solver.solve_batch(equations):
+        outcomes[index] = solution
+    elapsed = time.perf_counter() - started
+
+    solver._local_pool.shutdown()
+
+    return {
+        "workers": workers,
+        "seconds": elapsed,
+        "items_per_second": len(corpus) / elapsed if elapsed else None,
+        "outcomes": outcomes,
+        "stages": solver.metrics.snapshot(),
+        "routing": solver.get_metrics()['routing']
+    }
+
+def answer_values(solution):
+    """
+    Read the values of a local answer
+
+    Returns:
+        dict: Variable -> list of complex values, or None when the answer
+            isn't a list of numbers (e.g. a parametric solution)
+    """
+    try:
+        if 'values' in solution:
+            return {variable: [complex(sp.N(sp.sympify(value)))] for variable, value in solution['values'].items()}
+        if 'roots' in solution:
+            return {solution['variable']: [complex(root) for root in solution['roots']]}
+        values = sp.sympify(solution['solution'])
+        return {solution['variable']: [complex(sp.N(value)) for value in values]}
+    except (KeyError, TypeError, ValueError, sp.SympifyError):
+        return None
+
+def _close(a, b):
+    return abs(a - b) <= ANSWER_TOLERANCE * max(1.0, abs(b))
+
+def check_answer(expected, solution):
+    """
+    Check a local answer against a problem's expected outcome
+
+    Returns:
+        bool: False for an answer to malformed input, or values that don't
+            match the expected solutions; True otherwise
+    """
+    if expected.get('outcome') == 'reject':
+        return False
+    if 'solutions' not in expected:
+        return True
+
+    values = answer_values(solution)
+    if values is None or set(values) != set(expected['solutions']):
+        return False
+    for variable, pairs in expected['solutions'].items():
+        wanted = [complex(real, imaginary) for real, imaginary in pairs]
+        found = values[variable]
+        if not all(any(_close(value, target) for value in found) for target in wanted):
+            return False
+        if not all(any(_close(value, target) for target in wanted) for value in found):
+            return False
+    return True
+
+def summarize(corpus, outcomes):
+    """
+    Compute local-hit, wrong-answer and fallback rates overall and per category
+
+    A local answer only counts as a hit when it matches the problem's
+    expected outcome; answers to malformed input, and values that don't
+    solve the problem, are counted as wrong answers instead.
+    """
+    categories = {}
+    for item, solution in zip(corpus, outcomes):
+        stats = categories.setdefault(item['category'], {"count": 0, "local_hits": 0, "wrong_answers": 0, "llm_fallbacks": 0, "errors": 0})
+        stats['count'] += 1
+        if 'error' in solution:
+            stats['errors'] += 1
+        elif solution.get('method') == STUB_METHOD:
+            stats['llm_fallbacks'] += 1
+        elif check_answer(item.get('expected', {}), solution):
+            stats['local_hits'] += 1
+        else:
+            stats['wrong_answers'] += 1
+
+    for stats in categories.values():
+        stats['local_hit_rate'] = stats['local_hits'] / stats['count']
+        stats['wrong_answer_rate'] = stats['wrong_answers'] / stats['count']
+        stats['llm_fallback_rate'] = stats['llm_fallbacks'] / stats['count']
+
+    total = len(corpus)
+    local_hits = sum(stats['local_hits'] for stats in categories.values())
+    wrong_answers = sum(stats['wrong_answers'] for stats in categories.values())
+    llm_fallbacks = sum(stats['llm_fallbacks'] for stats in categories.values())
+
+    return {
+        "problems": total,
+        "local_hits": local_hits,
+        "wrong_answers": wrong_answers,
+        "llm_fallbacks": llm_fallbacks,
+        "errors": sum(stats['errors'] for stats in categories.values()),
+        "local_hit_rate": local_hits / total if total else 0.0,
+        "wrong_answer_rate": wrong_answers / total if total else 0.0,
+        "llm_fallback_rate": llm_fallbacks / total if total else 0.0
+    }, categories
+
+def run_benchmark(corpus_path=DEFAULT_CORPUS, worker_counts=(1, 2, 4), llm_latency=0.0, llm_concurrency=4, limit=None):
+    """
+    Run the corpus at each worker count and build the report
+    """
+    corpus = load_corpus(corpus_path, limit)
+    runs = [run_once(corpus, workers, llm_latency, llm_concurrency) for workers in worker_counts]
+    summary, categories = summarize(corpus, runs[0]['outcomes'])
+
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "sympy": sp.__version__,
+            "numpy": np.__version__
+        },
+        "corpus": {
+            "path": os.path.relpath(corpus_path),
+            "problems": len(corpus)
+        },
+        "llm_stub": {
+            "latency_seconds": llm_latency,
+            "concurrency": llm_concurrency
+        },
+        "summary": summary,
+        "categories": categories,
+        # Stage latencies from the single-worker run are free of contention
+        "stages": runs[0]['stages'],
+        "routing": runs[0]['routing'],
+        "throughput": [
+            {
+                "workers": run['workers'],
+                "seconds": run['seconds'],
+                "items_per_second": run['items_per_second'],
+                "stages": run['stages']
+            }
+            for run in runs
+        ]
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark EquationSolver against a stub LLM")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    parser.add_argument('--workers', default='1,2,4', help="Comma-separated worker counts to measure")
+    parser.add_argument('--llm-latency', type=float, default=0.0, help="Seconds the stub LLM sleeps per call")
+    parser.add_argument('--llm-concurrency', type=int, default=4)
+    parser.add_argument('--limit', type=int, help="Only run N problems, sampled evenly across the corpus")
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    # The solver prints its errors; keep them out of the JSON on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_benchmark(
+            corpus_path=args.corpus,
+            worker_counts=[int(workers) for workers in args.workers.split(',')],
+            llm_latency=args.llm_latency,
+            llm_concurrency=args.llm_concurrency,
+            limit=args.limit
+        )
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote report to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,250 @@
+import os
+import json
+import cmath
+import random
+import argparse
+from fractions import Fraction
+
+# Problems generated per category
+CATEGORY_SIZES = {
+    "linear": 600,
+    "quadratic": 600,
+    "systems": 400,
+    "trig": 500,
+    "calculus": 500,
+    "malformed": 400
+}
+
+VARIABLES = ['x', 'y', 't', 'z', 'a', 'n']
+
+def _coefficient(rng, low=-12, high=12):
+    """
+    Pick a non-zero integer coefficient
+    """
+    value = 0
+    while value == 0:
+        value = rng.randint(low, high)
+    return value
+
+def _term(coefficient, variable, power='', style='implicit'):
+    """
+    Write coefficient * variable**power the way users tend to type it
+    """
+    if style == 'explicit':
+        text = f"{coefficient}*{variable}"
+        return f"{text}**{power}" if power else text
+
+    prefix = '-' if coefficient == -1 else ('' if coefficient == 1 else str(coefficient))
+    return f"{prefix}{variable}^{power}" if power else f"{prefix}{variable}"
+
+def _signed(value):
+    """
+    Format a constant with its sign for appending to an expression
+    """
+    return f"+ {value}" if value >= 0 else f"- {abs(value)}"
+
+def _answer(solutions=None):
+    """
+    Expected outcome of a problem that has an answer
+
+    Args:
+        solutions (dict): Variable -> its values, for problems whose answer
+            is known exactly; the benchmark checks local answers against them
+    """
+    expected = {"outcome": "answer"}
+    if solutions:
+        expected["solutions"] = {variable: _pairs(values) for variable, values in solutions.items()}
+    return expected
+
+def _pairs(values):
+    """
+    Distinct values as sorted [real, imaginary] pairs
+    """
+    pairs = {(round(complex(value).real, 10) + 0.0, round(complex(value).imag, 10) + 0.0) for value in values}
+    return [list(pair) for pair in sorted(pairs)]
+
+# Malformed problems have no answer: returning one is a wrong answer
+REJECT = {"outcome": "reject"}
+
+def linear(rng):
+    variable = rng.choice(VARIABLES)
+    style = rng.choice(['implicit', 'explicit'])
+    a, b, c = _coefficient(rng), rng.randint(-50, 50), rng.randint(-50, 50)
+    form = rng.randrange(3)
+    if form == 0:
+        return f"{_term(a, variable, style=style)} {_signed(b)} = {c}", _answer({variable: [Fraction(c - b, a)]})
+    if form == 1:
+        d = _coefficient(rng)
+        while d == a:
+            d = _coefficient(rng)
+        equation = f"{_term(a, variable, style=style)} {_signed(b)} = {_term(d, variable, style=style)} {_signed(c)}"
+        return equation, _answer({variable: [Fraction(c - b, a - d)]})
+    return f"({variable} {_signed(b)})/{abs(a)} = {c}", _answer({variable: [c * abs(a) - b]})
+
+def quadratic(rng):
+    variable = rng.choice(VARIABLES)
+    style = rng.choice(['implicit', 'explicit'])
+    form = rng.randrange(3)
+    if form == 0:
+        # Factorable with integer roots
+        r1, r2 = rng.randint(-15, 15), rng.randint(-15, 15)
+        a = rng.choice([1, 1, 1, 2, 3])
+        b, c = -a * (r1 + r2), a * r1 * r2
+        linear_term = f" {'+' if b >= 0 else '-'} {_term(abs(b), variable, style=style)}" if b else ""
+        return f"{_term(a, variable, '2', style)}{linear_term} {_signed(c)} = 0", _answer({variable: [r1, r2]})
+    if form == 1:
+        a, b, c = _coefficient(rng, -6, 6), rng.randint(-20, 20), rng.randint(-30, 30)
+        linear_term = f" {'+' if b >= 0 else '-'} {_term(abs(b), variable, style=style)}" if b else ""
+        root = cmath.sqrt(b * b - 4 * a * c)
+        return f"{_term(a, variable, '2', style)}{linear_term} {_signed(c)} = 0", _answer({variable: [(-b + root) / (2 * a), (-b - root) / (2 * a)]})
+    k = rng.randint(1, 400)
+    return f"{_term(1, variable, '2', style)} = {k}", _answer({variable: [k ** 0.5, -k ** 0.5]})
+
+def _determinant(rows):
+    if len(rows) == 2:
+        return rows[0][0] * rows[1][1] - rows[0][1] * rows[1][0]
+    return sum(
+        (-1) ** column * rows[0][column] * _determinant([row[:column] + row[column + 1:] for row in rows[1:]])
+        for column in range(len(rows))
+    )
+
+def systems(rng):
+    size = rng.choice([2, 2, 3])
+    variables = ['x', 'y', 'z'][:size]
+    solution = [rng.randint(-9, 9) for _ in variables]
+    # Singular systems have no single answer to check against
+    rows = [[0] * size]
+    while _determinant(rows) == 0:
+        rows = [[_coefficient(rng, -6, 6) for _ in variables] for _ in range(size)]
+    equations = []
+    for coefficients in rows:
+        terms = " + ".join(f"{coefficient}*{variable}" for coefficient, variable in zip(coefficients, variables))
+        equations.append(f"{terms} = {sum(c * v for c, v in zip(coefficients, solution))}")
+    return "; ".join(equations).replace("+ -", "- "), _answer({variable: [value] for variable, value in zip(variables, solution)})
+
+def _decimal(rng, low=-9, high=9):
+    """
+    Pick a one-decimal constant such as -0.7
+    """
+    return str(rng.randint(low, high) / 10)
+
+def trig(rng):
+    function = rng.choice(['sin', 'cos', 'tan'])
+    variable = rng.choice(['x', 't'])
+    form = rng.randrange(4)
+    if form == 0:
+        value = rng.choice(['0', '1', '-1', 'sqrt(2)/2', 'sqrt(3)/2', _decimal(rng)])
+        return f"{function}({variable}) = {value}", _answer()
+    if form == 1:
+        k = rng.randint(2, 9)
+        return f"{function}({k}{variable} {_signed(rng.randint(-5, 5))}) = {_decimal(rng)}", _answer()
+    if form == 2:
+        return f"{_term(rng.randint(1, 5), f'{function}({variable})')} = {variable}/{rng.randint(2, 12)}", _answer()
+    sine = _term(rng.randint(1, 5), f"sin({variable})")
+    cosine = _term(rng.randint(1, 5), f"cos({rng.randint(1, 4)}{variable})")
+    return f"{sine} + {cosine} = {_decimal(rng, -5, 5)}", _answer()
+
+def calculus(rng):
+    variable = rng.choice(['x', 't'])
+    k = rng.randint(2, 9)
+    body = rng.choice([
+        f"{k}{variable}^{rng.randint(2, 9)}",
+        f"sin({k}{variable})",
+        f"cos({k}{variable})^2",
+        f"exp({rng.choice([-1, 1]) * k}{variable})",
+        f"ln({k}{variable})",
+        f"{variable}^{rng.randint(2, 6)} + {k}{variable} {_signed(rng.randint(-9, 9))}",
+        f"1/({k} + {variable}^2)",
+        f"{variable}^{rng.randint(1, 4)}*exp({variable})"
+    ])
+    form = rng.randrange(6)
+    if form == 0:
+        return f"d/d{variable} {body}", _answer()
+    if form == 1:
+        return f"derivative of {body}", _answer()
+    if form == 2:
+        return f"integrate {body} d{variable}", _answer()
+    if form == 3:
+        low = rng.randint(0, 4)
+        return f"integral of {body} from {low} to {low + rng.randint(1, 5)}", _answer()
+    if form == 4:
+        return f"limit of sin({k}{variable})/({rng.randint(1, 9)}{variable}) as {variable} -> 0", _answer()
+    return f"series of {body} at {variable} = 0", _answer()
+
+MALFORMED_WORDS = ['banana', 'love', 'happiness', 'tuesday', 'the universe', 'pizza', 'my homework', 'gravity', 'music', 'coffee']
+
+def malformed(rng):
+    variable, other = rng.sample(VARIABLES, 2)
+    a, b = rng.randint(1, 99), rng.randint(1, 99)
+    word = rng.choice(MALFORMED_WORDS)
+    return rng.choice([
+        f"{a}{variable} + = {b}",
+        f"(({variable} + {a}",
+        f"{variable} === {a}",
+        f"solve for {word} when {variable} is {a}",
+        f"{a} / / {b}",
+        f"{rng.choice(['sin', 'cos', 'sqrt', 'log'])}({a}{variable}",
+        f"= {a}{variable}",
+        f"{variable}^^{rng.randint(2, 9)} = {a}",
+        f"what is the meaning of {word}",
+        f"{a}{variable} + {b}{other} ="
+    ]), REJECT
+
+GENERATORS = {
+    "linear": linear,
+    "quadratic": quadratic,
+    "systems": systems,
+    "trig": trig,
+    "calculus": calculus,
+    "malformed": malformed
+}
+
+# Draws per wanted problem before a category is declared too narrow
+MAX_DRAWS_PER_PROBLEM = 50
+
+def generate_corpus(seed=2024):
+    """
+    Build the benchmark corpus deterministically from a seed
+    
+    Every problem is distinct, so the solver's caches don't inflate hit
+    rates or hide per-stage latency. Each records its expected outcome:
+    "reject" for malformed input, otherwise "answer", with the exact
+    solutions where the generator knows them.
+    
+    Raises:
+        ValueError: If a category's templates can't produce enough distinct problems
+    """
+    rng = random.Random(seed)
+    corpus = []
+    seen = set()
+    for category, size in CATEGORY_SIZES.items():
+        count = draws = 0
+        while count < size:
+            draws += 1
+            if draws > size * MAX_DRAWS_PER_PROBLEM:
+                raise ValueError(f"Only {count} distinct {category} problems after {draws - 1} draws")
+            equation, expected = GENERATORS[category](rng)
+            if equation in seen:
+                continue
+            seen.add(equation)
+            corpus.append({
+                "id": f"{category}-{count:04d}",
+                "category": category,
+                "equation": equation,
+                "expected": expected
+            })
+            count += 1
+    return corpus
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate the equation solver benchmark corpus")
+    parser.add_argument('--seed', type=int, default=2024)
+    parser.add_argument('--output', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'equation_corpus.jsonl'))
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.seed)
+    with open(args.output, 'w') as f:
+        for item in corpus:
+            f.write(json.dumps(item) + "\n")
+
+    print(f"Wrote {len(corpus)} problems to {args.output}")
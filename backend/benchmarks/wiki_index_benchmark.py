@@ -0,0 +1,125 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+from datetime import datetime, timezone
+
+# Run from anywhere: make the backend importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from riley.learning.wiki_index import WikiIndex, build_index, read_dump
+from riley.learning.text_ranking import tokenize
+
+DEFAULT_DUMP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'wiki_abstracts.xml')
+
+def generate_synthetic_dump(path, documents, fixture=DEFAULT_DUMP, seed=2024, vocabulary_size=50000):
+    """
+    Write a JSON lines dump of synthetic articles for scale testing
+
+    Words are drawn from the fixture vocabulary plus generated terms with a
+    Zipf-like distribution, so posting list lengths resemble real text.
+    """
+    rng = np.random.default_rng(seed)
+    words = sorted({token for title, _, text in read_dump(fixture) for token in tokenize(title + " " + text)})
+    words += [f"term{index}" for index in range(vocabulary_size - len(words))]
+    weights = 1.0 / np.arange(1, len(words) + 1) ** 1.07
+    weights /= weights.sum()
+
+    with open(path, 'w') as f:
+        for doc_id in range(documents):
+            length = int(rng.integers(40, 250))
+            text = " ".join(words[index] for index in rng.choice(len(words), size=length, p=weights))
+            f.write(json.dumps({"title": f"Synthetic article {doc_id}", "text": text.capitalize() + "."}) + "\n")
+
+    return words, weights
+
+def make_queries(index, count, seed=2024):
+    """
+    Build queries of two or three terms picked from the index lexicon
+    """
+    rng = random.Random(seed)
+    terms = sorted(index.lexicon)
+    return [" ".join(rng.sample(terms, rng.choice([2, 3]))) for _ in range(count)]
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+def run_benchmark(dump_path=DEFAULT_DUMP, synthetic=None, queries=2000, limit=5):
+    """
+    Build an index, then measure query throughput and latency
+
+    Returns:
+        dict: The benchmark report
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        if synthetic:
+            dump_path = os.path.join(workdir, 'synthetic.jsonl')
+            generate_synthetic_dump(dump_path, synthetic)
+
+        index_dir = os.path.join(workdir, 'index')
+        meta = build_index(dump_path, index_dir)
+        index = WikiIndex(index_dir)
+
+        query_texts = make_queries(index, queries)
+        # Warm the page cache before timing
+        for query in query_texts[:50]:
+            index.search(query, limit)
+
+        latencies = []
+        started = time.perf_counter()
+        for query in query_texts:
+            query_started = time.perf_counter()
+            index.search(query, limit)
+            latencies.append((time.perf_counter() - query_started) * 1000)
+        elapsed = time.perf_counter() - started
+
+        latencies = np.array(latencies)
+        return {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "numpy": np.__version__
+            },
+            "dump": "synthetic" if synthetic else os.path.relpath(dump_path),
+            "index": {
+                "documents": meta['documents'],
+                "terms": meta['terms'],
+                "postings": meta['postings'],
+                "bytes": directory_size(index_dir),
+                "build_seconds": meta['build_seconds']
+            },
+            "queries": {
+                "count": len(query_texts),
+                "limit": limit,
+                "queries_per_second": len(query_texts) / elapsed if elapsed else None,
+                "latency_ms": {
+                    "p50": float(np.percentile(latencies, 50)),
+                    "p90": float(np.percentile(latencies, 90)),
+                    "p99": float(np.percentile(latencies, 99))
+                }
+            }
+        }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark building and querying the offline Wikipedia index")
+    parser.add_argument('--dump', default=DEFAULT_DUMP, help="Abstracts XML or JSON lines dump to index")
+    parser.add_argument('--synthetic', type=int, help="Index N generated articles instead of a dump")
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--limit', type=int, default=5)
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.dump, args.synthetic, args.queries, args.limit)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote report to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
@@ -1,9 +1,1112 @@
 import os
 import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from functools import lru_cache
 from openai import OpenAI
+import numpy as np
 import sympy as sp
+from sympy.parsing.sympy_parser import parse_expr, standard_transformations, implicit_multiplication_application, convert_xor
 import re
 
+# Parser transformations accepting everyday notation such as "3x^2 + 2x"
+PARSE_TRANSFORMATIONS = standard_transformations + (implicit_multiplication_application, convert_xor)
+
+# Number of compiled numeric functions kept for vectorized evaluation
+NUMERIC_CACHE_SIZE = int(os.getenv('EQUATION_NUMERIC_CACHE_SIZE', 256))
+
+# Local solving stages, in their default order
+LOCAL_STAGES = ('calculus', 'linear_system', 'symbolic', 'numeric')
+
+# Seconds each local solving stage may run before it is abandoned
+LOCAL_TIME_LIMIT = float(os.getenv('EQUATION_TIME_LIMIT', 2.0))
+
+# Abandoned stages still running in a process before further stages are
+# refused; SymPy can't be interrupted, so each one holds a thread and a core
+MAX_OVERRUN_STAGES = int(os.getenv('EQUATION_MAX_OVERRUN_STAGES', 4))
+
+# Numeric root finding: search interval, sample count and root tolerance
+NUMERIC_INTERVAL = tuple(float(bound) for bound in os.getenv('EQUATION_NUMERIC_INTERVAL', '-100,100').split(','))
+NUMERIC_SAMPLES = int(os.getenv('EQUATION_NUMERIC_SAMPLES', 20001))
+NUMERIC_TOLERANCE = float(os.getenv('EQUATION_NUMERIC_TOLERANCE', 1e-10))
+
+# Number of derivative, integral, limit and series results kept in memory
+CALCULUS_CACHE_SIZE = int(os.getenv('EQUATION_CALCULUS_CACHE_SIZE', 1024))
+
+# Natural-language forms of calculus requests, e.g. "d/dx x^3",
+# "integrate sin(x) dx", "limit of sin(x)/x as x -> 0"
+DERIVATIVE_PATTERNS = [
+    re.compile(r'^d(?:\^(?P<order>\d+))?/d(?P<variable>[a-z])(?:\^\d+)?\s*(?P<body>.+)$', re.IGNORECASE),
+    re.compile(r'^(?:the\s+)?(?:(?P<order>\d+)(?:st|nd|rd|th)\s+|(?P<word>second|third)\s+)?derivative\s+of\s+(?P<body>.+?)(?:\s+(?:with\s+respect\s+to|wrt)\s+(?P<variable>[a-z]))?$', re.IGNORECASE),
+    re.compile(r'^differentiate\s+(?P<body>.+?)(?:\s+(?:with\s+respect\s+to|wrt)\s+(?P<variable>[a-z]))?$', re.IGNORECASE)
+]
+INTEGRAL_PATTERN = re.compile(r'^(?:integrate|(?:the\s+)?(?:definite\s+|indefinite\s+)?integral\s+of|∫)\s*(?P<body>.+)$', re.IGNORECASE)
+INTEGRAL_BOUNDS_PATTERN = re.compile(r'\s+from\s+(?P<lower>\S+)\s+to\s+(?P<upper>\S+)$', re.IGNORECASE)
+INTEGRAL_VARIABLE_PATTERN = re.compile(r'(?:\s+|\*)d(?P<variable>[a-z])$', re.IGNORECASE)
+LIMIT_PATTERNS = [
+    re.compile(r'^(?:the\s+)?(?:limit|lim)\s+(?:of\s+)?(?P<body>.+?)\s+as\s+(?P<variable>[a-z])\s*(?:->|→|approaches|tends\s+to|goes\s+to)\s*(?P<point>[^\s+]+?)(?P<direction>[+-])?$', re.IGNORECASE),
+    re.compile(r'^lim(?:it)?\s*_?\{?(?P<variable>[a-z])\s*(?:->|→)\s*(?P<point>[^\s}+]+?)(?P<direction>[+-])?\}?\s+(?P<body>.+)$', re.IGNORECASE)
+]
+# Linear algebra: operations offered, and the largest symbolic matrix or
+# exact linear system handed to SymPy instead of NumPy
+LINEAR_ALGEBRA_OPERATIONS = ('solve', 'inverse', 'det', 'eig', 'lstsq', 'lu', 'qr', 'svd', 'cholesky', 'rank')
+SYMBOLIC_MATRIX_LIMIT = int(os.getenv('EQUATION_SYMBOLIC_MATRIX_LIMIT', 8))
+
+# Cost-model routing: whether it's on, pseudo-observations behind the prior
+# estimates, and how often a bucket re-runs every stage to keep learning
+ROUTING_ENABLED = os.getenv('EQUATION_ROUTING', 'true').lower() == 'true'
+ROUTING_PRIOR_WEIGHT = float(os.getenv('EQUATION_ROUTING_PRIOR_WEIGHT', 5))
+ROUTING_EXPLORE_EVERY = int(os.getenv('EQUATION_ROUTING_EXPLORE_EVERY', 20))
+
+# Extra cost in ms charged to stages that only return approximations, so an
+# exact stage that usually works still goes first
+ROUTING_APPROXIMATE_PENALTY_MS = float(os.getenv('EQUATION_ROUTING_APPROXIMATE_PENALTY_MS', 50))
+APPROXIMATE_STAGES = {'numeric'}
+
+# Prior (success probability, latency in ms) of each stage per problem class
+ROUTING_PRIORS = {
+    "calculus": {"calculus": (0.9, 50), "symbolic": (0.1, 20), "numeric": (0.05, 10)},
+    "system": {"linear_system": (0.9, 5), "symbolic": (0.05, 20), "numeric": (0.02, 10)},
+    "polynomial": {"symbolic": (0.8, 20), "numeric": (0.9, 5)},
+    "high_degree": {"symbolic": (0.4, 200), "numeric": (0.95, 5)},
+    "transcendental": {"symbolic": (0.2, 100), "numeric": (0.8, 20)},
+    "expression": {"symbolic": (0.9, 20), "numeric": (0.05, 5)},
+    "malformed": {"symbolic": (0.05, 5), "numeric": (0.02, 5)}
+}
+
+# Prior latency of an OpenAI call in ms, until real calls are measured
+ROUTING_LLM_LATENCY_PRIOR = 2000.0
+
+# Function names that make an equation non-polynomial
+TRANSCENDENTAL_FUNCTIONS = {'sin', 'cos', 'tan', 'cot', 'sec', 'csc', 'asin', 'acos', 'atan', 'sinh', 'cosh', 'tanh', 'exp', 'log', 'ln', 'sqrt', 'abs'}
+
+# Single letters the expression parser reads as constants or functions
+# rather than unknowns (E is Euler's number, I the imaginary unit)
+PARSER_RESERVED_LETTERS = {'E', 'I', 'N', 'O', 'Q', 'S'}
+
+# A term of a simple linear equation: optional sign, coefficient and variable
+LINEAR_TERM_PATTERN = re.compile(r'\s*([+-])?\s*(\d+\.?\d*(?:[eE][+-]?\d+)?|\.\d+)?\s*\*?\s*([a-zA-Z_]\w*)?\s*')
+
+SERIES_PATTERN = re.compile(r'^(?:the\s+)?(?P<kind>taylor\s+|maclaurin\s+|power\s+)?series\s+(?:expansion\s+)?(?:of\s+|for\s+)?(?P<body>.+?)(?:\s+(?:at|around|about|near)\s+(?P<variable>[a-z])\s*=\s*(?P<point>\S+))?(?:\s*,?\s+(?:to\s+|up\s+to\s+)?order\s+(?P<order>\d+))?$', re.IGNORECASE)
+
+def solve_locally_traced(equation, interval=None, time_limit=None, plan=None):
+    """
+    Solve an equation without calling OpenAI, reporting what each stage cost
+    
+    Runs the local stages in order, each under its own time limit, until
+    one succeeds. Stages that don't apply to the equation (calculus for
+    plain equations, linear_system for a single equation) are skipped
+    without a trace entry. Kept at module level so it can be shipped to
+    worker processes.
+    
+    Args:
+        equation (str): The equation or problem to solve
+        interval (tuple): (low, high) real interval for numeric root finding
+        time_limit (float): Seconds each stage may run
+        plan (list): Stages to try, in order (default: LOCAL_STAGES)
+    
+    Returns:
+        tuple: (solution, trace) where solution has an "error" key if the
+            equation could not be resolved locally, and trace is a list of
+            (stage, seconds, succeeded) tuples in the order the stages ran
+    """
+    time_limit = time_limit or LOCAL_TIME_LIMIT
+    trace = []
+    stage_errors = {}
+    
+    for stage in (LOCAL_STAGES if plan is None else plan):
+        if stage == 'calculus':
+            # Derivatives, integrals, limits and series
+            request = _parse_calculus(equation)
+            if not request:
+                continue
+            function, args = _calculus_solve, (equation,) + request
+        elif stage == 'linear_system':
+            # Several equations at once are treated as a linear system
+            equations = _split_equations(equation)
+            if len(equations) < 2:
+                continue
+            function, args = _linear_system_solve, (equation, equations)
+        elif stage == 'symbolic':
+            function, args = _sympy_solve, (equation,)
+        elif stage == 'numeric':
+            function, args = _numeric_solve, (equation, interval)
+        else:
+            continue
+        
+        started = time.perf_counter()
+        solution = _run_with_time_limit(time_limit, function, *args)
+        trace.append((stage, time.perf_counter() - started, 'error' not in solution))
+        if 'error' not in solution:
+            return solution, trace
+        stage_errors[stage] = solution['error']
+    
+    return {
+        "error": next(iter(stage_errors.values()), "No local stage applies"),
+        "stage_errors": stage_errors
+    }, trace
+
+_overrun_lock = threading.Lock()
+_overrun_stages = 0
+
+def _run_with_time_limit(time_limit, function, *args):
+    """
+    Run a solving stage, giving up on it after time_limit seconds
+    
+    SymPy can't be interrupted, so a stage that runs over is left to finish
+    on its daemon thread and its result is discarded. At most
+    MAX_OVERRUN_STAGES such threads run per process: while that many are
+    still going, stages are refused at once, so the equation falls through
+    to the LLM instead of piling more work onto busy cores.
+    """
+    global _overrun_stages
+    with _overrun_lock:
+        if _overrun_stages >= MAX_OVERRUN_STAGES:
+            return {"error": f"{_overrun_stages} timed-out stages are still running"}
+    
+    outcome = {}
+    state = {"done": False, "abandoned": False}
+    
+    def target():
+        global _overrun_stages
+        try:
+            outcome['result'] = function(*args)
+        except Exception as e:
+            outcome['result'] = {"error": str(e)}
+        finally:
+            with _overrun_lock:
+                state['done'] = True
+                if state['abandoned']:
+                    _overrun_stages -= 1
+    
+    worker = threading.Thread(target=target, daemon=True)
+    worker.start()
+    worker.join(time_limit)
+    
+    with _overrun_lock:
+        if not state['done']:
+            state['abandoned'] = True
+            _overrun_stages += 1
+            return {"error": f"Timed out after {time_limit} seconds"}
+    
+    return outcome['result']
+
+def overrun_stage_count():
+    """
+    Count the abandoned stages still running in this process
+    """
+    with _overrun_lock:
+        return _overrun_stages
+
+def _sympy_solve(equation):
+    """
+    Attempt to solve the equation using SymPy
+    """
+    try:
+        # Check if it's a simple equation with = sign
+        if '=' in equation:
+            # Parse the equation
+            left_side, right_side = equation.split('=', 1)
+            
+            # Try to identify the variable
+            variables = set(re.findall(r'[a-zA-Z]', equation))
+            
+            # Remove common mathematical constants
+            variables.discard('e')  # Euler's number
+            variables.discard('i')  # Imaginary unit
+            variables.discard('j')  # Imaginary unit (engineering notation)
+            variables.discard('π')  # Pi
+            variables.discard('pi') # Pi (text)
+            
+            if len(variables) == 1:
+                # If there's exactly one variable, solve for it
+                var = list(variables)[0]
+                var_sym = sp.Symbol(var)
+                
+                # Convert the equation to SymPy expression
+                expr = _parse_expression(left_side) - _parse_expression(right_side)
+                
+                # Solve the equation
+                solutions = sp.solve(expr, var_sym)
+                
+                if solutions:
+                    return {
+                        "equation": equation,
+                        "variable": var,
+                        "solution": str(solutions),
+                        "method": "symbolic"
+                    }
+        
+        # For expressions without = sign, try to simplify
+        expr = _parse_expression(equation)
+        simplified = sp.simplify(expr)
+        
+        return {
+            "expression": equation,
+            "simplified": str(simplified),
+            "method": "simplification"
+        }
+    except Exception as e:
+        print(f"SymPy error: {e}")
+        return {"error": f"SymPy error: {str(e)}"}
+
+def analyze_problem(equation):
+    """
+    Cheaply describe an equation for routing, without parsing it with SymPy
+    
+    Returns:
+        dict: problem_class, size (token count), degree (largest integer
+            exponent), transcendental flag and variable count
+    """
+    tokens = re.findall(r'[A-Za-z_]\w*|\d+\.?\d*|\S', equation)
+    names = {token for token in tokens if token[0].isalpha() or token[0] == '_'}
+    functions = names & TRANSCENDENTAL_FUNCTIONS
+    variables = {name for name in names if len(name) == 1 and name not in ('e', 'E', 'i', 'I')}
+    exponents = [int(power) for power in re.findall(r'(?:\^|\*\*)\s*(\d+)', equation)]
+    degree = max(exponents) if exponents else (1 if variables else 0)
+    
+    depth, balanced = 0, True
+    for char in equation:
+        depth += {'(': 1, ')': -1}.get(char, 0)
+        balanced = balanced and depth >= 0
+    balanced = balanced and depth == 0
+    
+    if not equation.strip() or not balanced or '==' in equation or re.search(r'^\s*=|=\s*$|[+\-*/^]\s*=|[*/]\s*[*/]\s*[*/]|/\s*/', equation):
+        problem_class = "malformed"
+    elif _parse_calculus(equation):
+        problem_class = "calculus"
+    elif len(_split_equations(equation)) > 1:
+        problem_class = "system"
+    elif '=' not in equation:
+        problem_class = "expression"
+    elif functions:
+        problem_class = "transcendental"
+    elif degree >= 5:
+        problem_class = "high_degree"
+    else:
+        problem_class = "polynomial"
+    
+    return {
+        "problem_class": problem_class,
+        "size": len(tokens),
+        "degree": degree,
+        "transcendental": bool(functions),
+        "variables": len(variables)
+    }
+
+class StageRouter:
+    def __init__(self, llm_latency_prior=ROUTING_LLM_LATENCY_PRIOR):
+        """
+        Predict which local stages are worth trying, learning from outcomes
+        
+        Each request falls in a bucket by problem class, size, degree and
+        transcendental functions. Per bucket and stage the router tracks
+        success rate and latency, seeded by ROUTING_PRIORS. A stage is
+        tried only if its expected saving (success probability times the
+        cost of an OpenAI call) exceeds its expected latency, and stages are
+        ordered by latency over success probability, which minimizes the
+        expected time to the first success. Approximate stages are charged
+        ROUTING_APPROXIMATE_PENALTY_MS on top so exact answers win ties.
+        """
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._decisions = {}
+        self._llm_latency_ms = llm_latency_prior
+        self._llm_samples = 0
+    
+    def bucket(self, features):
+        """
+        Group similar problems so they share statistics
+        """
+        size = 'small' if features['size'] <= 12 else ('medium' if features['size'] <= 60 else 'large')
+        degree = 'low' if features['degree'] <= 2 else ('mid' if features['degree'] <= 4 else 'high')
+        return f"{features['problem_class']}:{size}:{degree}:{'trig' if features['transcendental'] else 'alg'}"
+    
+    def plan(self, equation):
+        """
+        Choose the local stages to try for an equation
+        
+        Returns:
+            tuple: (plan, features, bucket) where an empty plan means the
+                equation should go straight to OpenAI
+        """
+        features = analyze_problem(equation)
+        bucket = self.bucket(features)
+        priors = ROUTING_PRIORS[features['problem_class']]
+        
+        with self._lock:
+            stats = self._buckets.setdefault(bucket, {})
+            decisions = self._decisions.setdefault(bucket, {"count": 0, "plans": {}})
+            decisions['count'] += 1
+            
+            # Periodically try every stage so skipped ones get re-measured
+            if ROUTING_EXPLORE_EVERY and decisions['count'] % ROUTING_EXPLORE_EVERY == 0:
+                plan = [stage for stage in LOCAL_STAGES if stage in priors]
+                reason = "explore"
+            else:
+                candidates = []
+                for stage, (prior_probability, prior_latency) in priors.items():
+                    stage_stats = stats.get(stage, {"attempts": 0, "successes": 0, "latency_ms": 0.0})
+                    weight = ROUTING_PRIOR_WEIGHT + stage_stats['attempts']
+                    probability = (prior_probability * ROUTING_PRIOR_WEIGHT + stage_stats['successes']) / weight
+                    latency = (prior_latency * ROUTING_PRIOR_WEIGHT + stage_stats['latency_ms']) / weight
+                    if probability * self._llm_latency_ms > latency:
+                        penalty = ROUTING_APPROXIMATE_PENALTY_MS if stage in APPROXIMATE_STAGES else 0
+                        candidates.append(((latency + penalty) / max(probability, 1e-9), stage))
+                plan = [stage for _, stage in sorted(candidates)]
+                reason = "predicted" if plan else "direct_to_llm"
+            
+            key = " > ".join(plan) or "openai"
+            decisions['plans'][key] = decisions['plans'].get(key, 0) + 1
+            decisions[reason] = decisions.get(reason, 0) + 1
+        
+        return plan, features, bucket
+    
+    def record(self, bucket, trace):
+        """
+        Learn from the stages run for one equation
+        """
+        with self._lock:
+            stats = self._buckets.setdefault(bucket, {})
+            for stage, seconds, succeeded in trace:
+                stage_stats = stats.setdefault(stage, {"attempts": 0, "successes": 0, "latency_ms": 0.0})
+                stage_stats['attempts'] += 1
+                stage_stats['successes'] += 1 if succeeded else 0
+                stage_stats['latency_ms'] += seconds * 1000
+    
+    def record_llm(self, seconds):
+        """
+        Learn the cost of falling back to OpenAI
+        """
+        with self._lock:
+            self._llm_samples += 1
+            weight = ROUTING_PRIOR_WEIGHT + self._llm_samples
+            self._llm_latency_ms += (seconds * 1000 - self._llm_latency_ms) / weight
+    
+    def snapshot(self):
+        """
+        Summarize routing decisions and what each bucket has learned
+        """
+        with self._lock:
+            buckets = {}
+            for bucket, stats in self._buckets.items():
+                buckets[bucket] = {
+                    stage: {
+                        "attempts": stage_stats['attempts'],
+                        "success_rate": stage_stats['successes'] / stage_stats['attempts'] if stage_stats['attempts'] else None,
+                        "mean_ms": stage_stats['latency_ms'] / stage_stats['attempts'] if stage_stats['attempts'] else None
+                    }
+                    for stage, stage_stats in stats.items()
+                }
+            
+            return {
+                "enabled": ROUTING_ENABLED,
+                "llm_latency_ms": self._llm_latency_ms,
+                "decisions": {bucket: dict(decisions, plans=dict(decisions['plans'])) for bucket, decisions in self._decisions.items()},
+                "buckets": buckets
+            }
+
+def _split_equations(text):
+    """
+    Split a system written as "x + y = 3; x - y = 1" into its equations
+    
+    Equations may be separated by semicolons, newlines, "and", or commas
+    outside parentheses.
+    """
+    parts = [part.strip() for part in re.split(r';|\n|\s+and\s+', text) if part.strip()]
+    
+    if len(parts) == 1 and text.count('=') > 1:
+        parts, depth, current = [], 0, ''
+        for char in text:
+            depth += {'(': 1, '[': 1, ')': -1, ']': -1}.get(char, 0)
+            if char == ',' and depth == 0:
+                parts.append(current.strip())
+                current = ''
+            else:
+                current += char
+        parts.append(current.strip())
+    
+    return [part for part in parts if part]
+
+def _parse_linear_side(text):
+    """
+    Read one side of a simple linear equation like "3x - 2*y + 4"
+    
+    Returns:
+        tuple: (coefficients by variable, constant), or None if the text
+            uses anything beyond signed terms of single-letter unknowns, so
+            SymPy can take over
+    """
+    coefficients, constant, position = {}, 0.0, 0
+    text = text.strip()
+    if not text:
+        return None
+    
+    while position < len(text):
+        match = LINEAR_TERM_PATTERN.match(text, position)
+        sign, number, variable = match.groups()
+        if match.end() == position or (number is None and variable is None):
+            return None
+        if position > 0 and sign is None:
+            return None
+        
+        # "xy" is a product and "pi" a constant to the expression parser,
+        # so only single-letter unknowns are read here
+        if variable and (len(variable) > 1 or variable in PARSER_RESERVED_LETTERS):
+            return None
+        
+        value = float(number) if number else 1.0
+        value = -value if sign == '-' else value
+        if variable:
+            coefficients[variable] = coefficients.get(variable, 0.0) + value
+        else:
+            constant += value
+        position = match.end()
+    
+    return coefficients, constant
+
+def _linear_system_solve(equation, equations):
+    """
+    Solve a system of linear equations
+    
+    Simple systems are read with a fast term scanner so large systems don't
+    pay for SymPy parsing. Small systems with integer coefficients are
+    solved exactly with SymPy; everything else goes to NumPy.
+    """
+    try:
+        rows = []
+        for text in equations:
+            if text.count('=') != 1:
+                return {"error": f"Not an equation: {text}"}
+            left_side, right_side = text.split('=')
+            left, right = _parse_linear_side(left_side), _parse_linear_side(right_side)
+            if left is None or right is None:
+                rows = None
+                break
+            coefficients = dict(left[0])
+            for variable, value in right[0].items():
+                coefficients[variable] = coefficients.get(variable, 0.0) - value
+            rows.append((coefficients, right[1] - left[1]))
+        
+        if rows is not None:
+            variables = sorted({variable for coefficients, _ in rows for variable in coefficients})
+            column = {variable: index for index, variable in enumerate(variables)}
+            A = np.zeros((len(rows), len(variables)))
+            b = np.array([constant for _, constant in rows])
+            for row, (coefficients, _) in enumerate(rows):
+                for variable, value in coefficients.items():
+                    A[row, column[variable]] = value
+        else:
+            exprs = []
+            for text in equations:
+                left_side, right_side = text.split('=')
+                exprs.append(_parse_expression(left_side) - _parse_expression(right_side))
+            symbols = sorted(set().union(*[expr.free_symbols for expr in exprs]), key=lambda symbol: symbol.name)
+            matrix, vector = sp.linear_eq_to_matrix(exprs, symbols)
+            variables = [symbol.name for symbol in symbols]
+            if matrix.free_symbols or vector.free_symbols:
+                return {"error": "Linear system has symbolic coefficients"}
+            A = np.array(matrix.tolist(), dtype=float)
+            b = np.array(vector.tolist(), dtype=float).ravel()
+        
+        if not variables:
+            return {"error": "Linear system has no variables"}
+        
+        result = {
+            "equation": equation,
+            "variables": variables,
+            "method": "linear_system"
+        }
+        
+        # Small integer systems get exact answers, including parametric ones
+        if len(variables) <= SYMBOLIC_MATRIX_LIMIT and np.all(A == np.round(A)) and np.all(b == np.round(b)):
+            symbols = sp.symbols(variables)
+            solutions = sp.linsolve((sp.Matrix(A.astype(int)), sp.Matrix(b.astype(int))), *symbols)
+            if not solutions:
+                result.update({
+                    "solution": "No solution",
+                    "values": {},
+                    "consistent": False,
+                    "engine": "sympy"
+                })
+                return result
+            values = dict(zip(variables, next(iter(solutions))))
+            result.update({
+                "solution": str({sp.Symbol(name): value for name, value in values.items()}),
+                "values": {name: str(value) for name, value in values.items()},
+                "engine": "sympy"
+            })
+            return result
+        
+        if A.shape[0] == A.shape[1]:
+            try:
+                x = np.linalg.solve(A, b)
+                least_squares = False
+            except np.linalg.LinAlgError:
+                x = np.linalg.lstsq(A, b, rcond=None)[0]
+                least_squares = True
+        else:
+            x = np.linalg.lstsq(A, b, rcond=None)[0]
+            least_squares = True
+        
+        result.update({
+            "solution": "{" + ", ".join(f"{name}: {value:.12g}" for name, value in zip(variables, x)) + "}",
+            "values": {name: float(value) for name, value in zip(variables, x)},
+            "engine": "numpy",
+            "approximate": True,
+            "least_squares": least_squares,
+            "residual": float(np.linalg.norm(A @ x - b))
+        })
+        return result
+    except Exception as e:
+        print(f"Linear system error: {e}")
+        return {"error": f"Linear system error: {str(e)}"}
+
+def _parse_matrix(value):
+    """
+    Parse a matrix or vector from JSON arrays or compact text
+    
+    Text may be JSON-like ("[[1, 2], [3, 4]]") or rows separated by
+    semicolons or newlines ("1 2; 3 4"). Entries that aren't numbers are
+    parsed as SymPy expressions.
+    
+    Returns:
+        numpy.ndarray or sympy.Matrix: The parsed matrix
+    """
+    if isinstance(value, str):
+        text = value.strip()
+        if text.startswith('['):
+            try:
+                value = json.loads(text)
+            except ValueError:
+                rows = re.findall(r'\[([^\[\]]*)\]', text)
+                value = [[entry for entry in re.split(r'[,\s]+', row.strip()) if entry] for row in rows]
+        else:
+            rows = [row for row in re.split(r'[;\n]', text) if row.strip()]
+            value = [[entry for entry in re.split(r'[,\s]+', row.strip()) if entry] for row in rows]
+            if len(value) == 1:
+                value = value[0]
+    
+    try:
+        return np.asarray(value, dtype=float)
+    except (TypeError, ValueError):
+        rows = value if value and isinstance(value[0], list) else [[entry] for entry in value]
+        return sp.Matrix([[_parse_expression(str(entry)) for entry in row] for row in rows])
+
+def _lu_decompose(A):
+    """
+    LU decomposition with partial pivoting, so that A[perm] = L @ U
+    """
+    n = A.shape[0]
+    U = A.astype(float).copy()
+    L = np.eye(n)
+    perm = np.arange(n)
+    
+    for k in range(n - 1):
+        pivot = k + int(np.argmax(np.abs(U[k:, k])))
+        if pivot != k:
+            U[[k, pivot]] = U[[pivot, k]]
+            perm[[k, pivot]] = perm[[pivot, k]]
+            L[[k, pivot], :k] = L[[pivot, k], :k]
+        if U[k, k] == 0:
+            continue
+        factors = U[k + 1:, k] / U[k, k]
+        L[k + 1:, k] = factors
+        U[k + 1:, k:] -= np.outer(factors, U[k, k:])
+    
+    return perm, L, U
+
+def _array_to_json(array):
+    """
+    Convert a NumPy result to JSON, splitting complex values into parts
+    """
+    array = np.asarray(array)
+    if np.iscomplexobj(array):
+        if np.allclose(array.imag, 0):
+            return array.real.tolist()
+        return {"real": array.real.tolist(), "imag": array.imag.tolist()}
+    return array.tolist()
+
+def _numeric_linear_algebra(operation, A, b):
+    """
+    Run a linear algebra operation on a numeric matrix with NumPy
+    """
+    if operation == 'solve':
+        return {"x": _array_to_json(np.linalg.solve(A, b))}
+    if operation == 'inverse':
+        return {"inverse": _array_to_json(np.linalg.inv(A))}
+    if operation == 'det':
+        sign, logdet = np.linalg.slogdet(A)
+        return {"det": float(sign * np.exp(logdet)), "sign": float(sign), "log_abs_det": float(logdet)}
+    if operation == 'eig':
+        if np.allclose(A, A.T):
+            values, vectors = np.linalg.eigh(A)
+        else:
+            values, vectors = np.linalg.eig(A)
+        return {"eigenvalues": _array_to_json(values), "eigenvectors": _array_to_json(vectors)}
+    if operation == 'lstsq':
+        x, residuals, rank, singular_values = np.linalg.lstsq(A, b, rcond=None)
+        return {"x": _array_to_json(x), "residuals": _array_to_json(residuals), "rank": int(rank), "singular_values": _array_to_json(singular_values)}
+    if operation == 'lu':
+        if A.shape[0] != A.shape[1]:
+            raise ValueError("LU decomposition needs a square matrix")
+        perm, L, U = _lu_decompose(A)
+        return {"permutation": perm.tolist(), "L": _array_to_json(L), "U": _array_to_json(U)}
+    if operation == 'qr':
+        Q, R = np.linalg.qr(A)
+        return {"Q": _array_to_json(Q), "R": _array_to_json(R)}
+    if operation == 'svd':
+        U, S, Vh = np.linalg.svd(A, full_matrices=False)
+        return {"U": _array_to_json(U), "S": _array_to_json(S), "Vh": _array_to_json(Vh)}
+    if operation == 'cholesky':
+        return {"L": _array_to_json(np.linalg.cholesky(A))}
+    if operation == 'rank':
+        return {"rank": int(np.linalg.matrix_rank(A))}
+    raise ValueError(f"Unknown linear algebra operation: {operation}")
+
+def _symbolic_linear_algebra(operation, A, b):
+    """
+    Run a linear algebra operation on a small symbolic matrix with SymPy
+    """
+    def to_json(matrix):
+        return [[str(sp.simplify(entry)) for entry in row] for row in matrix.tolist()]
+    
+    if operation == 'solve':
+        return {"x": to_json(A.LUsolve(b))}
+    if operation == 'inverse':
+        return {"inverse": to_json(A.inv())}
+    if operation == 'det':
+        return {"det": str(sp.simplify(A.det()))}
+    if operation == 'eig':
+        return {"eigenvalues": {str(value): multiplicity for value, multiplicity in A.eigenvals().items()}}
+    if operation == 'lstsq':
+        return {"x": to_json(A.solve_least_squares(b))}
+    if operation == 'lu':
+        L, U, swaps = A.LUdecomposition()
+        return {"L": to_json(L), "U": to_json(U), "row_swaps": [list(swap) for swap in swaps]}
+    if operation == 'qr':
+        Q, R = A.QRdecomposition()
+        return {"Q": to_json(Q), "R": to_json(R)}
+    if operation == 'svd':
+        U, S, V = A.singular_value_decomposition()
+        return {"U": to_json(U), "S": to_json(S), "V": to_json(V)}
+    if operation == 'cholesky':
+        return {"L": to_json(A.cholesky())}
+    if operation == 'rank':
+        return {"rank": int(A.rank())}
+    raise ValueError(f"Unknown linear algebra operation: {operation}")
+
+def _parse_calculus(text):
+    """
+    Recognize a natural-language derivative, integral, limit or series request
+    
+    Returns:
+        tuple: (operation, body, variable, params) with params as a tuple
+            of operation-specific values, or None if text isn't one
+    """
+    text = ' '.join(text.strip().split()).rstrip('?.')
+    
+    for pattern in DERIVATIVE_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            groups = match.groupdict()
+            order = int(groups.get('order') or {'second': 2, 'third': 3}.get((groups.get('word') or '').lower(), 1))
+            return 'diff', groups['body'], groups.get('variable'), (order,)
+    
+    match = INTEGRAL_PATTERN.match(text)
+    if match:
+        body, lower, upper = match.group('body'), None, None
+        bounds = INTEGRAL_BOUNDS_PATTERN.search(body)
+        if bounds:
+            lower, upper = bounds.group('lower'), bounds.group('upper')
+            body = body[:bounds.start()]
+        variable = INTEGRAL_VARIABLE_PATTERN.search(body)
+        if variable:
+            body = body[:variable.start()]
+            variable = variable.group('variable')
+        return 'integrate', body, variable, (lower, upper)
+    
+    for pattern in LIMIT_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            return 'limit', match.group('body'), match.group('variable'), (match.group('point'), match.group('direction') or '+-')
+    
+    match = SERIES_PATTERN.match(text)
+    if match:
+        point = match.group('point') or '0'
+        order = int(match.group('order') or 6)
+        return 'series', match.group('body'), match.group('variable'), (point, order)
+    
+    return None
+
+def _parse_point(text):
+    """
+    Parse a limit point, series center or integration bound
+    """
+    if text.lower().lstrip('+-') in ('oo', 'inf', 'infinity', '∞'):
+        return -sp.oo if text.startswith('-') else sp.oo
+    
+    return _parse_expression(text)
+
+def _calculus_solve(equation, operation, body, variable, params):
+    """
+    Run a parsed calculus request locally
+    """
+    try:
+        expr = _parse_expression(body)
+        if variable is None:
+            variables = sorted(expr.free_symbols, key=lambda symbol: symbol.name)
+            names = [symbol.name for symbol in variables]
+            variable = 'x' if 'x' in names else (names[0] if names else 'x')
+        
+        solution = dict(_cached_calculus(operation, sp.srepr(expr), variable, tuple(str(param) if param is not None else None for param in params)))
+        solution['expression'] = equation
+        
+        return solution
+    except Exception as e:
+        print(f"Calculus error: {e}")
+        return {"error": f"Calculus error: {str(e)}"}
+
+@lru_cache(maxsize=CALCULUS_CACHE_SIZE)
+def _cached_calculus(operation, canonical, variable, params):
+    """
+    Compute a derivative, integral, limit or series, cached per canonical expression
+    """
+    expr = sp.sympify(canonical)
+    var_sym = sp.Symbol(variable)
+    result = {
+        "operation": operation,
+        "variable": variable,
+        "method": "calculus"
+    }
+    
+    if operation == 'diff':
+        (order,) = params
+        value = sp.simplify(sp.diff(expr, var_sym, int(order)))
+        result["order"] = int(order)
+        solution = str(value)
+    elif operation == 'integrate':
+        lower, upper = params
+        if lower is not None and upper is not None:
+            value = sp.integrate(expr, (var_sym, _parse_point(lower), _parse_point(upper)))
+            result["bounds"] = [lower, upper]
+            solution = str(value)
+        else:
+            value = sp.integrate(expr, var_sym)
+            solution = f"{value} + C"
+        
+        if value.has(sp.Integral):
+            raise ValueError("SymPy could not find a closed form for the integral")
+    elif operation == 'limit':
+        point, direction = params
+        value = sp.limit(expr, var_sym, _parse_point(point), dir=direction)
+        result["point"] = point
+        result["direction"] = direction
+        solution = str(value)
+        
+        if value.has(sp.Limit):
+            raise ValueError("SymPy could not evaluate the limit")
+    elif operation == 'series':
+        point, order = params
+        value = sp.series(expr, var_sym, _parse_point(point), int(order))
+        result["point"] = point
+        result["order"] = int(order)
+        solution = str(value)
+    else:
+        raise ValueError(f"Unknown calculus operation: {operation}")
+    
+    result["result"] = str(value)
+    result["solution"] = solution
+    
+    return result
+
+def _numeric_solve(equation, interval=None):
+    """
+    Find roots of a single-variable equation numerically
+    
+    Polynomials are solved through the eigenvalues of their companion
+    matrix (numpy.roots). Other real functions are sampled over the
+    interval, sign changes are bracketed, and every bracket is refined at
+    once with a safeguarded vectorized Newton iteration. Brackets that
+    don't converge, and near-tangent roots, fall back to sympy.nsolve.
+    """
+    try:
+        if '=' not in equation:
+            return {"error": "Numeric solving needs an equation"}
+        
+        left_side, right_side = equation.split('=', 1)
+        expr = _parse_expression(left_side) - _parse_expression(right_side)
+        
+        variables = sorted(expr.free_symbols, key=lambda symbol: symbol.name)
+        if len(variables) != 1:
+            return {"error": "Numeric solving needs exactly one variable"}
+        var_sym = variables[0]
+        
+        if expr.is_polynomial(var_sym):
+            return _polynomial_roots(equation, expr, var_sym)
+        
+        low, high = interval or NUMERIC_INTERVAL
+        roots, residual = _bracketed_roots(expr, var_sym, float(low), float(high))
+        if not roots:
+            return {"error": f"No real roots found in [{low}, {high}]"}
+        
+        return {
+            "equation": equation,
+            "variable": var_sym.name,
+            "solution": str([float(f"{root:.12g}") for root in roots]),
+            "roots": roots,
+            "method": "numeric",
+            "algorithm": "bracketing_newton",
+            "approximate": True,
+            "interval": [float(low), float(high)],
+            "tolerance": NUMERIC_TOLERANCE,
+            "max_residual": residual
+        }
+    except Exception as e:
+        print(f"Numeric solving error: {e}")
+        return {"error": f"Numeric solving error: {str(e)}"}
+
+def _polynomial_roots(equation, expr, var_sym):
+    """
+    Solve a polynomial through the eigenvalues of its companion matrix
+    """
+    coefficients = [complex(coefficient) for coefficient in sp.Poly(expr, var_sym).all_coeffs()]
+    if len(coefficients) < 2:
+        return {"error": "Equation has no variable terms"}
+    
+    roots = np.roots(coefficients)
+    residual = float(np.max(np.abs(np.polyval(coefficients, roots)))) if len(roots) else 0.0
+    
+    # Report roots with negligible imaginary parts as real
+    scale = max(1.0, float(np.max(np.abs(roots)))) if len(roots) else 1.0
+    formatted = []
+    for root in sorted(roots, key=lambda value: (abs(value.imag) > 1e-9 * scale, value.real, value.imag)):
+        if abs(root.imag) <= 1e-9 * scale:
+            formatted.append(float(f"{root.real:.12g}"))
+        else:
+            formatted.append(f"{root.real:.12g}{root.imag:+.12g}j")
+    
+    return {
+        "equation": equation,
+        "variable": var_sym.name,
+        "solution": str(formatted),
+        "roots": formatted,
+        "method": "numeric",
+        "algorithm": "companion_matrix",
+        "approximate": True,
+        "tolerance": 1e-9 * scale,
+        "max_residual": residual
+    }
+
+def _newton_steps(derivative, x, fx):
+    """
+    Newton steps from x, or NaN where the derivative is missing or can't be evaluated
+    """
+    if derivative is None:
+        return np.full(x.shape, np.nan)
+    try:
+        with np.errstate(all='ignore'):
+            dfx = np.broadcast_to(np.asarray(derivative(x)), x.shape).real.astype(float)
+            return x - fx / dfx
+    except Exception:
+        return np.full(x.shape, np.nan)
+
+def _bracketed_roots(expr, var_sym, low, high):
+    """
+    Locate the real roots of expr in [low, high]
+    
+    Returns:
+        tuple: (sorted roots, largest absolute residual)
+    """
+    function = sp.lambdify(var_sym, expr, modules='numpy')
+    
+    # Non-smooth functions (Abs, floor) have derivatives NumPy can't
+    # evaluate; their brackets are bisected instead
+    try:
+        derivative = sp.lambdify(var_sym, sp.diff(expr, var_sym), modules='numpy')
+    except Exception:
+        derivative = None
+    
+    def real_values(values):
+        with np.errstate(all='ignore'):
+            result = np.asarray(function(values))
+        if np.iscomplexobj(result):
+            result = np.where(np.abs(result.imag) < 1e-12, result.real, np.nan)
+        return np.broadcast_to(result, np.shape(values)).astype(float)
+    
+    xs = np.linspace(low, high, NUMERIC_SAMPLES)
+    ys = real_values(xs)
+    finite = np.isfinite(ys)
+    
+    roots = list(xs[finite & (ys == 0)])
+    
+    # Brackets where the sign flips between neighbouring samples
+    flips = np.flatnonzero(finite[:-1] & finite[1:] & (np.signbit(ys[:-1]) != np.signbit(ys[1:])) & (ys[:-1] != 0) & (ys[1:] != 0))
+    lo, hi = xs[flips], xs[flips + 1]
+    f_lo = ys[flips]
+    x = (lo + hi) / 2
+    converged = np.zeros(len(x), dtype=bool)
+    
+    for _ in range(100):
+        if converged.all():
+            break
+        fx = real_values(x)
+        newton = _newton_steps(derivative, x, fx)
+        
+        # Shrink each bracket around the root
+        same_side = np.signbit(fx) == np.signbit(f_lo)
+        lo = np.where(same_side, x, lo)
+        f_lo = np.where(same_side, fx, f_lo)
+        hi = np.where(same_side, hi, x)
+        
+        # Take the Newton step when it stays inside the bracket, else bisect
+        inside = np.isfinite(newton) & (newton > lo) & (newton < hi)
+        step = np.where(inside, newton, (lo + hi) / 2)
+        converged |= (np.abs(step - x) <= NUMERIC_TOLERANCE * (1 + np.abs(x))) | (fx == 0)
+        x = np.where(converged, x, step)
+    
+    residuals = np.abs(real_values(x))
+    
+    # Sign flips across poles (tan, 1/x) aren't roots
+    accepted = converged & (residuals <= 1e-6)
+    roots.extend(x[accepted])
+    
+    # Roots that touch zero without crossing show up as small local minima
+    # of |f|; they and any brackets that didn't converge go to nsolve
+    magnitude = np.abs(np.where(finite, ys, np.inf))
+    minima = np.flatnonzero((magnitude[1:-1] <= magnitude[:-2]) & (magnitude[1:-1] <= magnitude[2:]) & (magnitude[1:-1] < 1e-3)) + 1
+    starts = [float(start) for start in xs[minima]] + [float(start) for start in ((lo + hi) / 2)[~converged]]
+    
+    for start in starts[:50]:
+        try:
+            root = float(sp.nsolve(expr, var_sym, start))
+        except Exception:
+            continue
+        if low <= root <= high and abs(real_values(np.array([root]))[0]) <= 1e-6:
+            roots.append(root)
+    
+    # Merge duplicates found by more than one method
+    unique = []
+    for root in sorted(float(root) for root in roots):
+        if not unique or abs(root - unique[-1]) > 1e-8 * (1 + abs(root)):
+            unique.append(root)
+    
+    residual = float(np.max(np.abs(real_values(np.array(unique))))) if unique else 0.0
+    
+    return [float(f"{root:.12g}") for root in unique], residual
+
+def _parse_expression(text):
+    """
+    Parse an expression written in everyday math notation into SymPy
+    """
+    return parse_expr(text.strip(), transformations=PARSE_TRANSFORMATIONS)
+
+@lru_cache(maxsize=NUMERIC_CACHE_SIZE)
+def _compile_numeric(canonical):
+    """
+    Compile a canonical (srepr) expression into a NumPy function
+    
+    Cached so that equivalent spellings of the same expression share one
+    compiled function.
+    
+    Returns:
+        tuple: (function, variable names in argument order)
+    """
+    expr = sp.sympify(canonical)
+    variables = sorted(expr.free_symbols, key=lambda symbol: symbol.name)
+    function = sp.lambdify(variables, expr, modules='numpy')
+    
+    return function, [symbol.name for symbol in variables]
+
+def _grid_axis(spec):
+    """
+    Build one grid axis from {"start", "stop", "num"} or [start, stop, num]
+    """
+    if isinstance(spec, dict):
+        start, stop, num = spec['start'], spec['stop'], spec.get('num', 100)
+    else:
+        start, stop, num = spec
+    
+    return np.linspace(float(start), float(stop), int(num))
+
+def _column_to_list(column):
+    """
+    Convert a float column to a JSON-safe list, mapping NaN and inf to None
+    """
+    values = column.tolist()
+    
+    if not np.isfinite(column).all():
+        for index in np.flatnonzero(~np.isfinite(column)):
+            values[index] = None
+    
+    return values
+
+class StageMetrics:
+    def __init__(self, max_samples=10000):
+        """
+        Track call counts, success rates and latencies per solving stage
+        """
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._stages = {}
+    
+    def record(self, stage, seconds, succeeded):
+        """
+        Record one run of a stage
+        """
+        with self._lock:
+            stats = self._stages.setdefault(stage, {
+                "count": 0,
+                "successes": 0,
+                "latencies": deque(maxlen=self.max_samples)
+            })
+            stats['count'] += 1
+            stats['successes'] += 1 if succeeded else 0
+            stats['latencies'].append(seconds)
+    
+    def record_trace(self, trace):
+        """
+        Record every stage of a solve_locally_traced trace
+        """
+        for stage, seconds, succeeded in trace:
+            self.record(stage, seconds, succeeded)
+    
+    def reset(self):
+        """
+        Forget everything recorded so far
+        """
+        with self._lock:
+            self._stages = {}
+    
+    def snapshot(self):
+        """
+        Summarize the recorded stages
+        
+        Returns:
+            dict: Stage name to count, success rate and latency percentiles
+                (in milliseconds) over the most recent samples
+        """
+        with self._lock:
+            stages = {stage: (stats['count'], stats['successes'], list(stats['latencies'])) for stage, stats in self._stages.items()}
+        
+        summary = {}
+        for stage, (count, successes, latencies) in stages.items():
+            latencies_ms = np.array(latencies) * 1000
+            p50, p90, p99 = np.percentile(latencies_ms, [50, 90, 99])
+            summary[stage] = {
+                "count": count,
+                "successes": successes,
+                "success_rate": successes / count,
+                "mean_ms": float(latencies_ms.mean()),
+                "p50_ms": float(p50),
+                "p90_ms": float(p90),
+                "p99_ms": float(p99)
+            }
+        
+        return summary
+
 class EquationSolver:
     def __init__(self):
         """
@@ -12,31 +1115,57 @@ class EquationSolver:
         self.api_key = os.getenv('OPENAI_API_KEY')
         self.client = OpenAI(api_key=self.api_key)
         self.model = os.getenv('RILEY_MODEL', 'gpt-4o')
+        
+        # Batch solving configuration
+        self.batch_workers = int(os.getenv('EQUATION_BATCH_WORKERS', os.cpu_count() or 1))
+        self.batch_limit = int(os.getenv('EQUATION_BATCH_LIMIT', 500))
+        self.llm_concurrency = int(os.getenv('EQUATION_LLM_CONCURRENCY', 4))
+        self._local_pool = None
+        self._llm_pool = None
+        
+        # Vectorized evaluation configuration
+        self.max_evaluation_points = int(os.getenv('EQUATION_MAX_POINTS', 5000000))
+        
+        # Interval searched by the numeric root-finding stage
+        self.numeric_interval = NUMERIC_INTERVAL
+        
+        # Seconds each local solving stage or calculus operation may run
+        self.time_limit = LOCAL_TIME_LIMIT
+        
+        # Per-stage call counts and latencies
+        self.metrics = StageMetrics()
+        
+        # Picks the local stages worth trying for each equation
+        self.router = StageRouter() if ROUTING_ENABLED else None
     
-    def solve(self, equation, output_format='text'):
+    def solve(self, equation, output_format='text', evaluation=None):
         """
         Solve an equation or mathematical problem
         
         Args:
             equation (str): The equation or problem to solve
-            output_format (str): Output format (text, latex, steps)
+            output_format (str): Output format (text, latex, steps, numeric)
+            evaluation (dict): Keyword arguments for evaluate() when
+                output_format is "numeric"
             
         Returns:
             dict: Solution information
         """
         try:
-            # Try to solve with SymPy first for simple equations
-            sympy_solution = self._solve_with_sympy(equation)
-            
-            if sympy_solution and 'error' not in sympy_solution:
-                # If SymPy solved it successfully, return the result
-                if output_format == 'latex':
-                    # Convert to LaTeX if requested
-                    sympy_solution['latex'] = self._convert_to_latex(sympy_solution['solution'])
-                
-                return sympy_solution
+            if output_format == 'numeric':
+                # Evaluate the expression over many inputs instead of solving it
+                return self.evaluate(equation, **(evaluation or {}))
             
-            # If SymPy failed or for more complex problems, use OpenAI
+            # Try to solve locally first, with the stages the router picks
+            plan, bucket = self._plan(equation)
+            local_solution, trace = solve_locally_traced(equation, self.numeric_interval, self.time_limit, plan)
+            self._record_trace(bucket, trace)
+            
+            if local_solution and 'error' not in local_solution:
+                # If it was solved locally, return the result
+                return self._finish_local_solution(local_solution, output_format)
+            
+            # If local solving failed or for more complex problems, use OpenAI
             return self._solve_with_openai(equation, output_format)
         except Exception as e:
             print(f"Error solving equation: {e}")
@@ -45,62 +1174,377 @@ class EquationSolver:
                 "details": str(e)
             }
     
-    def _solve_with_sympy(self, equation):
+    def evaluate(self, expression, grid=None, values=None, output_format='columnar'):
         """
-        Attempt to solve the equation using SymPy
+        Evaluate an expression over many inputs in one vectorized call
+        
+        The parsed expression is compiled to NumPy with lambdify and cached
+        per canonical expression. An equation of the form "y = f(x)" is
+        evaluated as f(x) and its result column is named "y".
+        
+        Args:
+            expression (str): The expression to evaluate
+            grid (dict): Variable name to {"start", "stop", "num"} (or
+                [start, stop, num]); multiple variables form a mesh
+            values (dict): Variable name to an explicit array of values;
+                arrays are broadcast against each other
+            output_format (str): "columnar" for JSON columns, or "binary"
+                for little-endian float64 columns packed back to back
+            
+        Returns:
+            dict: Evaluation result. For "binary", "content" holds the
+                packed bytes and the remaining keys describe the layout.
         """
         try:
-            # Check if it's a simple equation with = sign
-            if '=' in equation:
-                # Parse the equation
-                left_side, right_side = equation.split('=', 1)
-                
-                # Try to identify the variable
-                variables = set(re.findall(r'[a-zA-Z]', equation))
+            result_name = 'result'
+            body = expression
+            if '=' in expression:
+                left_side, right_side = expression.split('=', 1)
+                target = _parse_expression(left_side)
                 
-                # Remove common mathematical constants
-                variables.discard('e')  # Euler's number
-                variables.discard('i')  # Imaginary unit
-                variables.discard('j')  # Imaginary unit (engineering notation)
-                variables.discard('π')  # Pi
-                variables.discard('pi') # Pi (text)
+                if not isinstance(target, sp.Symbol):
+                    return {
+                        "error": "Only expressions or equations of the form 'y = f(x)' can be evaluated",
+                        "expression": expression
+                    }
                 
-                if len(variables) == 1:
-                    # If there's exactly one variable, solve for it
-                    var = list(variables)[0]
-                    var_sym = sp.Symbol(var)
-                    
-                    # Convert the equation to SymPy expression
-                    expr = sp.sympify(left_side) - sp.sympify(right_side)
-                    
-                    # Solve the equation
-                    solutions = sp.solve(expr, var_sym)
-                    
-                    if solutions:
-                        return {
-                            "equation": equation,
-                            "variable": var,
-                            "solution": str(solutions),
-                            "method": "symbolic"
-                        }
+                result_name = target.name
+                body = right_side
+            
+            canonical = sp.srepr(_parse_expression(body))
+            function, variables = _compile_numeric(canonical)
+            
+            grid = grid or {}
+            values = values or {}
+            missing = [name for name in variables if name not in grid and name not in values]
+            if missing:
+                return {
+                    "error": "Missing values for variables",
+                    "variables": variables,
+                    "missing": missing
+                }
+            
+            # Build the inputs: grid axes form a mesh, explicit arrays broadcast
+            grid_names = [name for name in variables if name in grid]
+            axes = [_grid_axis(grid[name]) for name in grid_names]
+            size = int(np.prod([len(axis) for axis in axes])) if axes else 1
+            if size > self.max_evaluation_points:
+                return {
+                    "error": "Too many evaluation points",
+                    "details": f"Requested {size} points, the limit is {self.max_evaluation_points}"
+                }
+            
+            inputs = dict(zip(grid_names, np.meshgrid(*axes, indexing='ij'))) if axes else {}
+            for name in variables:
+                if name not in inputs:
+                    inputs[name] = np.asarray(values[name], dtype=float)
+            
+            arrays = np.broadcast_arrays(*[inputs[name] for name in variables]) if variables else []
+            shape = arrays[0].shape if variables else ()
+            if int(np.prod(shape)) > self.max_evaluation_points:
+                return {
+                    "error": "Too many evaluation points",
+                    "details": f"Requested {int(np.prod(shape))} points, the limit is {self.max_evaluation_points}"
+                }
+            
+            with np.errstate(all='ignore'):
+                result = np.broadcast_to(np.asarray(function(*arrays)), shape)
+            
+            columns = {name: array.ravel() for name, array in zip(variables, arrays)}
+            if np.iscomplexobj(result):
+                columns[result_name] = np.real(result).astype(float).ravel()
+                columns[f"{result_name}_imag"] = np.imag(result).astype(float).ravel()
+            else:
+                columns[result_name] = result.astype(float).ravel()
             
-            # For expressions without = sign, try to simplify
-            expr = sp.sympify(equation)
-            simplified = sp.simplify(expr)
+            if output_format == 'binary':
+                return {
+                    "expression": expression,
+                    "variables": variables,
+                    "shape": list(shape),
+                    "columns": list(columns),
+                    "dtype": "<f8",
+                    "content": b''.join(column.astype('<f8').tobytes() for column in columns.values())
+                }
             
             return {
-                "expression": equation,
-                "simplified": str(simplified),
-                "method": "simplification"
+                "expression": expression,
+                "variables": variables,
+                "shape": list(shape),
+                "count": int(np.prod(shape)),
+                "columns": {name: _column_to_list(column) for name, column in columns.items()},
+                "method": "vectorized"
             }
         except Exception as e:
-            print(f"SymPy error: {e}")
-            return {"error": f"SymPy error: {str(e)}"}
+            print(f"Error evaluating expression: {e}")
+            return {
+                "error": "Failed to evaluate expression",
+                "details": str(e)
+            }
+    
+    def linear_algebra(self, operation, matrix, rhs=None):
+        """
+        Run a linear algebra operation on a matrix
+        
+        Numeric matrices use NumPy. Matrices with symbolic entries use SymPy,
+        up to EQUATION_SYMBOLIC_MATRIX_LIMIT rows or columns and under the
+        solver's time limit.
+        
+        Args:
+            operation (str): One of solve, inverse, det, eig, lstsq, lu,
+                qr, svd, cholesky, rank
+            matrix: Nested lists, or text such as "[[1, 2], [3, 4]]" or
+                "1 2; 3 4"
+            rhs: Right-hand side vector or matrix for solve and lstsq
+            
+        Returns:
+            dict: The operation's results, or a dict with an "error" key
+        """
+        try:
+            if operation not in LINEAR_ALGEBRA_OPERATIONS:
+                return {
+                    "error": f"Unknown linear algebra operation: {operation}",
+                    "operations": list(LINEAR_ALGEBRA_OPERATIONS)
+                }
+            
+            if operation in ('solve', 'lstsq') and rhs is None:
+                return {"error": f"The {operation} operation needs a right-hand side (rhs)"}
+            
+            A = _parse_matrix(matrix)
+            b = _parse_matrix(rhs) if rhs is not None else None
+            
+            if isinstance(A, np.ndarray) and (b is None or isinstance(b, np.ndarray)):
+                if A.ndim != 2:
+                    return {"error": "Matrix must be two-dimensional"}
+                result = _numeric_linear_algebra(operation, A, b)
+                engine = "numpy"
+            else:
+                A = A if isinstance(A, sp.Matrix) else sp.Matrix(A.tolist())
+                if b is not None and not isinstance(b, sp.Matrix):
+                    b = sp.Matrix(b.tolist())
+                if max(A.shape) > SYMBOLIC_MATRIX_LIMIT:
+                    return {"error": f"Symbolic matrices are limited to {SYMBOLIC_MATRIX_LIMIT}x{SYMBOLIC_MATRIX_LIMIT}"}
+                result = _run_with_time_limit(self.time_limit, _symbolic_linear_algebra, operation, A, b)
+                if 'error' in result:
+                    return result
+                engine = "sympy"
+            
+            result.update({
+                "operation": operation,
+                "shape": list(A.shape),
+                "engine": engine,
+                "method": "linear_algebra"
+            })
+            
+            return result
+        except Exception as e:
+            print(f"Linear algebra error: {e}")
+            return {
+                "error": "Failed to run linear algebra operation",
+                "details": str(e)
+            }
+    
+    def diff(self, expression, variable=None, order=1):
+        """
+        Differentiate an expression locally
+        
+        Args:
+            expression (str): The expression to differentiate
+            variable (str): Variable to differentiate by (default: inferred)
+            order (int): Order of the derivative
+            
+        Returns:
+            dict: The derivative, or a dict with an "error" key
+        """
+        return self._calculus('diff', expression, variable, (order,))
+    
+    def integrate(self, expression, variable=None, lower=None, upper=None):
+        """
+        Integrate an expression locally, definitely when both bounds are given
+        
+        Args:
+            expression (str): The integrand
+            variable (str): Variable of integration (default: inferred)
+            lower (str): Optional lower bound
+            upper (str): Optional upper bound
+            
+        Returns:
+            dict: The integral, or a dict with an "error" key
+        """
+        return self._calculus('integrate', expression, variable, (lower, upper))
+    
+    def limit(self, expression, variable=None, point='0', direction='+-'):
+        """
+        Take a limit locally
+        
+        Args:
+            expression (str): The expression
+            variable (str): Variable approaching the point (default: inferred)
+            point (str): The point approached, "oo" for infinity
+            direction (str): "+", "-" or "+-" for a two-sided limit
+            
+        Returns:
+            dict: The limit, or a dict with an "error" key
+        """
+        return self._calculus('limit', expression, variable, (point, direction))
+    
+    def series(self, expression, variable=None, point='0', order=6):
+        """
+        Expand an expression in a power series locally
+        
+        Args:
+            expression (str): The expression to expand
+            variable (str): Expansion variable (default: inferred)
+            point (str): Expansion point
+            order (int): Order of the remainder term
+            
+        Returns:
+            dict: The series, or a dict with an "error" key
+        """
+        return self._calculus('series', expression, variable, (point, order))
+    
+    def _calculus(self, operation, expression, variable, params):
+        """
+        Run a calculus operation under the solver's time limit
+        """
+        return _run_with_time_limit(self.time_limit, _calculus_solve, expression, operation, expression, variable, params)
+    
+    def solve_batch(self, equations, output_format='text'):
+        """
+        Solve a list of equations, yielding results in completion order
+        
+        Local solving is sharded across a process pool. Only the items it
+        cannot resolve are sent to OpenAI, with at most llm_concurrency
+        requests in flight at once.
+        
+        Args:
+            equations (list): The equations or problems to solve
+            output_format (str): Output format (text, latex, steps)
+            
+        Yields:
+            tuple: (index, solution) where index is the position of the
+                equation in the submitted list
+        """
+        local_pool = self._get_local_pool()
+        llm_pool = self._get_llm_pool()
+        
+        pending = {}
+        buckets = {}
+        for index, equation in enumerate(equations):
+            plan, buckets[index] = self._plan(equation)
+            if plan == []:
+                # The router predicts local stages won't pay off
+                pending[llm_pool.submit(self._solve_with_openai, equation, output_format)] = (index, equation, 'openai')
+            else:
+                pending[local_pool.submit(solve_locally_traced, equation, self.numeric_interval, self.time_limit, plan)] = (index, equation, 'local')
+        
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    index, equation, stage = pending.pop(future)
+                    
+                    try:
+                        solution = future.result()
+                        if stage == 'local':
+                            solution, trace = solution
+                            self._record_trace(buckets[index], trace)
+                    except Exception as e:
+                        print(f"Error in batch solving: {e}")
+                        solution = {
+                            "error": "Failed to solve equation",
+                            "details": str(e)
+                        }
+                    
+                    if stage == 'local':
+                        if 'error' in solution:
+                            # Unresolved locally, queue it for OpenAI
+                            follow_up = llm_pool.submit(self._solve_with_openai, equation, output_format)
+                            pending[follow_up] = (index, equation, 'openai')
+                            continue
+                        
+                        if output_format == 'latex':
+                            # LaTeX conversion also goes through OpenAI
+                            follow_up = llm_pool.submit(self._finish_local_solution, solution, output_format)
+                            pending[follow_up] = (index, equation, 'latex')
+                            continue
+                    
+                    yield index, solution
+        finally:
+            # Don't leave work queued if the consumer went away
+            for future in pending:
+                future.cancel()
+    
+    def _plan(self, equation):
+        """
+        Ask the router which local stages to try
+        
+        Returns:
+            tuple: (plan, bucket), with plan None for the default order
+        """
+        if self.router is None:
+            return None, None
+        
+        plan, _, bucket = self.router.plan(equation)
+        return plan, bucket
+    
+    def _record_trace(self, bucket, trace):
+        """
+        Record a local solving trace in the metrics and the router
+        """
+        self.metrics.record_trace(trace)
+        if self.router is not None and bucket is not None:
+            self.router.record(bucket, trace)
+    
+    def get_metrics(self):
+        """
+        Get per-stage metrics and routing decisions
+        """
+        return {
+            "stages": self.metrics.snapshot(),
+            "routing": self.router.snapshot() if self.router is not None else {"enabled": False},
+            "overrun_stages": overrun_stage_count()
+        }
+    
+    def _get_local_pool(self):
+        """
+        Get the executor used for local solving, creating it on first use
+        """
+        if self._local_pool is None:
+            try:
+                self._local_pool = ProcessPoolExecutor(max_workers=self.batch_workers)
+            except Exception as e:
+                # Some serverless runtimes don't support multiprocessing
+                print(f"Process pool unavailable, solving batches in threads: {e}")
+                self._local_pool = ThreadPoolExecutor(max_workers=self.batch_workers)
+        
+        return self._local_pool
+    
+    def _get_llm_pool(self):
+        """
+        Get the executor that bounds concurrent OpenAI calls
+        """
+        if self._llm_pool is None:
+            self._llm_pool = ThreadPoolExecutor(max_workers=self.llm_concurrency)
+        
+        return self._llm_pool
+    
+    def _finish_local_solution(self, solution, output_format):
+        """
+        Apply the requested output format to a locally computed solution
+        """
+        if output_format == 'latex':
+            # Convert to LaTeX if requested
+            solution['latex'] = self._convert_to_latex(solution.get('solution', solution.get('simplified', '')))
+        
+        return solution
     
     def _solve_with_openai(self, equation, output_format):
         """
         Solve the equation using OpenAI
         """
+        started = time.perf_counter()
         try:
             # Create a system prompt based on the requested format
             if output_format == 'steps':
@@ -146,10 +1590,14 @@ class EquationSolver:
             
             # Parse the response
             solution = json.loads(response.choices[0].message.content)
+            self.metrics.record('openai', time.perf_counter() - started, True)
+            if self.router is not None:
+                self.router.record_llm(time.perf_counter() - started)
             
             return solution
         except Exception as e:
             print(f"OpenAI error: {e}")
+            self.metrics.record('openai', time.perf_counter() - started, False)
             return {
                 "error": "Failed to solve with OpenAI",
                 "details": str(e)
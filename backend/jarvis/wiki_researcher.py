@@ -1,8 +1,8 @@
 import os
-import requests
 import json
 from bs4 import BeautifulSoup
 from openai import OpenAI
+from riley.learning.wiki_http import get_wiki_client
 
 # Initialize OpenAI client
 client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
@@ -48,12 +48,19 @@ def search_wiki(query):
             "details": str(e)
         }
 
+def get_metrics():
+    """
+    Get HTTP and connection pool metrics for Wikipedia calls
+    """
+    return {
+        "http": get_wiki_client().get_metrics()
+    }
+
 def search_wikipedia(query):
     """
     Search Wikipedia API for articles related to the query
     """
     try:
-        url = "https://en.wikipedia.org/w/api.php"
         params = {
             "action": "query",
             "format": "json",
@@ -63,8 +70,7 @@ def search_wikipedia(query):
             "srlimit": 5
         }
         
-        response = requests.get(url, params=params)
-        data = response.json()
+        data = get_wiki_client().get(params)
         
         if 'query' in data and 'search' in data['query']:
             results = []
@@ -86,7 +92,6 @@ def get_wikipedia_content(title):
     Get the content of a Wikipedia page by title
     """
     try:
-        url = "https://en.wikipedia.org/w/api.php"
         params = {
             "action": "query",
             "format": "json",
@@ -96,8 +101,7 @@ def get_wikipedia_content(title):
             "explaintext": 1
         }
         
-        response = requests.get(url, params=params)
-        data = response.json()
+        data = get_wiki_client().get(params)
         
         pages = data['query']['pages']
         page_id = list(pages.keys())[0]
@@ -0,0 +1,300 @@
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from riley.learning.repo_mirror import normalize_repo_url
+from riley.learning.analysis_store import get_analysis_store
+
+# Analyses run at once; each holds a worktree and makes model calls
+JOB_WORKERS = int(os.getenv('GITHUB_JOB_WORKERS', 2))
+
+# Unfinished jobs accepted before submissions are refused
+QUEUE_LIMIT = int(os.getenv('GITHUB_JOB_QUEUE_LIMIT', 32))
+
+# Finished jobs kept in memory; older ones are read back from the store
+JOBS_IN_MEMORY = 256
+
+FINISHED_STATUSES = ("completed", "failed")
+
+class JobQueueFull(RuntimeError):
+    """
+    Raised when a job is submitted to a full queue
+    """
+
+class AnalysisJob:
+    def __init__(self, repo_url, ref=None, force=False):
+        """
+        One repository analysis, with its progress
+
+        Progress is a list of events: status changes and the start and end
+        of each stage. Readers wait on the job's condition for new events.
+        """
+        self.id = uuid.uuid4().hex
+        self.repo_url = repo_url
+        self.ref = ref
+        self.force = force
+        self.status = "queued"
+        self.commit = None
+        self.stages = OrderedDict()
+        self.events = []
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.deduplicated = 0
+        self.callbacks = []
+        self.condition = threading.Condition()
+        with self.condition:
+            self._record({"type": "status", "status": "queued"})
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATUSES
+
+    def progress(self, stage, status, duration_ms):
+        """
+        Stage callback for GitHubLearning.analyze_repo
+        """
+        with self.condition:
+            self.stages[stage] = {"name": stage, "status": status, "duration_ms": duration_ms}
+            self._record({"type": "stage", "stage": stage, "status": status, "duration_ms": duration_ms})
+
+    def set_status(self, status, **fields):
+        with self.condition:
+            self.status = status
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self._record({"type": "status", "status": status})
+
+    def wait(self, timeout=None):
+        """
+        Wait for the job to finish
+
+        Returns:
+            dict: The analysis, or None on timeout
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.finished, timeout)
+            return self.result
+
+    def events_after(self, index, timeout=None):
+        """
+        Wait until there are events past index or the job has finished
+
+        Returns:
+            tuple: (new events, whether the job has finished)
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: len(self.events) > index or self.finished, timeout)
+            return self.events[index:], self.finished
+
+    def to_dict(self, include_result=True):
+        with self.condition:
+            job = {
+                "job_id": self.id,
+                "repo_url": self.repo_url,
+                "ref": self.ref,
+                "force": self.force,
+                "status": self.status,
+                "commit": self.commit,
+                "stages": list(self.stages.values()),
+                "events": list(self.events),
+                "deduplicated": self.deduplicated,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "duration_ms": round((self.finished_at - self.started_at) * 1000, 1) if self.finished_at and self.started_at else None
+            }
+            if include_result and self.finished:
+                job["result"] = self.result
+            return job
+
+    def _record(self, event):
+        # Called with the condition held
+        event.update(seq=len(self.events), time=time.time())
+        self.events.append(event)
+        self.condition.notify_all()
+
+class AnalysisJobQueue:
+    def __init__(self, github_learning, workers=None, queue_limit=None, store=None):
+        """
+        Run repository analyses in the background
+
+        Jobs return an id straight away and run on a bounded pool.
+        Submitting a repository and ref that's already queued or running
+        joins the existing job, and jobs that resolve to the same commit
+        while another analyzes it wait for that analysis instead of
+        repeating it. Finished jobs are kept in the analysis store.
+
+        Args:
+            github_learning (GitHubLearning): Runs the analyses
+            workers (int): Concurrent analyses (default: GITHUB_JOB_WORKERS)
+            queue_limit (int): Unfinished jobs allowed (default: GITHUB_JOB_QUEUE_LIMIT)
+            store (AnalysisStore): Where finished jobs are kept (default: the shared store)
+        """
+        self.learning = github_learning
+        self.workers = int(workers or JOB_WORKERS)
+        self.queue_limit = int(queue_limit or QUEUE_LIMIT)
+        self.store = store or get_analysis_store()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="github-job")
+
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        # (repository, ref, force) -> unfinished job
+        self._pending = {}
+        # (repository, commit) -> job analyzing it
+        self._inflight = {}
+        self._metrics = {
+            "submitted": 0,
+            "deduplicated": 0,
+            "commit_deduplicated": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0
+        }
+
+    def submit(self, repo_url, ref=None, force=False, on_complete=None):
+        """
+        Queue an analysis, or join an identical one that hasn't finished
+
+        Args:
+            on_complete (callable): Called with the analysis when the job finishes
+
+        Returns:
+            AnalysisJob: The job
+
+        Raises:
+            ValueError: For an unsupported repository URL
+            JobQueueFull: When the queue is full
+        """
+        key = (normalize_repo_url(repo_url), ref or "HEAD", bool(force))
+
+        with self._lock:
+            job = self._pending.get(key)
+            if job is not None:
+                with job.condition:
+                    job.deduplicated += 1
+                    if on_complete:
+                        job.callbacks.append(on_complete)
+                self._metrics["deduplicated"] += 1
+                return job
+
+            if len(self._pending) >= self.queue_limit:
+                self._metrics["rejected"] += 1
+                raise JobQueueFull(f"Analysis queue is full ({self.queue_limit} jobs)")
+
+            job = AnalysisJob(repo_url, ref, bool(force))
+            if on_complete:
+                job.callbacks.append(on_complete)
+            self._pending[key] = job
+            self._jobs[job.id] = job
+            self._metrics["submitted"] += 1
+            self._trim()
+
+        self._pool.submit(self._run, job, key)
+        return job
+
+    def get(self, job_id):
+        """
+        Get a job that's still in memory
+
+        Returns:
+            AnalysisJob: The job, or None
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_status(self, job_id, include_result=True):
+        """
+        Get a job's status, reading finished jobs back from the store
+
+        Returns:
+            dict: The job, or None if it's unknown
+        """
+        job = self.get(job_id)
+        if job is not None:
+            return job.to_dict(include_result)
+
+        stored = self.store.get_job(job_id)
+        if stored is not None and not include_result:
+            stored.pop('result', None)
+        return stored
+
+    def get_metrics(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            jobs = list(self._jobs.values())
+        metrics["queued"] = sum(1 for job in jobs if job.status == "queued")
+        metrics["running"] = sum(1 for job in jobs if job.status == "running")
+        metrics["workers"] = self.workers
+        metrics["queue_limit"] = self.queue_limit
+        return metrics
+
+    def _run(self, job, key):
+        started_at = time.time()
+        job.progress("queue", "done", round((started_at - job.created_at) * 1000, 1))
+        job.set_status("running", started_at=started_at)
+        try:
+            result = self._analyze(job)
+        except Exception as e:
+            print(f"Error in analysis job {job.id}: {e}")
+            result = {
+                "error": "Failed to analyze repository",
+                "details": str(e)
+            }
+
+        status = "failed" if 'error' in result else "completed"
+        with self._lock:
+            self._pending.pop(key, None)
+            self._metrics[status] += 1
+        job.set_status(status, result=result, commit=result.get('commit', job.commit), finished_at=time.time())
+        self.store.set_job(job.to_dict())
+
+        for callback in job.callbacks:
+            try:
+                callback(result)
+            except Exception as e:
+                print(f"Error in analysis job callback: {e}")
+
+    def _analyze(self, job):
+        """
+        Resolve the job's commit, then analyze it unless another job already is
+        """
+        job.progress("dedupe", "running", None)
+        started = time.perf_counter()
+        repo, commit = self.learning.resolve_commit(job.repo_url, job.ref)
+        with job.condition:
+            job.commit = commit
+        job.progress("dedupe", "done", round((time.perf_counter() - started) * 1000, 1))
+
+        inflight_key = (repo, commit)
+        with self._lock:
+            other = self._inflight.get(inflight_key)
+            if other is None:
+                self._inflight[inflight_key] = job
+            else:
+                self._metrics["commit_deduplicated"] += 1
+
+        if other is not None:
+            job.progress("wait", "running", None)
+            started = time.perf_counter()
+            result = other.wait()
+            job.progress("wait", "done", round((time.perf_counter() - started) * 1000, 1))
+            if result is not None and 'error' not in result and not job.force:
+                return dict(result, repo_url=job.repo_url, cached=True)
+
+        try:
+            # Analyzing by SHA keeps a push after resolving from changing the commit
+            return self.learning.analyze_repo(job.repo_url, commit, force=job.force, progress=job.progress)
+        finally:
+            with self._lock:
+                if self._inflight.get(inflight_key) is job:
+                    del self._inflight[inflight_key]
+
+    def _trim(self):
+        # Called with the lock held
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(self._jobs) - JOBS_IN_MEMORY)]:
+            del self._jobs[job_id]
@@ -0,0 +1,246 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from riley.learning.cache_paths import default_cache_path
+
+# Analyses kept per repository; older commits' analyses are deleted
+ANALYSES_PER_REPO = int(os.getenv('GITHUB_ANALYSES_PER_REPO', 20))
+
+# Days a file summary or stage result is kept after it was last used
+CACHE_TTL = float(os.getenv('GITHUB_ANALYSIS_CACHE_TTL_DAYS', 30)) * 86400
+
+# Finished analysis jobs kept for retrieval
+JOBS_KEPT = int(os.getenv('GITHUB_JOBS_KEPT', 1000))
+
+# Remove expired rows every N writes
+PRUNE_EVERY = 200
+
+# SQLite limits the number of parameters in one statement
+MAX_PARAMETERS = 500
+
+class AnalysisStore:
+    def __init__(self, db_path=None):
+        """
+        Initialize a persistent store for repository analyses
+
+        Holds content-addressed entries (file summaries keyed by git blob
+        SHA, LLM stage results keyed by a hash of their input), which are
+        shared between commits and repositories, complete analyses keyed by
+        repository and commit SHA, and finished analysis jobs.
+
+        Args:
+            db_path (str): SQLite file (default: GITHUB_ANALYSIS_DB, else
+                github_cache.db in the cache directory)
+        """
+        self.db_path = db_path or os.getenv('GITHUB_ANALYSIS_DB') or default_cache_path('github_cache.db')
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._init_db()
+
+    def _init_db(self):
+        """
+        Create the store's tables
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS github_cache (
+            key TEXT PRIMARY KEY,
+            value TEXT,
+            used_at REAL
+        )
+        ''')
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS github_analyses (
+            repo TEXT,
+            commit_sha TEXT,
+            result TEXT,
+            analyzed_at REAL,
+            PRIMARY KEY (repo, commit_sha)
+        )
+        ''')
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS github_jobs (
+            id TEXT PRIMARY KEY,
+            job TEXT,
+            finished_at REAL
+        )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get_many(self, keys):
+        """
+        Look up content-addressed entries, marking the ones found as used
+
+        Returns:
+            dict: key -> value for the keys found
+        """
+        found = {}
+        keys = list(keys)
+        try:
+            conn = self._connect()
+            now = time.time()
+            for start in range(0, len(keys), MAX_PARAMETERS):
+                batch = keys[start:start + MAX_PARAMETERS]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(f"SELECT key, value FROM github_cache WHERE key IN ({placeholders})", batch).fetchall()
+                found.update((key, json.loads(value)) for key, value in rows)
+                conn.execute(f"UPDATE github_cache SET used_at = ? WHERE key IN ({placeholders})", [now] + batch)
+            conn.commit()
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Error reading analysis cache: {e}")
+        return found
+
+    def get(self, key):
+        """
+        Look up one content-addressed entry
+
+        Returns:
+            The value, or None on a miss
+        """
+        return self.get_many([key]).get(key)
+
+    def set_many(self, items):
+        """
+        Store content-addressed entries
+
+        Args:
+            items (dict): key -> JSON-serializable value
+        """
+        if not items:
+            return
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO github_cache (key, value, used_at) VALUES (?, ?, ?)",
+                [(key, json.dumps(value), now) for key, value in items.items()]
+            )
+            if self._should_prune():
+                conn.execute("DELETE FROM github_cache WHERE used_at < ?", (now - CACHE_TTL,))
+            conn.commit()
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Error writing analysis cache: {e}")
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def get_analysis(self, repo, commit):
+        """
+        Get the stored analysis of a commit
+
+        Returns:
+            dict: The analysis, or None if the commit wasn't analyzed
+        """
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT result FROM github_analyses WHERE repo = ? AND commit_sha = ?", (repo, commit)
+            ).fetchone()
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Error reading stored analysis: {e}")
+            return None
+        return json.loads(row[0]) if row else None
+
+    def latest_commit(self, repo):
+        """
+        Get the most recently analyzed commit of a repository
+
+        Returns:
+            str: The commit SHA, or None if the repository wasn't analyzed
+        """
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT commit_sha FROM github_analyses WHERE repo = ? ORDER BY analyzed_at DESC LIMIT 1", (repo,)
+            ).fetchone()
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Error reading stored analysis: {e}")
+            return None
+        return row[0] if row else None
+
+    def set_analysis(self, repo, commit, result):
+        """
+        Store a commit's analysis, keeping the ANALYSES_PER_REPO newest per repository
+        """
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO github_analyses (repo, commit_sha, result, analyzed_at) VALUES (?, ?, ?, ?)",
+                (repo, commit, json.dumps(result), time.time())
+            )
+            conn.execute('''
+            DELETE FROM github_analyses WHERE repo = ? AND commit_sha NOT IN (
+                SELECT commit_sha FROM github_analyses WHERE repo = ? ORDER BY analyzed_at DESC LIMIT ?
+            )
+            ''', (repo, repo, ANALYSES_PER_REPO))
+            conn.commit()
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Error storing analysis: {e}")
+
+    def get_job(self, job_id):
+        """
+        Get a finished analysis job
+
+        Returns:
+            dict: The job, or None if it's unknown
+        """
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT job FROM github_jobs WHERE id = ?", (job_id,)).fetchone()
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Error reading analysis job: {e}")
+            return None
+        return json.loads(row[0]) if row else None
+
+    def set_job(self, job):
+        """
+        Store a finished analysis job, keeping the JOBS_KEPT newest
+        """
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO github_jobs (id, job, finished_at) VALUES (?, ?, ?)",
+                (job['job_id'], json.dumps(job), time.time())
+            )
+            if self._should_prune():
+                conn.execute(
+                    "DELETE FROM github_jobs WHERE id NOT IN (SELECT id FROM github_jobs ORDER BY finished_at DESC LIMIT ?)",
+                    (JOBS_KEPT,)
+                )
+            conn.commit()
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Error storing analysis job: {e}")
+
+    def _should_prune(self):
+        with self._lock:
+            self._writes += 1
+            return self._writes % PRUNE_EVERY == 0
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+def get_analysis_store():
+    """
+    Get the process-wide analysis store
+    """
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = AnalysisStore()
+        return _shared_store
@@ -0,0 +1,20 @@
+import os
+import tempfile
+
+def default_cache_path(name):
+    """
+    Default location of a cache file or directory
+
+    Caches live under RILEY_CACHE_DIR, or a "riley" directory in the system
+    temp directory, rather than the working directory, which may be
+    read-only (e.g. on serverless deploys). Nothing is created here; each
+    cache creates its directory when it first writes.
+
+    Args:
+        name (str): File or directory name of the cache
+
+    Returns:
+        str: Absolute path for the cache
+    """
+    root = os.getenv('RILEY_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'riley')
+    return os.path.join(os.path.abspath(root), name)
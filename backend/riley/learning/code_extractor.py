@@ -0,0 +1,598 @@
+import os
+import re
+import ast
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+PYTHON_EXTENSIONS = ('.py', '.pyi')
+JAVASCRIPT_EXTENSIONS = ('.js', '.jsx', '.mjs', '.cjs', '.ts', '.tsx', '.mts', '.cts')
+SOURCE_EXTENSIONS = PYTHON_EXTENSIONS + JAVASCRIPT_EXTENSIONS
+
+# Bump when summaries change shape, so stored ones are recomputed
+EXTRACTOR_VERSION = 2
+
+# Files per task sent to a worker process; small batches would spend more
+# time pickling than parsing
+BATCH_SIZE = 64
+
+# Below this many files, parsing in-process beats starting workers
+INLINE_LIMIT = 32
+
+# Longest signature kept in a summary
+MAX_SIGNATURE_LENGTH = 120
+
+# Nodes that add a decision point to a Python function
+BRANCH_NODES = (
+    ast.If, ast.For, ast.AsyncFor, ast.While, ast.IfExp, ast.ExceptHandler,
+    ast.Assert, ast.comprehension
+)
+
+# Tokens that add a decision point to a JavaScript function
+JS_BRANCH_TOKENS = frozenset(['if', 'for', 'while', 'case', 'catch', '&&', '||', '??', '?'])
+
+JS_KEYWORDS = frozenset([
+    'if', 'for', 'while', 'switch', 'catch', 'function', 'return', 'typeof', 'new', 'super',
+    'constructor', 'import', 'require', 'await', 'yield', 'delete', 'void', 'in', 'of'
+])
+
+# Tokens that start a new statement, ending an expression left without a semicolon
+JS_STATEMENT_STARTS = frozenset([
+    'const', 'let', 'var', 'function', 'class', 'export', 'import', 'return', 'if', 'for', 'while'
+])
+
+# After these tokens a "/" starts a regular expression rather than a division
+JS_REGEX_PRECEDERS = frozenset([
+    '(', ',', '=', ':', '[', '!', '&', '|', '?', '{', '}', ';', '&&', '||', '??', '=>',
+    'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw', 'yield', 'await'
+])
+
+JS_TOKEN = re.compile(r'''
+    (?P<space>\s+)
+  | (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<template>`(?:\\.|[^`\\])*`)
+  | (?P<string>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')
+  | (?P<name>[A-Za-z_$][\w$]*)
+  | (?P<number>\d[\w.]*)
+  | (?P<punct>=>|\.\.\.|\?\?|\?\.|&&|\|\||[{}()\[\];,<>=!+\-*/%&|^~?:.@#])
+''', re.S | re.X)
+
+JS_REGEX = re.compile(r'/(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/[a-z]*')
+
+def extract_file(path, source):
+    """
+    Summarize one source file
+
+    Returns:
+        dict: path, language, lines and the file's imports, classes,
+            functions and total complexity, or an error
+    """
+    if path.endswith(PYTHON_EXTENSIONS):
+        return extract_python(path, source)
+    if path.endswith(JAVASCRIPT_EXTENSIONS):
+        return extract_javascript(path, source)
+    return {"path": path, "error": "Unsupported file type"}
+
+def extract_python(path, source):
+    """
+    Summarize a Python file from its syntax tree
+    """
+    summary = {"path": path, "language": "python", "lines": source.count('\n') + 1}
+    try:
+        tree = ast.parse(source, filename=path)
+    except (SyntaxError, ValueError) as e:
+        summary["error"] = f"{type(e).__name__}: {e}"
+        return summary
+
+    imports = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            imports.append('.' * node.level + node.module)
+        elif isinstance(node, ast.ImportFrom):
+            # "from . import sibling" imports modules
+            imports.extend('.' * node.level + alias.name for alias in node.names)
+
+    classes = []
+    functions = []
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            classes.append({
+                "name": node.name,
+                "line": node.lineno,
+                "bases": [ast.unparse(base) for base in node.bases],
+                "decorators": [_decorator_name(decorator) for decorator in node.decorator_list],
+                "methods": [
+                    _python_function(item) for item in node.body
+                    if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))
+                ]
+            })
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            functions.append(_python_function(node))
+
+    docstring = ast.get_docstring(tree)
+    summary.update({
+        "docstring": docstring.strip().split('\n', 1)[0] if docstring else None,
+        "imports": list(dict.fromkeys(imports)),
+        "classes": classes,
+        "functions": functions,
+        "complexity": _python_complexity(tree),
+        "main_guard": any(_is_main_guard(node) for node in tree.body)
+    })
+    return summary
+
+def _is_main_guard(node):
+    """
+    Check for "if __name__ == '__main__':", which marks a script
+    """
+    return (
+        isinstance(node, ast.If)
+        and isinstance(node.test, ast.Compare)
+        and isinstance(node.test.left, ast.Name)
+        and node.test.left.id == '__name__'
+        and any(isinstance(comparator, ast.Constant) and comparator.value == '__main__' for comparator in node.test.comparators)
+    )
+
+def _python_function(node):
+    signature = f"({ast.unparse(node.args)})"
+    if node.returns is not None:
+        signature += f" -> {ast.unparse(node.returns)}"
+    return {
+        "name": node.name,
+        "line": node.lineno,
+        "signature": _clip(signature),
+        "async": isinstance(node, ast.AsyncFunctionDef),
+        "decorators": [_decorator_name(decorator) for decorator in node.decorator_list],
+        "complexity": _python_complexity(node)
+    }
+
+def _decorator_name(node):
+    # "app.route('/x', methods=[...])" -> "app.route"
+    return ast.unparse(node.func if isinstance(node, ast.Call) else node)
+
+def _python_complexity(node):
+    """
+    Cyclomatic complexity: one plus a point per branch and boolean operator
+    """
+    complexity = 1
+    for child in ast.walk(node):
+        if isinstance(child, BRANCH_NODES):
+            complexity += 1
+        elif isinstance(child, ast.BoolOp):
+            complexity += len(child.values) - 1
+        elif isinstance(child, ast.match_case):
+            complexity += 1
+    return complexity
+
+def _clip(text):
+    return text if len(text) <= MAX_SIGNATURE_LENGTH else text[:MAX_SIGNATURE_LENGTH - 3] + "..."
+
+def tokenize_javascript(source):
+    """
+    Split JavaScript or TypeScript into (kind, value, line) tokens
+
+    Comments and whitespace are dropped, and strings, template literals
+    and regular expressions become single tokens, so keywords inside them
+    are never mistaken for code. Characters the tokenizer doesn't know
+    (e.g. in JSX text) are skipped.
+    """
+    tokens = []
+    position = 0
+    line = 1
+    while position < len(source):
+        if source[position] == '/' and (not tokens or tokens[-1][1] in JS_REGEX_PRECEDERS):
+            match = JS_REGEX.match(source, position)
+            if match:
+                tokens.append(('regex', match.group(), line))
+                position = match.end()
+                continue
+
+        match = JS_TOKEN.match(source, position)
+        if not match:
+            if source[position] == '\n':
+                line += 1
+            position += 1
+            continue
+        kind = match.lastgroup
+        if kind not in ('space', 'comment'):
+            tokens.append((kind, match.group(), line))
+        line += match.group().count('\n')
+        position = match.end()
+    return tokens
+
+def extract_javascript(path, source):
+    """
+    Summarize a JavaScript or TypeScript file from its tokens
+
+    Finds ES module imports and exports, require() calls, classes and their
+    methods, function declarations, functions assigned to variables, and
+    TypeScript interfaces, type aliases and enums.
+    """
+    language = "typescript" if path.endswith(('.ts', '.tsx', '.mts', '.cts')) else "javascript"
+    summary = {"path": path, "language": language, "lines": source.count('\n') + 1}
+
+    tokens = tokenize_javascript(source)
+    values = [value for _, value, _ in tokens]
+    closing = _match_brackets(values)
+
+    imports = []
+    classes = []
+    functions = []
+    types = []
+    class_stack = []
+    pending_class = None
+    decorators = []
+    depth = 0
+
+    def token(index):
+        return tokens[index] if 0 <= index < len(tokens) else (None, None, None)
+
+    def add_function(name, open_paren, index):
+        """
+        Record a function whose parameters open at open_paren
+        """
+        close_paren = closing.get(open_paren)
+        if close_paren is None:
+            return None
+        body = close_paren + 1
+        # Skip a TypeScript return type up to the body or arrow
+        while body < len(values) and values[body] not in ('{', '=>', ';') and body - close_paren < 32:
+            body += 1
+        if body < len(values) and values[body] == '=>':
+            body += 1
+        if body < len(values) and values[body] == '{':
+            end = closing.get(body, body)
+        else:
+            end = _expression_end(values, closing, body)
+        return {
+            "name": name,
+            "line": tokens[index][2],
+            "signature": _clip("(" + _join_tokens(values[open_paren + 1:close_paren]) + ")"),
+            "async": 'async' in (values[index - 1] if index > 0 else None, values[open_paren - 1]),
+            "decorators": decorators[:],
+            "complexity": 1 + sum(1 for value in values[body:end] if value in JS_BRANCH_TOKENS)
+        }
+
+    for index, (kind, value, line) in enumerate(tokens):
+        previous = values[index - 1] if index > 0 else None
+        following = values[index + 1] if index + 1 < len(values) else None
+
+        if value == '{':
+            depth += 1
+            if pending_class is not None:
+                class_stack.append((pending_class, depth))
+                pending_class = None
+            continue
+        if value == '}':
+            depth -= 1
+            while class_stack and class_stack[-1][1] > depth:
+                class_stack.pop()
+            continue
+        if value == ';':
+            # Decorated fields end here; their decorators aren't a method's
+            decorators = []
+            continue
+        if value == '@' and token(index + 1)[0] == 'name':
+            decorators.append(following)
+            continue
+        if kind != 'name' or previous in ('.', '?.'):
+            continue
+
+        if value == 'import' and following == '(' and token(index + 2)[0] == 'string':
+            imports.append(_unquote(values[index + 2]))
+        elif value in ('import', 'export'):
+            module = _module_after(values, tokens, index)
+            if module is not None:
+                imports.append(module)
+        elif value == 'require' and following == '(' and token(index + 2)[0] == 'string':
+            imports.append(_unquote(values[index + 2]))
+
+        if value == 'class' and token(index + 1)[0] == 'name':
+            bases = []
+            if token(index + 2)[1] == 'extends':
+                position = index + 3
+                base = []
+                while position < len(values) and values[position] not in ('{', 'implements', '<'):
+                    base.append(values[position])
+                    position += 1
+                bases.append("".join(base))
+            pending_class = {
+                "name": following,
+                "line": line,
+                "bases": bases,
+                "decorators": decorators,
+                "methods": [],
+                "exported": previous in ('export', 'default')
+            }
+            classes.append(pending_class)
+            decorators = []
+        elif value == 'function':
+            position = index + 1
+            if token(position)[1] == '*':
+                position += 1
+            name = values[position] if token(position)[0] == 'name' else None
+            if name is not None:
+                position += 1
+            if token(position)[1] == '(' and name is not None and depth == 0:
+                function = add_function(name, position, index)
+                if function:
+                    # "export async function" has async between export and function
+                    leading = values[index - 2] if previous == 'async' and index > 1 else previous
+                    function["exported"] = leading in ('export', 'default')
+                    functions.append(function)
+            decorators = []
+        elif value in ('const', 'let', 'var') and token(index + 1)[0] == 'name' and token(index + 2)[1] == '=':
+            position = index + 3
+            if token(position)[1] == 'async':
+                position += 1
+            if token(position)[1] == 'function':
+                position += 1
+                if token(position)[0] == 'name':
+                    position += 1
+            function = None
+            close_paren = closing.get(position)
+            if token(position)[1] == '(' and close_paren is not None and token(close_paren + 1)[1] in ('=>', '{', ':'):
+                function = add_function(following, position, index + 1)
+            elif token(position)[0] == 'name' and token(position + 1)[1] == '=>':
+                function = {
+                    "name": following,
+                    "line": line,
+                    "signature": f"({values[position]})",
+                    "async": token(position - 1)[1] == 'async',
+                    "decorators": [],
+                    "complexity": 1 + sum(1 for value in values[position + 2:_expression_end(values, closing, position + 2)] if value in JS_BRANCH_TOKENS)
+                }
+            if function and depth == 0:
+                function["exported"] = previous == 'export'
+                functions.append(function)
+        elif value in ('interface', 'type', 'enum') and token(index + 1)[0] == 'name' and language == "typescript":
+            if value != 'type' or token(index + 2)[1] in ('=', '<'):
+                types.append({"kind": value, "name": following})
+        elif class_stack and depth == class_stack[-1][1] and previous != '@' and value not in JS_KEYWORDS - {'constructor'}:
+            # Methods, and arrow functions assigned to class fields
+            if following == '(':
+                method = add_function(value, index + 1, index)
+            elif following == '=' and token(index + 2)[1] == '(':
+                method = add_function(value, index + 2, index + 2)
+            else:
+                method = None
+            if method:
+                class_stack[-1][0]["methods"].append(method)
+                decorators = []
+
+    summary.update({
+        "docstring": None,
+        "imports": list(dict.fromkeys(imports)),
+        "classes": classes,
+        "functions": functions,
+        "types": types,
+        "complexity": 1 + sum(1 for value in values if value in JS_BRANCH_TOKENS)
+    })
+    return summary
+
+def _match_brackets(values):
+    """
+    Map each opening bracket's index to its closing bracket's index
+    """
+    pairs = {'(': ')', '{': '}', '[': ']'}
+    closing = {}
+    stack = []
+    for index, value in enumerate(values):
+        if value in pairs:
+            stack.append(index)
+        elif value in (')', '}', ']'):
+            # Unbalanced input (e.g. from JSX text) resynchronizes on the nearest match
+            while stack and pairs[values[stack[-1]]] != value:
+                stack.pop()
+            if stack:
+                closing[stack.pop()] = index
+    return closing
+
+def _expression_end(values, closing, start):
+    """
+    Find where an arrow function's expression body starting at start ends
+
+    The body runs to a semicolon, a comma or closing bracket it didn't
+    open, or the next declaration when semicolons are left out.
+    """
+    position = start
+    while position < len(values):
+        value = values[position]
+        if value in (';', ',', ')', '}', ']'):
+            break
+        if position > start and value in JS_STATEMENT_STARTS:
+            break
+        position = closing.get(position, position) + 1
+    return position
+
+def _module_after(values, tokens, index):
+    """
+    Find the module of an import or re-export statement starting at index
+    """
+    if index + 1 < len(tokens) and tokens[index + 1][0] == 'string' and values[index] == 'import':
+        return _unquote(values[index + 1])
+    for position in range(index + 1, min(index + 200, len(values) - 1)):
+        if values[position] == ';' or values[position] in ('function', 'class', 'const', 'let', 'var', 'interface', 'type', 'enum', 'default', 'async'):
+            return None
+        if values[position] == 'from' and tokens[position + 1][0] == 'string':
+            return _unquote(values[position + 1])
+    return None
+
+def _unquote(literal):
+    return literal[1:-1]
+
+def _join_tokens(values):
+    """
+    Rebuild source text from tokens, spaced after commas and colons
+    """
+    return "".join(value + (" " if value in (',', ':') else "") for value in values).strip()
+
+def _extract_batch(repo_dir, paths):
+    """
+    Read and summarize a batch of files (runs in a worker process)
+    """
+    summaries = []
+    for path in paths:
+        try:
+            with open(os.path.join(repo_dir, path), 'r', encoding='utf-8', errors='replace') as f:
+                source = f.read()
+        except OSError as e:
+            summaries.append({"path": path, "error": str(e)})
+            continue
+        try:
+            summaries.append(extract_file(path, source))
+        except RecursionError:
+            summaries.append({"path": path, "error": "File too deeply nested to parse"})
+    return summaries
+
+def summary_key(path, blob_sha):
+    """
+    Cache key of a file summary: the same contents always summarize the
+    same way, except that the extension decides the language
+    """
+    return f"summary|{EXTRACTOR_VERSION}|{os.path.splitext(path)[1]}|{blob_sha}"
+
+class CodeExtractor:
+    def __init__(self, workers=None):
+        """
+        Summarize source files across worker processes
+
+        Args:
+            workers (int): Worker processes (default: GITHUB_EXTRACT_WORKERS,
+                or one per CPU)
+        """
+        self.workers = int(workers or os.getenv('GITHUB_EXTRACT_WORKERS', os.cpu_count() or 1))
+        self._pool = None
+
+    def extract(self, repo_dir, paths):
+        """
+        Summarize every supported file in paths
+
+        Args:
+            repo_dir (str): Repository checkout
+            paths (list): File paths relative to repo_dir
+
+        Returns:
+            list: File summaries in the order of paths
+        """
+        paths = [path for path in paths if path.endswith(SOURCE_EXTENSIONS)]
+        if len(paths) <= INLINE_LIMIT or self.workers <= 1:
+            return _extract_batch(repo_dir, paths)
+
+        batches = [paths[start:start + BATCH_SIZE] for start in range(0, len(paths), BATCH_SIZE)]
+        pool = self._get_pool()
+        summaries = []
+        for batch in pool.map(_extract_batch, [repo_dir] * len(batches), batches):
+            summaries.extend(batch)
+        return summaries
+
+    def _get_pool(self):
+        """
+        Get the executor used for extraction, creating it on first use
+        """
+        if self._pool is None:
+            try:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            except Exception as e:
+                # Some serverless runtimes don't support multiprocessing
+                print(f"Process pool unavailable, extracting in threads: {e}")
+                self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+def summarize_repo(summaries, top=10):
+    """
+    Aggregate file summaries into a repository overview
+
+    Returns:
+        dict: Counts by language, totals, the most imported modules and the
+            most complex functions
+    """
+    languages = Counter()
+    imports = Counter()
+    complex_functions = []
+    totals = Counter()
+
+    for summary in summaries:
+        if 'error' in summary:
+            totals["failed"] += 1
+            continue
+        totals["parsed"] += 1
+        languages[summary['language']] += 1
+        totals["lines"] += summary['lines']
+        totals["classes"] += len(summary['classes'])
+        # Relative imports say little about the repository's dependencies
+        imports.update(module for module in summary['imports'] if not module.startswith('.'))
+
+        for function in summary['functions']:
+            totals["functions"] += 1
+            complex_functions.append((function['complexity'], summary['path'], function['name']))
+        for cls in summary['classes']:
+            for method in cls['methods']:
+                totals["functions"] += 1
+                complex_functions.append((method['complexity'], summary['path'], f"{cls['name']}.{method['name']}"))
+
+    complex_functions.sort(key=lambda item: (-item[0], item[1], item[2]))
+    return {
+        "files": len(summaries),
+        "parsed": totals["parsed"],
+        "failed": totals["failed"],
+        "languages": dict(languages),
+        "lines": totals["lines"],
+        "classes": totals["classes"],
+        "functions": totals["functions"],
+        "top_imports": [[module, count] for module, count in imports.most_common(top)],
+        "most_complex": [
+            {"path": path, "name": name, "complexity": complexity}
+            for complexity, path, name in complex_functions[:top]
+        ]
+    }
+
+def format_summary(summary):
+    """
+    Render a file summary as compact text for a prompt
+    """
+    if 'error' in summary:
+        return f"## {summary['path']} (unparsed: {summary['error']})"
+    python = summary['language'] == "python"
+
+    lines = [f"## {summary['path']} ({summary['language']}, {summary['lines']} lines)"]
+    if summary.get('docstring'):
+        lines.append(f'"{summary["docstring"]}"')
+    if summary['imports']:
+        lines.append("imports: " + ", ".join(summary['imports']))
+    for item in summary.get('types', []):
+        lines.append(f"{item['kind']} {item['name']}")
+    for cls in summary['classes']:
+        header = "".join(f"@{decorator} " for decorator in cls['decorators'])
+        if not cls['bases']:
+            header += f"class {cls['name']}"
+        elif python:
+            header += f"class {cls['name']}({', '.join(cls['bases'])})"
+        else:
+            header += f"class {cls['name']} extends {cls['bases'][0]}"
+        lines.append(header)
+        lines.extend("  " + _format_function(method, "def" if python else "") for method in cls['methods'])
+    lines.extend(_format_function(function, "def" if python else "function") for function in summary['functions'])
+    return "\n".join(lines)
+
+def _format_function(function, keyword):
+    text = "".join(f"@{decorator} " for decorator in function['decorators'])
+    text += ("async " if function['async'] else "") + (f"{keyword} " if keyword else "")
+    text += function['name'] + function['signature']
+    if function['complexity'] > 1:
+        text += f"  [complexity {function['complexity']}]"
+    return text
+
+_shared_extractor = None
+_shared_extractor_lock = threading.Lock()
+
+def get_code_extractor():
+    """
+    Get the process-wide extractor, so analyses share one worker pool
+    """
+    global _shared_extractor
+    with _shared_extractor_lock:
+        if _shared_extractor is None:
+            _shared_extractor = CodeExtractor()
+        return _shared_extractor
@@ -0,0 +1,135 @@
+import numpy as np
+from riley.learning.text_ranking import tokenize, split_sentences
+
+# TextRank damping factor
+DAMPING = 0.85
+
+# Share of the random jump that follows query relevance instead of being uniform
+QUERY_BIAS = 0.7
+
+# Final score = centrality + QUERY_WEIGHT * relevance + LEAD_WEIGHT / (1 + position),
+# each of the first two scaled to a maximum of 1
+QUERY_WEIGHT = 1.0
+LEAD_WEIGHT = 0.5
+
+# Sentences this similar to one already picked are skipped as redundant
+REDUNDANCY_THRESHOLD = 0.7
+
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-6
+
+def summarize(text, query="", max_sentences=3):
+    """
+    Summarize text by extracting its most central, query-relevant sentences
+
+    Sentences become L2-normalized TF-IDF vectors. TextRank runs over their
+    cosine similarity graph, with the random jump biased toward sentences
+    that match the query. Each sentence's centrality is then combined with
+    its direct query relevance and a bonus for coming early, since a
+    Wikipedia extract usually opens with the definition.
+
+    Args:
+        text (str): Text to summarize
+        query (str): Query the summary should answer
+        max_sentences (int): Maximum sentences to extract
+
+    Returns:
+        str: The selected sentences in their original order
+    """
+    sentences = split_sentences(text)
+    return " ".join(sentences[index] for index in select_sentences(sentences, query, max_sentences))
+
+def select_sentences(sentences, query="", max_sentences=3):
+    """
+    Pick the sentences summarize would extract
+
+    Args:
+        sentences (list): Sentences, most important context first
+        query (str): Query the summary should answer
+        max_sentences (int): Maximum sentences to select
+
+    Returns:
+        list: Indices of the selected sentences in ascending order
+    """
+    if len(sentences) <= max_sentences:
+        return list(range(len(sentences)))
+
+    vectors, vocabulary, idf = _tfidf(sentences)
+    relevance = _relevance(vectors, vocabulary, idf, query)
+    centrality = _rank(vectors, _jump_distribution(relevance))
+
+    scores = centrality / centrality.max() + LEAD_WEIGHT / (1 + np.arange(len(sentences)))
+    if relevance.max() > 0:
+        scores += QUERY_WEIGHT * relevance / relevance.max()
+
+    selected = []
+    for index in np.argsort(-scores, kind='stable'):
+        if selected and np.max(vectors[selected] @ vectors[index]) > REDUNDANCY_THRESHOLD:
+            continue
+        selected.append(index)
+        if len(selected) == max_sentences:
+            break
+
+    return sorted(int(index) for index in selected)
+
+def _tfidf(sentences):
+    """
+    Build an L2-normalized sentence-term TF-IDF matrix
+
+    Returns:
+        tuple: (matrix, vocabulary dict, idf vector)
+    """
+    tokenized = [tokenize(sentence) for sentence in sentences]
+    vocabulary = {}
+    for tokens in tokenized:
+        for token in tokens:
+            vocabulary.setdefault(token, len(vocabulary))
+
+    counts = np.zeros((len(sentences), max(len(vocabulary), 1)))
+    for row, tokens in enumerate(tokenized):
+        for token in tokens:
+            counts[row, vocabulary[token]] += 1
+
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + len(sentences)) / (1 + document_frequency)) + 1
+    vectors = counts * idf
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms), vocabulary, idf
+
+def _relevance(vectors, vocabulary, idf, query):
+    """
+    Score each sentence against the query's TF-IDF vector
+    """
+    query_vector = np.zeros(vectors.shape[1])
+    for token in tokenize(query):
+        if token in vocabulary:
+            query_vector[vocabulary[token]] += idf[vocabulary[token]]
+    return vectors @ query_vector
+
+def _jump_distribution(relevance):
+    """
+    Mix uniform and query-relevance jump probabilities
+    """
+    uniform = np.full(len(relevance), 1.0 / len(relevance))
+    if relevance.sum() <= 0:
+        return uniform
+    return (1 - QUERY_BIAS) * uniform + QUERY_BIAS * relevance / relevance.sum()
+
+def _rank(vectors, jump):
+    """
+    Run biased TextRank by power iteration over the similarity graph
+    """
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, 0)
+
+    # Sentences with no neighbours jump according to the bias
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    transition = np.where(out_weight > 0, similarity / np.where(out_weight == 0, 1, out_weight), jump)
+
+    scores = jump.copy()
+    for _ in range(MAX_ITERATIONS):
+        updated = (1 - DAMPING) * jump + DAMPING * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < TOLERANCE:
+            return updated
+        scores = updated
+    return scores
@@ -1,8 +1,31 @@
 import os
-import tempfile
+import time
 import subprocess
 import json
+import hashlib
+import threading
+from concurrent.futures import wait
+from contextlib import contextmanager, ExitStack
 from openai import OpenAI
+from riley.learning.repo_mirror import get_repo_mirror, normalize_repo_url
+from riley.learning.repo_walker import walk_repo
+from riley.learning.analysis_store import get_analysis_store
+from riley.learning.stage_graph import Stage, StageGraph
+from riley.learning.line_counter import get_line_counter
+from riley.learning.path_trie import build_path_trie, find_subtree, trim_trie, outline_trie, tree_key
+from riley.learning.code_extractor import SOURCE_EXTENSIONS, get_code_extractor, summarize_repo, summary_key
+from riley.learning.repo_sampler import (
+    TOKEN_BUDGET, RECENCY_COMMITS, package_entry_points, rank_files, pack_summaries, recency_scores
+)
+
+# Source files counted in the structure analysis
+STRUCTURE_EXTENSIONS = ('.py', '.js', '.ts', '.jsx', '.tsx')
+
+# Keys of an analysis that added stages can't use as names
+RESERVED_STAGE_NAMES = frozenset([
+    "repo_url", "commit", "repo_dir", "previous_commit", "structure", "stats", "code", "patterns",
+    "insights", "incremental", "stages", "cached", "error", "details"
+])
 
 class GitHubLearning:
     def __init__(self):
@@ -12,58 +35,175 @@ class GitHubLearning:
         self.api_key = os.getenv('OPENAI_API_KEY')
         self.client = OpenAI(api_key=self.api_key)
         self.model = os.getenv('RILEY_MODEL', 'gpt-4o')
+        self.mirrors = get_repo_mirror()
+        self.extractor = get_code_extractor()
+        self.line_counter = get_line_counter()
+        self.store = get_analysis_store()
+        self.extra_stages = []
     
-    def analyze_repo(self, repo_url):
+    def add_stage(self, stage):
         """
-        Clone a GitHub repository and analyze its code structure and patterns
+        Add a stage, such as a dependency or license scan, to every analysis
+        
+        The stage runs as soon as the stages it requires have finished,
+        alongside the rest of the analysis, and its result is returned
+        under its name. It's called with the inputs repo_url, commit,
+        repo_dir and previous_commit, plus the results of the stages it
+        requires: walk (the file listing), history (recency scores),
+        changes, structure, stats (line counts by language), extract
+        (summaries, parsed count and code overview), sample (the ranked
+        files packed into the prompt), patterns and insights.
+        
+        Args:
+            stage (Stage): The stage
+        
+        Raises:
+            ValueError: If the name is taken or its requirements are unknown or cyclic
         """
-        try:
-            # Create a temporary directory
-            with tempfile.TemporaryDirectory() as temp_dir:
-                # Clone the repository
-                clone_result = self._clone_repo(repo_url, temp_dir)
-                
-                if 'error' in clone_result:
-                    return clone_result
-                
-                # Analyze the repository structure
-                structure = self._analyze_repo_structure(temp_dir)
-                
-                # Analyze code patterns
-                patterns = self._analyze_code_patterns(temp_dir)
-                
-                # Generate insights
-                insights = self._generate_insights(structure, patterns, repo_url)
-                
-                return {
-                    "repo_url": repo_url,
-                    "structure": structure,
-                    "patterns": patterns,
-                    "insights": insights
-                }
-        except Exception as e:
-            print(f"Error in GitHub learning: {e}")
-            return {
-                "error": "Failed to analyze repository",
-                "details": str(e)
-            }
+        if stage.name in RESERVED_STAGE_NAMES:
+            raise ValueError(f"Reserved stage name: {stage.name}")
+        StageGraph(self._analysis_stages() + self.extra_stages + [stage]).order()
+        self.extra_stages.append(stage)
     
-    def _clone_repo(self, repo_url, target_dir):
+    def resolve_commit(self, repo_url, ref=None):
         """
-        Clone a GitHub repository to the target directory
+        Resolve a repository and ref to the commit an analysis would use
+        
+        Returns:
+            tuple: (normalized repository URL, commit SHA)
+        """
+        return normalize_repo_url(repo_url), self.mirrors.resolve(repo_url, ref)
+    
+    def get_tree(self, repo_url, commit=None, path="", depth=None):
+        """
+        Get part of a repository's directory tree, to expand the truncated
+        directories of an analysis's structure.tree
+        
+        Trees are stored when a commit is analyzed; one that has expired
+        from the store is listed again from a checkout.
+        
+        Args:
+            repo_url (str): Repository URL
+            commit (str): Commit SHA or ref (default: the last analyzed commit)
+            path (str): Directory to expand (default: the root)
+            depth (int): Directory levels to expand (default: GITHUB_TREE_DEPTH)
+        
+        Returns:
+            dict: repo_url, commit, path (the directory's full path) and
+                tree, or None if there's no such commit or directory
+        
+        Raises:
+            ValueError: For an unsupported repository URL
+        """
+        repo = normalize_repo_url(repo_url)
+        commit = commit or self.store.latest_commit(repo)
+        tree = self.store.get(tree_key(repo, commit)) if commit else None
+        if tree is None:
+            try:
+                with self.mirrors.checkout(repo_url, commit) as (repo_dir, commit):
+                    tree = self.store.get(tree_key(repo, commit))
+                    if tree is None:
+                        tree = build_path_trie(walk_repo(repo_dir)['files'])
+                        self.store.set(tree_key(repo, commit), tree)
+            except subprocess.CalledProcessError as e:
+                print(f"Error resolving {commit or 'HEAD'} of {repo}: {e}")
+                return None
+        
+        found = find_subtree(tree, path or "")
+        if found is None:
+            return None
+        path, subtree = found
+        return {
+            "repo_url": repo_url,
+            "commit": commit,
+            "path": path,
+            "tree": trim_trie(subtree, depth)
+        }
+    
+    def analyze_repo(self, repo_url, ref=None, force=False, progress=None):
+        """
+        Check out a GitHub repository and analyze its code structure and patterns
+        
+        Repositories are kept as mirrors between analyses, so analyzing one
+        again only fetches the commits pushed since. Analyses are stored by
+        commit SHA and returned as they are when the commit was analyzed
+        before. Otherwise only files whose contents changed are parsed
+        again, and the model is only asked again when its input changed.
+        
+        Args:
+            repo_url (str): Repository URL (https, ssh, git or file)
+            ref (str): Branch, tag or commit SHA to analyze (default: HEAD)
+            force (bool): Analyze again even if the commit was analyzed before
+            progress (callable): Called as progress(stage, status, duration_ms)
+                when each stage starts ("running") and ends ("done", "failed",
+                "timeout" or "skipped")
         """
         try:
-            # Run git clone command
-            result = subprocess.run(
-                ["git", "clone", "--depth", "1", repo_url, target_dir],
-                capture_output=True,
-                text=True,
-                check=True
-            )
+            with self._stage(progress, "resolve"):
+                repo, commit = self.resolve_commit(repo_url, ref)
+            
+            # An analyzed commit needs no checkout at all
+            stored = None if force else self.store.get_analysis(repo, commit)
+            if stored is not None:
+                return dict(stored, repo_url=repo_url, cached=True)
+            
+            previous_commit = self.store.latest_commit(repo)
+            
+            # Check out the commit from the mirror cache; the worktree is
+            # removed when the stack closes
+            with ExitStack() as checkout:
+                with self._stage(progress, "checkout"):
+                    repo_dir, commit = checkout.enter_context(self.mirrors.checkout(repo_url, commit))
+                
+                # Independent stages run side by side; a stage that fails or
+                # times out only takes the stages depending on it down
+                graph = StageGraph(self._analysis_stages() + self.extra_stages)
+                run = graph.run({
+                    "repo_url": repo_url,
+                    "commit": commit,
+                    "repo_dir": repo_dir,
+                    "previous_commit": previous_commit
+                }, progress=progress)
+                
+                # Stages that timed out may still be reading the worktree, so
+                # it's removed once they finish rather than now
+                if run['abandoned']:
+                    self._close_when_done(checkout.pop_all(), run['abandoned'])
             
+            results = run['results']
+            extract = results.get('extract')
+            code = self._stage_result(run, 'extract')
+            if extract:
+                code = dict(extract['code'], sample=results['sample']['sample'] if 'sample' in results else None)
+            analysis = {
+                "repo_url": repo_url,
+                "commit": commit,
+                "structure": self._stage_result(run, 'structure'),
+                "stats": self._stage_result(run, 'stats'),
+                "code": code,
+                "patterns": self._stage_result(run, 'patterns'),
+                "insights": self._stage_result(run, 'insights'),
+                "incremental": {
+                    "previous_commit": previous_commit,
+                    "changed_files": results.get('changes'),
+                    "files_parsed": extract['parsed'] if extract else None,
+                    "files_reused": len(extract['summaries']) - extract['parsed'] if extract else None
+                },
+                "stages": run['stages']
+            }
+            for stage in self.extra_stages:
+                analysis[stage.name] = self._stage_result(run, stage.name)
+            
+            # Partial analyses and failed model calls are retried on the next
+            # request instead of stored
+            complete = all(stage['status'] == "done" for stage in run['stages'].values())
+            if complete and 'error' not in analysis['patterns'] and 'error' not in analysis['insights']:
+                self.store.set_analysis(repo, commit, analysis)
+            return dict(analysis, cached=False)
+        except ValueError as e:
             return {
-                "status": "success",
-                "message": "Repository cloned successfully"
+                "error": "Invalid repository URL",
+                "details": str(e)
             }
         except subprocess.CalledProcessError as e:
             print(f"Error cloning repository: {e}")
@@ -71,48 +211,120 @@ class GitHubLearning:
                 "error": "Failed to clone repository",
                 "details": e.stderr
             }
+        except Exception as e:
+            print(f"Error in GitHub learning: {e}")
+            return {
+                "error": "Failed to analyze repository",
+                "details": str(e)
+            }
+    
+    @contextmanager
+    def _stage(self, progress, name):
+        """
+        Report a stage's start, and its end with the time it took, to a progress callback
+        """
+        if progress is None:
+            yield
+            return
+        
+        progress(name, "running", None)
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            progress(name, "failed", round((time.perf_counter() - started) * 1000, 1))
+            raise
+        progress(name, "done", round((time.perf_counter() - started) * 1000, 1))
     
-    def _analyze_repo_structure(self, repo_dir):
+    def _close_when_done(self, stack, futures):
+        """
+        Close an exit stack in the background once futures have finished
+        """
+        def close():
+            wait(futures)
+            try:
+                stack.close()
+            except Exception as e:
+                print(f"Error removing analysis worktree: {e}")
+        
+        threading.Thread(target=close, name="stage-cleanup", daemon=True).start()
+    
+    def _analysis_stages(self):
+        """
+        The stages of an analysis, with the stages each one needs
+        """
+        def extract(results):
+            summaries, parsed = self._extract_summaries(results['repo_url'], results['commit'], results['repo_dir'], results['walk'])
+            return {"summaries": summaries, "parsed": parsed, "code": summarize_repo(summaries)}
+        
+        return [
+            Stage("walk", lambda results: walk_repo(results['repo_dir'])),
+            Stage("history", lambda results: self._recent_changes(results['repo_url'], results['commit'])),
+            Stage("changes", lambda results: self._changed_file_count(results['repo_url'], results['previous_commit'], results['commit'])),
+            Stage("structure", lambda results: self._analyze_repo_structure(
+                results['repo_url'], results['commit'], results['walk']
+            ), requires=("walk",)),
+            Stage("stats", lambda results: self._count_lines(results['repo_dir'], results['walk']), requires=("walk",)),
+            Stage("extract", extract, requires=("walk",)),
+            Stage("sample", lambda results: self._sample_files(
+                results['repo_dir'], results['walk'], results['extract']['summaries'], results['history']
+            ), requires=("walk", "extract", "history")),
+            Stage("patterns", lambda results: self._analyze_patterns_with_openai(
+                results['sample']['text'], results['extract']['code']
+            ), requires=("extract", "sample")),
+            Stage("insights", lambda results: self._generate_insights(
+                results['structure'], results['patterns'], results['repo_url'], results['extract']['code']
+            ), requires=("structure", "extract", "patterns"))
+        ]
+    
+    def _stage_result(self, run, name):
+        """
+        A stage's result, or an error saying why it has none
+        """
+        if name in run['results']:
+            return run['results'][name]
+        stage = run['stages'][name]
+        return {
+            "error": f"Stage {name} did not finish",
+            "details": stage.get('error')
+        }
+    
+    def _analyze_repo_structure(self, repo_url, commit, walk):
         """
         Analyze the structure of the repository
+        
+        The directory tree is returned down to GITHUB_TREE_DEPTH levels and
+        GITHUB_TREE_MAX_ENTRIES entries, so it stays small for any
+        repository; the full tree is stored for get_tree to expand.
+        
+        Args:
+            repo_url (str): Repository URL
+            commit (str): The commit analyzed
+            walk (dict): The repository's files, from walk_repo
         """
         try:
-            # Get list of files
-            result = subprocess.run(
-                ["find", repo_dir, "-type", "f", "-name", "*.py", "-o", "-name", "*.js", "-o", "-name", "*.ts", "-o", "-name", "*.jsx", "-o", "-name", "*.tsx"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            
-            files = result.stdout.strip().split('\n')
+            files = [entry['path'] for entry in walk['files'] if entry['path'].endswith(STRUCTURE_EXTENSIONS)]
             
             # Count files by type
             file_types = {}
             for file in files:
-                if file:
-                    ext = os.path.splitext(file)[1]
-                    file_types[ext] = file_types.get(ext, 0) + 1
+                ext = os.path.splitext(file)[1]
+                file_types[ext] = file_types.get(ext, 0) + 1
             
             # Get directory structure
-            dir_structure = {}
-            for file in files:
-                if file:
-                    rel_path = os.path.relpath(file, repo_dir)
-                    parts = rel_path.split(os.path.sep)
-                    
-                    current = dir_structure
-                    for i, part in enumerate(parts[:-1]):
-                        if part not in current:
-                            current[part] = {}
-                        current = current[part]
-                    
-                    current[parts[-1]] = None
+            tree = build_path_trie(walk['files'])
+            self.store.set(tree_key(normalize_repo_url(repo_url), commit), tree)
             
             return {
                 "file_count": len(files),
                 "file_types": file_types,
-                "directory_structure": dir_structure
+                "tree": trim_trie(tree),
+                "walk": {
+                    "files": len(walk['files']),
+                    "directories": walk['directories'],
+                    "total_bytes": walk['total_bytes'],
+                    "skipped": walk['skipped']
+                }
             }
         except Exception as e:
             print(f"Error analyzing repository structure: {e}")
@@ -121,60 +333,115 @@ class GitHubLearning:
                 "details": str(e)
             }
     
-    def _analyze_code_patterns(self, repo_dir):
+    def _count_lines(self, repo_dir, walk):
+        """
+        Count files, code, comment and blank lines and bytes by language,
+        locally and without the model
+        
+        Args:
+            repo_dir (str): Repository checkout
+            walk (dict): The repository's files, from walk_repo
+        """
+        return self.line_counter.count(repo_dir, [entry['path'] for entry in walk['files']])
+    
+    def _extract_summaries(self, repo_url, commit, repo_dir, walk):
         """
-        Analyze code patterns in the repository
+        Summarize the source files, reusing stored summaries
+        
+        Summaries are stored by git blob SHA, so only files whose contents
+        changed since any earlier analysis are parsed again.
+        
+        Returns:
+            tuple: (summaries in path order, number of files parsed)
         """
+        paths = [entry['path'] for entry in walk['files'] if entry['path'].endswith(SOURCE_EXTENSIONS)]
+        
+        blobs = {}
+        for entry in self.mirrors.git(repo_url, ["ls-tree", "-r", "-z", commit]).split('\0'):
+            # "<mode> <type> <sha>\t<path>"
+            if '\t' in entry:
+                info, path = entry.split('\t', 1)
+                mode, kind, sha = info.split()
+                if kind == 'blob':
+                    blobs[path] = sha
+        
+        keys = {path: summary_key(path, blobs[path]) for path in paths if path in blobs}
+        stored = self.store.get_many(keys.values())
+        missing = [path for path in paths if keys.get(path) not in stored]
+        
+        parsed = {summary['path']: summary for summary in self.extractor.extract(repo_dir, missing)}
+        # Read errors have no language and may not happen next time
+        self.store.set_many({
+            keys[path]: {key: value for key, value in summary.items() if key != 'path'}
+            for path, summary in parsed.items() if path in keys and 'language' in summary
+        })
+        
+        summaries = [parsed[path] if path in parsed else dict(stored[keys[path]], path=path) for path in paths]
+        return summaries, len(parsed)
+    
+    def _changed_file_count(self, repo_url, previous_commit, commit):
+        """
+        Count the files changed since the previously analyzed commit
+        """
+        if previous_commit is None:
+            return None
         try:
-            # Sample a few files for analysis
-            result = subprocess.run(
-                ["find", repo_dir, "-type", "f", "-name", "*.py", "-o", "-name", "*.js", "-o", "-name", "*.ts"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            
-            files = result.stdout.strip().split('\n')
-            
-            # Sample up to 5 files
-            sample_files = files[:5] if len(files) > 5 else files
-            
-            # Read file contents
-            file_contents = {}
-            for file in sample_files:
-                if file:
-                    try:
-                        with open(file, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            file_contents[os.path.relpath(file, repo_dir)] = content
-                    except Exception as e:
-                        print(f"Error reading file {file}: {e}")
-            
-            # Analyze patterns using OpenAI
-            patterns = self._analyze_patterns_with_openai(file_contents)
-            
-            return patterns
-        except Exception as e:
-            print(f"Error analyzing code patterns: {e}")
-            return {
-                "error": "Failed to analyze code patterns",
-                "details": str(e)
+            return len(self.mirrors.git(repo_url, ["diff", "--name-only", "--no-renames", previous_commit, commit]).splitlines())
+        except subprocess.SubprocessError as e:
+            # The previous commit may be gone after a force push
+            print(f"Error comparing commits: {e}")
+            return None
+    
+    def _recent_changes(self, repo_url, commit):
+        """
+        Score files by how recently they changed, from the last RECENCY_COMMITS commits
+        """
+        try:
+            log = self.mirrors.git(repo_url, ["log", "--format=%H", "--name-only", "--no-renames", "-n", str(RECENCY_COMMITS), commit])
+            return recency_scores(log)
+        except subprocess.SubprocessError as e:
+            print(f"Error reading repository history: {e}")
+            return {}
+    
+    def _sample_files(self, repo_dir, walk, summaries, recency):
+        """
+        Rank source files by importance (entry points, import-graph
+        centrality, size and how recently they changed) and pack the most
+        important files' summaries into the token budget, so prompt cost
+        stays the same whatever the repository's size
+        
+        Returns:
+            dict: text (the packed summaries) and sample (what was included)
+        """
+        paths = [entry['path'] for entry in walk['files']]
+        ranking = rank_files(summaries, entry_points=package_entry_points(repo_dir, paths), recency=recency)
+        summary_text, included, tokens = pack_summaries(summaries, ranking, TOKEN_BUDGET)
+        return {
+            "text": summary_text,
+            "sample": {
+                "files": len(included),
+                "tokens": tokens,
+                "token_budget": TOKEN_BUDGET,
+                "top_files": ranking[:10]
             }
+        }
     
-    def _analyze_patterns_with_openai(self, file_contents):
+    def _analyze_patterns_with_openai(self, summary_text, code):
         """
-        Use OpenAI to analyze code patterns in the files
+        Use OpenAI to analyze code patterns in the file summaries
         """
         try:
             # Prepare the content for analysis
-            content_text = ""
-            for file_path, content in file_contents.items():
-                content_text += f"\n\n--- {file_path} ---\n{content[:2000]}"  # Limit content size
+            overview = json.dumps({key: code[key] for key in ("languages", "top_imports", "most_complex")})
+            content_text = f"Overview: {overview}\n\n{summary_text}"
             
             # Create a system prompt for pattern analysis
             system_prompt = """
             You are Riley, an advanced AI specialized in code analysis.
-            Analyze the provided code samples and identify:
+            The code is given as per-file summaries: imports, classes with
+            their bases and methods, and functions with their signatures,
+            decorators and cyclomatic complexity.
+            Analyze the provided code summaries and identify:
             1. Design patterns used
             2. Code organization approaches
             3. Common libraries and frameworks
@@ -185,19 +452,7 @@ class GitHubLearning:
             """
             
             # Use OpenAI to analyze patterns
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Analyze these code samples:\n{content_text}"}
-                ],
-                response_format={"type": "json_object"}
-            )
-            
-            # Parse the response
-            patterns = json.loads(response.choices[0].message.content)
-            
-            return patterns
+            return self._complete_json("patterns", system_prompt, f"Analyze these code summaries:\n{content_text}")
         except Exception as e:
             print(f"Error in OpenAI pattern analysis: {e}")
             return {
@@ -205,14 +460,21 @@ class GitHubLearning:
                 "details": str(e)
             }
     
-    def _generate_insights(self, structure, patterns, repo_url):
+    def _generate_insights(self, structure, patterns, repo_url, code):
         """
         Generate insights based on the repository analysis
         """
         try:
-            # Prepare the content for insight generation
+            # Prepare the content for insight generation; walk statistics,
+            # file sizes and sample scores change with every commit, so
+            # they're left out to keep the input (and the stored answer) the
+            # same when code isn't
+            layout = {key: value for key, value in structure.items() if key not in ('walk', 'tree')}
+            if 'tree' in structure:
+                layout['tree'] = outline_trie(structure['tree'])
             analysis_json = json.dumps({
-                "structure": structure,
+                "structure": layout,
+                "code": {key: value for key, value in code.items() if key != 'sample'},
                 "patterns": patterns,
                 "repo_url": repo_url
             })
@@ -231,22 +493,39 @@ class GitHubLearning:
             """
             
             # Use OpenAI to generate insights
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Generate insights based on this repository analysis:\n{analysis_json}"}
-                ],
-                response_format={"type": "json_object"}
-            )
-            
-            # Parse the response
-            insights = json.loads(response.choices[0].message.content)
-            
-            return insights
+            return self._complete_json("insights", system_prompt, f"Generate insights based on this repository analysis:\n{analysis_json}")
         except Exception as e:
             print(f"Error generating insights: {e}")
             return {
                 "error": "Failed to generate insights",
                 "details": str(e)
             }
+    
+    def _complete_json(self, stage, system_prompt, user_content):
+        """
+        Ask the model for a JSON object, reusing the stored answer to an identical prompt
+        
+        Args:
+            stage (str): Name of the analysis stage, part of the cache key
+            system_prompt (str): The system prompt
+            user_content (str): The user message
+        """
+        digest = hashlib.sha256(f"{self.model}\0{system_prompt}\0{user_content}".encode()).hexdigest()
+        key = f"{stage}|{digest}"
+        stored = self.store.get(key)
+        if stored is not None:
+            return stored
+        
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_content}
+            ],
+            response_format={"type": "json_object"}
+        )
+        
+        # Parse the response
+        result = json.loads(response.choices[0].message.content)
+        self.store.set(key, result)
+        return result
@@ -0,0 +1,339 @@
+import os
+import mmap
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Files counted per worker task; workers return totals, not per-file rows
+BATCH_SIZE = 512
+
+# Repositories this small are counted in the calling process
+INLINE_LIMIT = 256
+
+# Files at least this large are memory-mapped instead of read whole
+MMAP_THRESHOLD = 256 * 1024
+
+# Bytes checked for NUL to tell binary files apart
+BINARY_SNIFF_BYTES = 8192
+
+HASH_COMMENTS = (b'#',)
+SLASH_COMMENTS = (b'//',)
+C_BLOCKS = ((b'/*', b'*/'),)
+XML_BLOCKS = ((b'<!--', b'-->'),)
+
+# Language -> (line comment markers, (block start, block end) pairs)
+LANGUAGES = {
+    "Python": (HASH_COMMENTS, ((b'"""', b'"""'), (b"'''", b"'''"))),
+    "JavaScript": (SLASH_COMMENTS, C_BLOCKS),
+    "TypeScript": (SLASH_COMMENTS, C_BLOCKS),
+    "JSX": (SLASH_COMMENTS, C_BLOCKS),
+    "TSX": (SLASH_COMMENTS, C_BLOCKS),
+    "Java": (SLASH_COMMENTS, C_BLOCKS),
+    "Kotlin": (SLASH_COMMENTS, C_BLOCKS),
+    "Scala": (SLASH_COMMENTS, C_BLOCKS),
+    "C": (SLASH_COMMENTS, C_BLOCKS),
+    "C/C++ Header": (SLASH_COMMENTS, C_BLOCKS),
+    "C++": (SLASH_COMMENTS, C_BLOCKS),
+    "C#": (SLASH_COMMENTS, C_BLOCKS),
+    "Go": (SLASH_COMMENTS, C_BLOCKS),
+    "Rust": (SLASH_COMMENTS, C_BLOCKS),
+    "Swift": (SLASH_COMMENTS, C_BLOCKS),
+    "Dart": (SLASH_COMMENTS, C_BLOCKS),
+    "PHP": (SLASH_COMMENTS + HASH_COMMENTS, C_BLOCKS),
+    "CSS": ((), C_BLOCKS),
+    "SCSS": (SLASH_COMMENTS, C_BLOCKS),
+    "Less": (SLASH_COMMENTS, C_BLOCKS),
+    "Ruby": (HASH_COMMENTS, ((b'=begin', b'=end'),)),
+    "Perl": (HASH_COMMENTS, ((b'=pod', b'=cut'),)),
+    "Shell": (HASH_COMMENTS, ()),
+    "PowerShell": (HASH_COMMENTS, ((b'<#', b'#>'),)),
+    "R": (HASH_COMMENTS, ()),
+    "YAML": (HASH_COMMENTS, ()),
+    "TOML": (HASH_COMMENTS, ()),
+    "INI": ((b';', b'#'), ()),
+    "Makefile": (HASH_COMMENTS, ()),
+    "Dockerfile": (HASH_COMMENTS, ()),
+    "CMake": (HASH_COMMENTS, ()),
+    "SQL": ((b'--',), C_BLOCKS),
+    "Lua": ((b'--',), ((b'--[[', b']]'),)),
+    "Haskell": ((b'--',), ((b'{-', b'-}'),)),
+    "Elixir": (HASH_COMMENTS, ()),
+    "Erlang": ((b'%',), ()),
+    "Clojure": ((b';',), ()),
+    "Vim Script": ((b'"',), ()),
+    "HTML": ((), XML_BLOCKS),
+    "XML": ((), XML_BLOCKS),
+    "Vue": (SLASH_COMMENTS, C_BLOCKS + XML_BLOCKS),
+    "Svelte": (SLASH_COMMENTS, C_BLOCKS + XML_BLOCKS),
+    "JSON": ((), ()),
+    "Markdown": ((), XML_BLOCKS),
+    "reStructuredText": ((), ()),
+    "Text": ((), ())
+}
+
+EXTENSIONS = {
+    '.py': "Python", '.pyi': "Python", '.pyw': "Python",
+    '.js': "JavaScript", '.mjs': "JavaScript", '.cjs': "JavaScript",
+    '.ts': "TypeScript", '.mts': "TypeScript", '.cts': "TypeScript",
+    '.jsx': "JSX", '.tsx': "TSX",
+    '.java': "Java", '.kt': "Kotlin", '.kts': "Kotlin", '.scala': "Scala",
+    '.c': "C", '.h': "C/C++ Header", '.hpp': "C/C++ Header", '.hh': "C/C++ Header",
+    '.cc': "C++", '.cpp': "C++", '.cxx': "C++", '.cs': "C#",
+    '.go': "Go", '.rs': "Rust", '.swift': "Swift", '.dart': "Dart", '.php': "PHP",
+    '.css': "CSS", '.scss': "SCSS", '.sass': "SCSS", '.less': "Less",
+    '.rb': "Ruby", '.rake': "Ruby", '.pl': "Perl", '.pm': "Perl",
+    '.sh': "Shell", '.bash': "Shell", '.zsh': "Shell", '.ps1': "PowerShell",
+    '.r': "R", '.yml': "YAML", '.yaml': "YAML", '.toml': "TOML",
+    '.ini': "INI", '.cfg': "INI", '.mk': "Makefile", '.cmake': "CMake",
+    '.sql': "SQL", '.lua': "Lua", '.hs': "Haskell", '.ex': "Elixir", '.exs': "Elixir",
+    '.erl': "Erlang", '.clj': "Clojure", '.vim': "Vim Script",
+    '.html': "HTML", '.htm': "HTML", '.xml': "XML", '.svg': "XML",
+    '.vue': "Vue", '.svelte': "Svelte", '.json': "JSON",
+    '.md': "Markdown", '.markdown': "Markdown", '.rst': "reStructuredText", '.txt': "Text"
+}
+
+FILENAMES = {
+    'makefile': "Makefile", 'gnumakefile': "Makefile", 'dockerfile': "Dockerfile",
+    'cmakelists.txt': "CMake", 'rakefile': "Ruby", 'gemfile': "Ruby", 'vagrantfile': "Ruby"
+}
+
+# Interpreter named on a "#!" line -> language
+INTERPRETERS = {
+    'python': "Python", 'python2': "Python", 'python3': "Python",
+    'node': "JavaScript", 'nodejs': "JavaScript", 'deno': "TypeScript", 'ts-node': "TypeScript",
+    'sh': "Shell", 'bash': "Shell", 'zsh': "Shell", 'dash': "Shell", 'ksh': "Shell",
+    'ruby': "Ruby", 'perl': "Perl", 'php': "PHP", 'lua': "Lua", 'Rscript': "R",
+    'pwsh': "PowerShell", 'elixir': "Elixir", 'escript': "Erlang"
+}
+
+def detect_language(path, first_line=None):
+    """
+    Detect a file's language from its name, or from its "#!" line
+
+    Args:
+        path (str): File path
+        first_line (bytes): The file's first line, for files the name doesn't settle
+
+    Returns:
+        str: The language, or None
+    """
+    name = os.path.basename(path).lower()
+    if name in FILENAMES:
+        return FILENAMES[name]
+    language = EXTENSIONS.get(os.path.splitext(name)[1])
+    if language or not first_line or not first_line.startswith(b'#!'):
+        return language
+
+    # "#!/usr/bin/env python3 -u" or "#!/bin/bash"
+    words = first_line[2:].decode('utf-8', 'replace').split()
+    if words and os.path.basename(words[0]) == 'env':
+        words = [word for word in words[1:] if not word.startswith('-') and '=' not in word]
+    if not words:
+        return None
+    interpreter = os.path.basename(words[0])
+    return INTERPRETERS.get(interpreter) or INTERPRETERS.get(interpreter.rstrip('0123456789.'))
+
+def count_lines(lines, language):
+    """
+    Count a file's code, comment and blank lines, the way cloc does: a line
+    with any code is code, a line with only comments is a comment, and a
+    line with only whitespace is blank (inside block comments too)
+
+    Args:
+        lines (iterable): The file's lines, as bytes
+        language (str): A key of LANGUAGES
+
+    Returns:
+        tuple: (code, comment, blank)
+    """
+    line_markers, blocks = LANGUAGES[language]
+    docstrings = language == "Python"
+    markers = [(marker, None) for marker in line_markers] + list(blocks)
+    code = comment = blank = 0
+    block_end = None
+    # Whether the open block is a string literal (code) rather than a comment
+    in_string = False
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            blank += 1
+            continue
+        if block_end is None and not markers:
+            code += 1
+            continue
+
+        has_code = has_comment = False
+        while line:
+            if block_end is not None:
+                if in_string:
+                    has_code = True
+                else:
+                    has_comment = True
+                end = line.find(block_end)
+                if end < 0:
+                    break
+                line = line[end + len(block_end):].lstrip()
+                block_end = None
+                in_string = False
+                continue
+
+            # The earliest comment start on the rest of the line
+            position, start, end = -1, None, None
+            for marker, marker_end in markers:
+                found = line.find(marker)
+                if found >= 0 and (position < 0 or found < position):
+                    position, start, end = found, marker, marker_end
+
+            if position < 0:
+                has_code = True
+                break
+            if position > 0:
+                has_code = True
+            # Python's triple quotes only start a comment as a docstring;
+            # after code they open a string, which is code up to its end
+            in_string = docstrings and end is not None and has_code
+            if not in_string:
+                has_comment = True
+            if end is None:
+                break
+            block_end = end
+            line = line[position + len(start):]
+
+        if has_code:
+            code += 1
+        elif has_comment:
+            comment += 1
+    return code, comment, blank
+
+def _count_file(path):
+    """
+    Count one file
+
+    Returns:
+        tuple: (language, code, comment, blank, bytes), or (kind, None, ...) for
+            a file that wasn't counted, where kind is "unrecognized", "binary"
+            or "unreadable"
+    """
+    language = detect_language(path)
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        head = f.read(min(size, BINARY_SNIFF_BYTES))
+        if language is None:
+            language = detect_language(path, head.split(b'\n', 1)[0])
+            if language is None:
+                return ("unrecognized", None, None, None, size)
+        if b'\0' in head:
+            return ("binary", None, None, None, size)
+        if size == 0:
+            return (language, 0, 0, 0, 0)
+
+        if size >= MMAP_THRESHOLD:
+            # mmap's readline scans in C and never holds the file as one string
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                code, comment, blank = count_lines(iter(mapped.readline, b''), language)
+        else:
+            data = head + f.read() if size > len(head) else head
+            code, comment, blank = count_lines(data.splitlines(), language)
+    return (language, code, comment, blank, size)
+
+def _count_batch(repo_dir, paths):
+    """
+    Count a batch of files (runs in a worker process)
+
+    Returns:
+        tuple: (per-language [files, code, comment, blank, bytes] totals,
+            counts of files left out by reason)
+    """
+    languages = {}
+    left_out = Counter()
+    for path in paths:
+        try:
+            language, code, comment, blank, size = _count_file(os.path.join(repo_dir, path))
+        except (OSError, ValueError):
+            left_out["unreadable"] += 1
+            continue
+        if code is None:
+            left_out[language] += 1
+            continue
+        totals = languages.setdefault(language, [0, 0, 0, 0, 0])
+        totals[0] += 1
+        totals[1] += code
+        totals[2] += comment
+        totals[3] += blank
+        totals[4] += size
+    return languages, left_out
+
+class LineCounter:
+    def __init__(self, workers=None):
+        """
+        Count lines of code by language across worker processes
+
+        Args:
+            workers (int): Worker processes (default: GITHUB_STATS_WORKERS,
+                or one per CPU)
+        """
+        self.workers = int(workers or os.getenv('GITHUB_STATS_WORKERS', os.cpu_count() or 1))
+        self._pool = None
+
+    def count(self, repo_dir, paths):
+        """
+        Count the files in paths
+
+        Args:
+            repo_dir (str): Repository checkout
+            paths (list): File paths relative to repo_dir
+
+        Returns:
+            dict: languages (language -> files, code, comment, blank and
+                bytes, most code first), total, and the files left out
+                (unrecognized, binary, unreadable)
+        """
+        if len(paths) <= INLINE_LIMIT or self.workers <= 1:
+            batches = [_count_batch(repo_dir, paths)]
+        else:
+            chunks = [paths[start:start + BATCH_SIZE] for start in range(0, len(paths), BATCH_SIZE)]
+            batches = self._get_pool().map(_count_batch, [repo_dir] * len(chunks), chunks)
+
+        languages = {}
+        left_out = Counter()
+        for batch_languages, batch_left_out in batches:
+            for language, counts in batch_languages.items():
+                totals = languages.setdefault(language, [0, 0, 0, 0, 0])
+                for index, value in enumerate(counts):
+                    totals[index] += value
+            left_out.update(batch_left_out)
+
+        fields = ("files", "code", "comment", "blank", "bytes")
+        rows = sorted(languages.items(), key=lambda item: (-item[1][1], item[0]))
+        return {
+            "languages": {language: dict(zip(fields, counts)) for language, counts in rows},
+            "total": dict(zip(fields, (sum(counts[index] for counts in languages.values()) for index in range(len(fields))))),
+            "left_out": {reason: left_out[reason] for reason in ("unrecognized", "binary", "unreadable")}
+        }
+
+    def _get_pool(self):
+        """
+        Get the executor used for counting, creating it on first use
+        """
+        if self._pool is None:
+            try:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            except Exception as e:
+                # Some serverless runtimes don't support multiprocessing
+                print(f"Process pool unavailable, counting lines in threads: {e}")
+                self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+_shared_counter = None
+_shared_counter_lock = threading.Lock()
+
+def get_line_counter():
+    """
+    Get the process-wide line counter, so analyses share one worker pool
+    """
+    global _shared_counter
+    with _shared_counter_lock:
+        if _shared_counter is None:
+            _shared_counter = LineCounter()
+        return _shared_counter
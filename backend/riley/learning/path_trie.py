@@ -0,0 +1,145 @@
+import os
+from collections import deque
+
+# Directory levels of a tree returned by default
+TREE_DEPTH = int(os.getenv('GITHUB_TREE_DEPTH', 3))
+
+# Directories and files listed in one tree response, whatever the repository's size
+TREE_MAX_ENTRIES = int(os.getenv('GITHUB_TREE_MAX_ENTRIES', 500))
+
+def build_path_trie(entries):
+    """
+    Build a compact directory tree from a file listing
+
+    Directories hold the number and total size of the files beneath them.
+    Chains of directories holding nothing but one directory are merged into
+    one node named by their joined path ("src/main/java"), so deep package
+    layouts take one node instead of one per level.
+
+    Args:
+        entries (list): Files, as dicts with path and size (from walk_repo)
+
+    Returns:
+        dict: The root directory: name, files, bytes, dirs (child
+            directories, by name) and leaves ([name, size] pairs, by name)
+    """
+    root = _directory()
+    for entry in entries:
+        parts = entry['path'].split('/')
+        node = root
+        node["files"] += 1
+        node["bytes"] += entry['size']
+        for part in parts[:-1]:
+            node = node["dirs"].setdefault(part, _directory())
+            node["files"] += 1
+            node["bytes"] += entry['size']
+        node["leaves"].append([parts[-1], entry['size']])
+    return _compact("", root)
+
+def _directory():
+    return {"files": 0, "bytes": 0, "dirs": {}, "leaves": []}
+
+def _compact(name, node):
+    while len(node["dirs"]) == 1 and not node["leaves"]:
+        child_name, node = next(iter(node["dirs"].items()))
+        name = f"{name}/{child_name}" if name else child_name
+    return {
+        "name": name,
+        "files": node["files"],
+        "bytes": node["bytes"],
+        "dirs": [_compact(child_name, child) for child_name, child in sorted(node["dirs"].items())],
+        "leaves": sorted(node["leaves"])
+    }
+
+def find_subtree(root, path):
+    """
+    Find the directory at path
+
+    Args:
+        root (dict): A tree from build_path_trie
+        path (str): Directory path; part of a merged node's name finds that node
+
+    Returns:
+        tuple: (the directory's full path, the directory), or None if
+            there's none at path
+    """
+    parts = [part for part in path.strip('/').split('/') if part]
+    found = []
+    node = root
+    while parts:
+        for child in node["dirs"]:
+            names = child["name"].split('/')
+            if names[:len(parts)] == parts or parts[:len(names)] == names:
+                parts = parts[len(names):]
+                found.extend(names)
+                node = child
+                break
+        else:
+            return None
+    return "/".join(found), node
+
+def trim_trie(root, depth=None, max_entries=None):
+    """
+    Cut a tree down to its top levels, within an entry budget
+
+    Directories are expanded breadth first, down to depth levels and while
+    their entries fit the budget. The rest keep their counts and are marked
+    truncated, to be expanded with their own request. The top directory is
+    always expanded, listing as many entries as fit and counting the rest
+    as omitted.
+
+    Args:
+        root (dict): A tree, or subtree, from build_path_trie
+        depth (int): Directory levels to expand (default: GITHUB_TREE_DEPTH)
+        max_entries (int): Directories and files listed (default: GITHUB_TREE_MAX_ENTRIES)
+
+    Returns:
+        dict: The trimmed tree
+    """
+    depth = TREE_DEPTH if depth is None else depth
+    budget = max_entries or TREE_MAX_ENTRIES
+
+    top = _stub(root)
+    queue = deque([(root, top, 0)])
+    while queue:
+        node, trimmed, level = queue.popleft()
+        entries = len(node["dirs"]) + len(node["leaves"])
+        if level > 0 and (level >= depth or entries > budget):
+            continue
+
+        dirs = node["dirs"][:budget]
+        leaves = node["leaves"][:budget - len(dirs)]
+        budget -= len(dirs) + len(leaves)
+        del trimmed["truncated"]
+        trimmed["dirs"] = []
+        trimmed["leaves"] = leaves
+        if len(dirs) + len(leaves) < entries:
+            trimmed["omitted"] = entries - len(dirs) - len(leaves)
+        for child in dirs:
+            stub = _stub(child)
+            trimmed["dirs"].append(stub)
+            queue.append((child, stub, level + 1))
+    return top
+
+def _stub(node):
+    return {"name": node["name"], "files": node["files"], "bytes": node["bytes"], "truncated": True}
+
+def outline_trie(root):
+    """
+    A tree without sizes, which change with every edit, for prompts whose
+    answers are reused while the layout stays the same
+    """
+    outline = {"name": root["name"], "files": root["files"]}
+    for key in ("truncated", "omitted"):
+        if key in root:
+            outline[key] = root[key]
+    if "dirs" in root:
+        outline["dirs"] = [outline_trie(child) for child in root["dirs"]]
+        outline["leaves"] = [name for name, _ in root["leaves"]]
+    return outline
+
+def tree_key(repo, commit):
+    """
+    Store key of a commit's full tree
+    """
+    return f"tree|{repo}|{commit}"
@@ -0,0 +1,178 @@
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+# Quotes and punctuation trimmed from both ends of each word; inner
+# characters stay, so "c++", "u.s." and "o'brien" survive
+TRIM_CHARACTERS = "\"'`?!,;:()[]{}<>«»“”‘’„"
+
+# Longest spelling correction, in edits (insertions, deletions,
+# substitutions and adjacent transpositions)
+MAX_EDIT_DISTANCE = 2
+
+# Words shorter than this are never corrected, since too many real words
+# are an edit apart; words up to LONG_WORD_LENGTH allow a single edit
+MIN_CORRECTION_LENGTH = 4
+LONG_WORD_LENGTH = 7
+
+# Deletes are only generated for a word's first PREFIX_LENGTH characters,
+# which keeps the dictionary small (as in SymSpell)
+PREFIX_LENGTH = 7
+
+WORD = re.compile(r"^[^\W\d_][\w.'-]*$")
+
+def fold(query):
+    """
+    Fold unicode variants, case, whitespace and surrounding punctuation
+
+    Returns:
+        list: The query's words
+    """
+    text = unicodedata.normalize('NFKC', query).casefold()
+    return [word for word in (word.strip(TRIM_CHARACTERS) for word in text.split()) if word]
+
+def edit_distance(a, b, limit):
+    """
+    Optimal string alignment distance between two words
+
+    Returns:
+        int: The distance, or limit + 1 when it exceeds limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        # A transposition can reach back two rows, so both must be over the limit
+        if min(current) > limit and min(previous) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+def _deletes(word, distance):
+    """
+    Every string reachable from word by up to distance deletions, word included
+    """
+    found = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {candidate[:i] + candidate[i + 1:] for candidate in frontier for i in range(len(candidate))}
+        found |= frontier
+    return found
+
+class QueryNormalizer:
+    def __init__(self, titles=(), max_edit_distance=MAX_EDIT_DISTANCE):
+        """
+        Turn free-text queries into stable cache keys
+
+        Spelling corrections come from a SymSpell-style dictionary of the
+        words in known article titles: each word is indexed under every
+        string reachable by deleting up to max_edit_distance characters, so
+        a lookup only compares the few words that share a delete with it.
+
+        Args:
+            titles (iterable): Article titles to learn from
+            max_edit_distance (int): Longest correction, in edits
+        """
+        self.max_edit_distance = max_edit_distance
+        self.words = Counter()
+        self.titles = set()
+        self._deletes = {}
+        self._lock = threading.Lock()
+        self.add_titles(titles)
+
+    def add_titles(self, titles):
+        """
+        Learn the words of article titles
+        """
+        with self._lock:
+            for title in titles:
+                words = fold(title)
+                key = " ".join(words)
+                if not key or key in self.titles:
+                    continue
+                self.titles.add(key)
+                for word in words:
+                    if WORD.match(word) and word not in self.words:
+                        for delete in _deletes(word[:PREFIX_LENGTH], self.max_edit_distance):
+                            self._deletes.setdefault(delete, set()).add(word)
+                    self.words[word] += 1
+
+    def normalize(self, query):
+        """
+        Get the cache key for a query
+
+        Folds unicode, case, whitespace and punctuation. An inverted name
+        such as "Einstein, Albert" is turned around only when the result is
+        a known title, so "Paris, Texas" stays as it is.
+
+        Returns:
+            str: The normalized key
+        """
+        words = fold(query)
+
+        text = unicodedata.normalize('NFKC', query)
+        if text.count(',') == 1:
+            last, first = (fold(part) for part in text.split(','))
+            inverted = " ".join(first + last)
+            if 1 <= len(last) <= 3 and 1 <= len(first) <= 3 and inverted in self.titles:
+                return inverted
+
+        return " ".join(words)
+
+    def correct(self, key):
+        """
+        Correct the unknown words of a normalized key
+
+        Each unknown word becomes the closest dictionary word, preferring
+        the one that appears in more titles. Words that are known, short or
+        have no close match are kept.
+
+        Returns:
+            str: The corrected key, or key itself when nothing changed
+        """
+        return " ".join(self.lookup(word) or word for word in key.split())
+
+    def lookup(self, word):
+        """
+        Find the best dictionary word for a word
+
+        Returns:
+            str: The word itself if known, its correction, or None
+        """
+        with self._lock:
+            if word in self.words:
+                return word
+            if len(word) < MIN_CORRECTION_LENGTH or not WORD.match(word):
+                return None
+
+            limit = min(self.max_edit_distance, 1 if len(word) <= LONG_WORD_LENGTH else 2)
+            candidates = set()
+            for delete in _deletes(word[:PREFIX_LENGTH], limit):
+                candidates |= self._deletes.get(delete, set())
+
+            best = None
+            for candidate in candidates:
+                distance = edit_distance(word, candidate, limit)
+                if distance > limit:
+                    continue
+                rank = (distance, -self.words[candidate], candidate)
+                if best is None or rank < best:
+                    best = rank
+            return best[2] if best else None
+
+    def get_metrics(self):
+        with self._lock:
+            return {
+                "titles": len(self.titles),
+                "words": len(self.words),
+                "deletes": len(self._deletes)
+            }
@@ -0,0 +1,385 @@
+import os
+import re
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+import subprocess
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from riley.learning.cache_paths import default_cache_path
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: fall back to in-process locks only
+    fcntl = None
+
+# Seconds a mirror counts as fresh after a fetch, so back-to-back analyses
+# of the same repository don't fetch again
+FETCH_TTL = float(os.getenv('GITHUB_MIRROR_FETCH_TTL', 60))
+
+# Seconds any single git command may take
+GIT_TIMEOUT = float(os.getenv('GITHUB_GIT_TIMEOUT', 600))
+
+# Marker files in each mirror: the mtime of the first orders mirrors for
+# eviction, the second says when the mirror was last fetched
+LAST_USED_FILE = "riley-last-used"
+LAST_FETCHED_FILE = "riley-last-fetched"
+
+# git@github.com:owner/repo(.git)
+SCP_URL = re.compile(r'^(?P<user>[\w.-]+)@(?P<host>[\w.-]+):(?P<path>[^/].*)$')
+
+def normalize_repo_url(repo_url):
+    """
+    Reduce the ways of writing a repository URL to one
+
+    "https://GitHub.com/Owner/Repo.git/", "git@github.com:owner/repo" and
+    "https://github.com/owner/repo" are the same repository. GitHub paths
+    are case-insensitive, so they're lowercased; other hosts keep their case.
+
+    Returns:
+        str: The normalized URL
+
+    Raises:
+        ValueError: For anything but http(s), ssh, git and file URLs
+    """
+    url = repo_url.strip()
+
+    match = SCP_URL.match(url)
+    if match:
+        url = f"ssh://{match.group('user')}@{match.group('host')}/{match.group('path')}"
+
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https', 'ssh', 'git', 'file'):
+        raise ValueError(f"Unsupported repository URL: {repo_url}")
+
+    if parts.scheme == 'file':
+        return "file://" + os.path.normpath(parts.path)
+
+    host = (parts.hostname or "").lower()
+    path = re.sub(r'(\.git)?/*$', '', parts.path)
+    if not host or not path.strip('/'):
+        raise ValueError(f"Unsupported repository URL: {repo_url}")
+
+    if host in ('github.com', 'www.github.com'):
+        # Any clone URL of a GitHub repository is fetched over https
+        return "https://github.com" + path.lower()
+
+    port = f":{parts.port}" if parts.port else ""
+    user = f"{parts.username}@" if parts.username and parts.scheme == 'ssh' else ""
+    return f"{parts.scheme}://{user}{host}{port}{path}"
+
+class RepoMirror:
+    def __init__(self, root=None, quota_bytes=None):
+        """
+        Initialize a persistent cache of bare repository mirrors
+
+        Each repository is cloned once with "git clone --mirror" and then
+        kept current with incremental fetches. Analyses check out the commit
+        they need into a throwaway worktree, so concurrent analyses of
+        different commits share one object store. When the mirrors outgrow
+        the quota, the least recently used ones are deleted.
+
+        Args:
+            root (str): Directory for mirrors and worktrees (default:
+                GITHUB_MIRROR_DIR, else repo_mirrors in the cache directory)
+            quota_bytes (int): Disk quota for all mirrors (default: GITHUB_MIRROR_QUOTA_MB)
+        """
+        self.root = root or os.getenv('GITHUB_MIRROR_DIR') or default_cache_path('repo_mirrors')
+        self.quota_bytes = int(quota_bytes or float(os.getenv('GITHUB_MIRROR_QUOTA_MB', 2048)) * 1024 * 1024)
+        # Partial clones skip historical file contents; blobs are fetched
+        # on demand for the commits that are checked out
+        self.filter = os.getenv('GITHUB_MIRROR_FILTER', 'blob:none')
+
+        self.mirrors_dir = os.path.join(self.root, 'mirrors')
+        self.worktrees_dir = os.path.join(self.root, 'worktrees')
+        self.locks_dir = os.path.join(self.root, 'locks')
+        # Created on first use, so building the cache writes nothing
+        self._directories_ready = False
+
+        self._locks = {}
+        self._active = {}
+        self._locks_guard = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "clones": 0,
+            "fetches": 0,
+            "fresh_hits": 0,
+            "checkouts": 0,
+            "evictions": 0,
+            "evicted_bytes": 0
+        }
+
+    def mirror_key(self, repo_url):
+        """
+        Directory name for a repository: a readable slug plus a hash of its normalized URL
+        """
+        normalized = normalize_repo_url(repo_url)
+        slug = re.sub(r'[^\w.-]+', '-', normalized.split('://', 1)[1]).strip('-')[-48:]
+        return f"{slug}-{hashlib.sha1(normalized.encode()).hexdigest()[:12]}"
+
+    def update(self, repo_url, force=False):
+        """
+        Clone the mirror if it's missing, otherwise fetch new commits
+
+        A mirror fetched less than FETCH_TTL seconds ago isn't fetched again
+        unless force is set. Least recently used mirrors are evicted after a
+        clone or fetch.
+
+        Returns:
+            str: Path of the bare mirror
+
+        Raises:
+            subprocess.CalledProcessError: When git fails, e.g. for a private
+                or missing repository
+        """
+        normalized = normalize_repo_url(repo_url)
+        key = self.mirror_key(repo_url)
+        path = os.path.join(self.mirrors_dir, f"{key}.git")
+
+        with self._locks_guard:
+            thread_lock = self._locks.setdefault(key, threading.Lock())
+
+        with thread_lock, self._file_lock(f"{key}.update"):
+            fetched = True
+            if not os.path.isdir(path):
+                self._clone(normalized, path)
+            elif force or time.time() - _mtime(os.path.join(path, LAST_FETCHED_FILE)) > FETCH_TTL:
+                self._git(["fetch", "--prune", "--force", "origin"], cwd=path)
+                self._count("fetches")
+                self._touch(path, LAST_FETCHED_FILE)
+            else:
+                self._count("fresh_hits")
+                fetched = False
+            self._touch(path, LAST_USED_FILE)
+
+        # Mirrors only grow on a clone or fetch, so that's the only time the
+        # quota can be newly exceeded and the mirrors are worth walking
+        if fetched:
+            self.evict(keep={key})
+        return path
+
+    def resolve(self, repo_url, ref=None):
+        """
+        Resolve a branch, tag or SHA (default: HEAD) to a commit SHA in the mirror
+        """
+        path = self.update(repo_url)
+        return self._git(["rev-parse", "--verify", f"{ref or 'HEAD'}^{{commit}}"], cwd=path).strip()
+
+    @contextmanager
+    def checkout(self, repo_url, ref=None):
+        """
+        Check out a commit into a temporary worktree
+
+        Usage:
+            with mirror.checkout(url, sha) as (worktree, sha):
+                ...
+
+        The worktree is removed on exit. The mirror can't be evicted while
+        it's checked out.
+
+        Yields:
+            tuple: (worktree path, commit SHA)
+        """
+        key = self.mirror_key(repo_url)
+
+        with self._locks_guard:
+            self._active[key] = self._active.get(key, 0) + 1
+        try:
+            # Held until the worktree is gone, so no process evicts the mirror
+            with self._file_lock(f"{key}.use", shared=True):
+                mirror_path = self.update(repo_url)
+                sha = self._git(["rev-parse", "--verify", f"{ref or 'HEAD'}^{{commit}}"], cwd=mirror_path).strip()
+                worktree = os.path.join(self.worktrees_dir, f"{key}-{sha[:12]}-{uuid.uuid4().hex[:8]}")
+                with self._worktree(mirror_path, worktree, sha):
+                    yield worktree, sha
+        finally:
+            with self._locks_guard:
+                self._active[key] -= 1
+
+    @contextmanager
+    def _worktree(self, mirror_path, worktree, sha):
+        """
+        Add a detached worktree, removing it on exit
+        """
+        self._git(["worktree", "add", "--detach", worktree, sha], cwd=mirror_path)
+        self._count("checkouts")
+        try:
+            yield
+        finally:
+            try:
+                self._git(["worktree", "remove", "--force", worktree], cwd=mirror_path)
+            except subprocess.SubprocessError as e:
+                print(f"Error removing worktree {worktree}: {e}")
+                shutil.rmtree(worktree, ignore_errors=True)
+                self._git(["worktree", "prune"], cwd=mirror_path, check=False)
+
+    def git(self, repo_url, args):
+        """
+        Run a read-only git command (e.g. diff or ls-tree) in a repository's mirror
+
+        Returns:
+            str: The command's output
+        """
+        return self._git(args, cwd=self.update(repo_url))
+
+    def evict(self, keep=()):
+        """
+        Delete least recently used mirrors until the total size fits the quota
+
+        Mirrors in keep, and mirrors another thread or process is using,
+        are never deleted.
+
+        Returns:
+            list: Keys of the evicted mirrors
+        """
+        mirrors = []
+        for entry in self._mirror_entries():
+            if entry.name.endswith('.git'):
+                mirrors.append((_mtime(os.path.join(entry.path, LAST_USED_FILE)), entry.name[:-len('.git')], entry.path, _directory_size(entry.path)))
+
+        total = sum(size for _, _, _, size in mirrors)
+        evicted = []
+        for _, key, path, size in sorted(mirrors):
+            if total <= self.quota_bytes:
+                break
+            with self._locks_guard:
+                active = self._active.get(key, 0)
+            if key in keep or active:
+                continue
+            with self._file_lock(f"{key}.use", blocking=False) as unused, \
+                    self._file_lock(f"{key}.update", blocking=False) as idle:
+                if not (unused and idle):
+                    continue
+                shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            evicted.append(key)
+            with self._metrics_lock:
+                self._metrics["evictions"] += 1
+                self._metrics["evicted_bytes"] += size
+        return evicted
+
+    def get_metrics(self):
+        """
+        Get cache counters and current disk usage
+        """
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+
+        mirrors = [entry.path for entry in self._mirror_entries()]
+        metrics["mirrors"] = len(mirrors)
+        metrics["bytes"] = sum(_directory_size(path) for path in mirrors)
+        metrics["quota_bytes"] = self.quota_bytes
+        return metrics
+
+    def _mirror_entries(self):
+        """
+        Directories in the mirrors directory, which doesn't exist before the first clone
+        """
+        try:
+            return [entry for entry in os.scandir(self.mirrors_dir) if entry.is_dir()]
+        except FileNotFoundError:
+            return []
+
+    def _ensure_directories(self):
+        if not self._directories_ready:
+            for directory in (self.mirrors_dir, self.worktrees_dir, self.locks_dir):
+                os.makedirs(directory, exist_ok=True)
+            self._directories_ready = True
+
+    def _clone(self, url, path):
+        """
+        Clone into a temporary directory first, so a failed clone leaves no half-made mirror
+        """
+        partial = f"{path}.partial-{uuid.uuid4().hex[:8]}"
+        args = ["clone", "--mirror", "--quiet"]
+        if self.filter and not url.startswith("file://"):
+            args.append(f"--filter={self.filter}")
+        try:
+            self._git(args + [url, partial])
+            os.rename(partial, path)
+        finally:
+            shutil.rmtree(partial, ignore_errors=True)
+        self._count("clones")
+        self._touch(path, LAST_FETCHED_FILE)
+
+    def _git(self, args, cwd=None, check=True):
+        result = subprocess.run(
+            ["git"] + args,
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+            timeout=GIT_TIMEOUT,
+            check=check,
+            # Fail instead of waiting for credentials on private repositories
+            env=dict(os.environ, GIT_TERMINAL_PROMPT="0")
+        )
+        return result.stdout
+
+    @contextmanager
+    def _file_lock(self, name, shared=False, blocking=True):
+        """
+        Lock a file in the locks directory against other processes
+
+        Clones and fetches hold a mirror's ".update" lock; checkouts share
+        its ".use" lock, which eviction needs exclusively. Yields False when
+        blocking is off and the lock is busy. Without fcntl (Windows) only
+        in-process locking applies.
+        """
+        self._ensure_directories()
+        if fcntl is None:
+            yield True
+            return
+
+        with open(os.path.join(self.locks_dir, f"{name}.lock"), 'a') as lock_file:
+            mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+            try:
+                fcntl.flock(lock_file, mode if blocking else mode | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _touch(self, path, name):
+        marker = os.path.join(path, name)
+        with open(marker, 'a'):
+            pass
+        os.utime(marker)
+
+    def _count(self, name):
+        with self._metrics_lock:
+            self._metrics[name] += 1
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return 0.0
+
+def _directory_size(path):
+    total = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(directory, name)).st_size
+            except OSError:
+                pass
+    return total
+
+_shared_mirror = None
+_shared_mirror_lock = threading.Lock()
+
+def get_repo_mirror():
+    """
+    Get the process-wide mirror cache
+    """
+    global _shared_mirror
+    with _shared_mirror_lock:
+        if _shared_mirror is None:
+            _shared_mirror = RepoMirror()
+        return _shared_mirror
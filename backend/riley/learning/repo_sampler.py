@@ -0,0 +1,328 @@
+import os
+import re
+import json
+import math
+import posixpath
+from riley.learning.code_extractor import PYTHON_EXTENSIONS, JAVASCRIPT_EXTENSIONS, format_summary
+
+# Estimated tokens of file summaries sent for pattern analysis
+TOKEN_BUDGET = int(os.getenv('GITHUB_SUMMARY_TOKEN_BUDGET', 6000))
+
+# Weights of the importance signals, each scaled to 0..1
+ENTRY_POINT_WEIGHT = 0.3
+CENTRALITY_WEIGHT = 0.35
+SIZE_WEIGHT = 0.15
+RECENCY_WEIGHT = 0.2
+
+# Tests repeat the code they test, so they rank well below it
+TEST_PENALTY = 0.3
+
+# Files that start a program or a web app
+ENTRY_POINT_NAMES = frozenset([
+    "main.py", "__main__.py", "app.py", "server.py", "manage.py", "cli.py", "wsgi.py", "asgi.py",
+    "index.js", "index.ts", "index.tsx", "main.js", "main.ts", "main.tsx", "app.js", "app.ts",
+    "server.js", "server.ts", "cli.js", "cli.ts"
+])
+
+# Next.js routes are entry points too
+ROUTE_FILE = re.compile(r'(^|/)(pages|app)/(.+/)?(page|layout|route|_app|index)\.[jt]sx?$')
+
+TEST_FILE = re.compile(r'(^|/)(tests?|__tests__|spec)/|(^|/)(test_[^/]*|[^/]*_test)\.py$|\.(test|spec)\.[jt]sx?$')
+
+# Letter runs, short digit groups and single symbols, roughly as a BPE
+# tokenizer splits code
+TOKEN_PIECE = re.compile(r'[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]')
+
+# Letters per token in a long identifier
+LETTERS_PER_TOKEN = 5
+
+# Commits of history searched for recently changed files
+RECENCY_COMMITS = 200
+
+COMMIT_HASH = re.compile(r'[0-9a-f]{40}|[0-9a-f]{64}')
+
+PAGERANK_DAMPING = 0.85
+PAGERANK_ITERATIONS = 30
+
+def count_tokens(text):
+    """
+    Estimate the LLM token count of code or code summaries
+
+    Counts identifiers by length, digit groups and every symbol, which
+    tracks BPE tokenizers on code much better than a characters-per-token
+    ratio, since punctuation-dense text has more tokens per character.
+    """
+    return sum(
+        -(-len(piece) // LETTERS_PER_TOKEN) if piece[0].isalpha() else 1
+        for piece in TOKEN_PIECE.findall(text)
+    )
+
+def package_entry_points(repo_dir, paths):
+    """
+    Find the files package.json files name as "main", "module" or "bin"
+
+    Args:
+        repo_dir (str): Repository checkout
+        paths (list): File paths relative to repo_dir
+
+    Returns:
+        set: Entry point paths
+    """
+    known = set(paths)
+    entry_points = set()
+    for path in paths:
+        if posixpath.basename(path) != 'package.json':
+            continue
+        try:
+            with open(os.path.join(repo_dir, path), 'r', encoding='utf-8') as f:
+                package = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading {path}: {e}")
+            continue
+        if not isinstance(package, dict):
+            continue
+
+        targets = [package.get('main'), package.get('module')]
+        targets.extend(package['bin'].values() if isinstance(package.get('bin'), dict) else [package.get('bin')])
+        for target in targets:
+            if isinstance(target, str):
+                resolved = _resolve_script(posixpath.dirname(path), target, known)
+                if resolved:
+                    entry_points.add(resolved)
+    return entry_points
+
+def _resolve_script(directory, target, known):
+    candidate = posixpath.normpath(posixpath.join(directory, target))
+    for path in [candidate] + [candidate + ext for ext in JAVASCRIPT_EXTENSIONS] + [f"{candidate}/index{ext}" for ext in JAVASCRIPT_EXTENSIONS]:
+        if path in known:
+            return path
+    return None
+
+class ImportResolver:
+    def __init__(self, paths):
+        """
+        Map import statements to files in the repository
+
+        Python modules are indexed by every suffix of their dotted name, so
+        "riley.learning.wiki_http" finds backend/riley/learning/wiki_http.py
+        whatever the source root. JavaScript paths are indexed the same way
+        without extensions, for "@/lib/utils" style aliases.
+
+        Args:
+            paths (list): File paths relative to the repository root
+        """
+        self.paths = set(paths)
+        self.python = {}
+        self.javascript = {}
+
+        for path in paths:
+            parts = path.rsplit('.', 1)[0].split('/')
+            if path.endswith(PYTHON_EXTENSIONS):
+                # A package is imported by its directory's name
+                names = [parts[:-1] if parts[-1] == '__init__' else parts]
+                index = self.python
+            elif path.endswith(JAVASCRIPT_EXTENSIONS):
+                names = [parts, parts[:-1]] if parts[-1] == 'index' else [parts]
+                index = self.javascript
+            else:
+                continue
+            for name in names:
+                for start in range(len(name)):
+                    index.setdefault(tuple(name[start:]), []).append(path)
+
+    def resolve(self, importer, module):
+        """
+        Find the file an import refers to
+
+        Returns:
+            str: The imported file's path, or None for external modules
+        """
+        if importer.endswith(PYTHON_EXTENSIONS):
+            return self._resolve_python(importer, module)
+        return self._resolve_javascript(importer, module)
+
+    def _resolve_python(self, importer, module):
+        if module.startswith('.'):
+            level = len(module) - len(module.lstrip('.'))
+            package = importer.split('/')[:-1]
+            if level > 1:
+                package = package[:-(level - 1)] if level - 1 <= len(package) else None
+            if package is None:
+                return None
+            parts = module.lstrip('.').split('.') if module.strip('.') else []
+            # "from .module import name" may name a submodule or an attribute
+            for end in range(len(parts), -1, -1):
+                base = "/".join(package + parts[:end])
+                for candidate in (f"{base}.py", f"{base}/__init__.py"):
+                    if candidate in self.paths:
+                        return candidate
+            return None
+
+        parts = module.split('.')
+        for end in range(len(parts), 0, -1):
+            matches = self.python.get(tuple(parts[:end]))
+            if matches:
+                return _closest(importer, matches)
+        return None
+
+    def _resolve_javascript(self, importer, module):
+        if module.startswith('.'):
+            base = posixpath.normpath(posixpath.join(posixpath.dirname(importer), module))
+            return _resolve_script("", base, self.paths)
+        if module.startswith(('@/', '~/')):
+            matches = self.javascript.get(tuple(posixpath.normpath(module[2:]).split('/')))
+            return _closest(importer, matches) if matches else None
+        # Bare specifiers ("react", "@scope/pkg") are packages
+        return None
+
+def _closest(importer, matches):
+    """
+    Pick the match sharing the longest directory prefix with the importer
+    """
+    directory = importer.split('/')[:-1]
+
+    def shared(path):
+        count = 0
+        for a, b in zip(directory, path.split('/')[:-1]):
+            if a != b:
+                break
+            count += 1
+        return count
+
+    return min(matches, key=lambda path: (-shared(path), len(path), path))
+
+def import_graph(summaries):
+    """
+    Build the repository's internal import graph
+
+    Returns:
+        dict: path -> set of paths it imports
+    """
+    resolver = ImportResolver([summary['path'] for summary in summaries])
+    graph = {}
+    for summary in summaries:
+        edges = set()
+        for module in summary.get('imports', []):
+            target = resolver.resolve(summary['path'], module)
+            if target and target != summary['path']:
+                edges.add(target)
+        graph[summary['path']] = edges
+    return graph
+
+def pagerank(graph):
+    """
+    Rank files by how much of the codebase depends on them
+
+    Returns:
+        dict: path -> score, summing to 1
+    """
+    nodes = sorted(graph)
+    if not nodes:
+        return {}
+    count = len(nodes)
+    rank = dict.fromkeys(nodes, 1.0 / count)
+    for _ in range(PAGERANK_ITERATIONS):
+        # Files that import nothing spread their rank evenly
+        dangling = sum(rank[node] for node in nodes if not graph[node])
+        following = dict.fromkeys(nodes, (1 - PAGERANK_DAMPING) / count + PAGERANK_DAMPING * dangling / count)
+        for node in nodes:
+            if graph[node]:
+                share = PAGERANK_DAMPING * rank[node] / len(graph[node])
+                for target in graph[node]:
+                    following[target] += share
+        rank = following
+    return rank
+
+def rank_files(summaries, entry_points=(), recency=None):
+    """
+    Order file summaries by importance
+
+    Args:
+        summaries (list): File summaries, from the code extractor
+        entry_points (set): Paths known to be entry points, e.g. from package.json
+        recency (dict): path -> 0..1, higher for more recently changed files
+
+    Returns:
+        list: {"path", "score"} dicts, most important first; ties are broken
+            by path, so the same tree always ranks the same way
+    """
+    recency = recency or {}
+    parsed = [summary for summary in summaries if 'error' not in summary]
+    centrality = pagerank(import_graph(parsed))
+    top_centrality = max(centrality.values(), default=0) or 1
+    max_lines = math.log1p(max((summary['lines'] for summary in parsed), default=0)) or 1
+
+    ranking = []
+    for summary in summaries:
+        path = summary['path']
+        if 'error' in summary:
+            ranking.append({"path": path, "score": 0.0})
+            continue
+
+        entry_point = (
+            path in entry_points
+            or posixpath.basename(path) in ENTRY_POINT_NAMES
+            or bool(ROUTE_FILE.search(path))
+            or summary.get('main_guard', False)
+        )
+        score = (
+            ENTRY_POINT_WEIGHT * entry_point
+            + CENTRALITY_WEIGHT * centrality.get(path, 0) / top_centrality
+            + SIZE_WEIGHT * math.log1p(summary['lines']) / max_lines
+            + RECENCY_WEIGHT * recency.get(path, 0)
+        )
+        if TEST_FILE.search(path):
+            score *= TEST_PENALTY
+        ranking.append({"path": path, "score": round(score, 4)})
+
+    ranking.sort(key=lambda item: (-item['score'], item['path']))
+    return ranking
+
+def pack_summaries(summaries, ranking, token_budget=None):
+    """
+    Render the most important file summaries that fit in a token budget
+
+    Files are taken in ranked order, skipping any that no longer fit, so
+    small summaries still fill the space a large one leaves.
+
+    Returns:
+        tuple: (text, paths included, estimated tokens)
+    """
+    token_budget = token_budget or TOKEN_BUDGET
+    by_path = {summary['path']: summary for summary in summaries}
+
+    blocks = []
+    included = []
+    used = 0
+    for item in ranking:
+        block = format_summary(by_path[item['path']])
+        tokens = count_tokens(block) + 2
+        if used + tokens > token_budget:
+            continue
+        blocks.append(block)
+        included.append(item['path'])
+        used += tokens
+    return "\n\n".join(blocks), included, used
+
+def recency_scores(log_output):
+    """
+    Score files by how recently they changed, from "git log --format=%H --name-only"
+
+    The files of the newest commit score 1, falling linearly towards 0 over
+    the commits in the log; files absent from it score 0.
+
+    Returns:
+        dict: path -> score
+    """
+    commits = []
+    for line in log_output.split('\n'):
+        if COMMIT_HASH.fullmatch(line):
+            commits.append([])
+        elif line and commits:
+            commits[-1].append(line)
+
+    scores = {}
+    for position, paths in enumerate(commits):
+        for path in paths:
+            scores.setdefault(path, 1 - position / len(commits))
+    return scores
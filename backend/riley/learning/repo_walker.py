@@ -0,0 +1,254 @@
+import os
+import re
+import stat
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+# Directories that hold dependencies, build output or VCS data rather than
+# the repository's own code
+SKIP_DIRS = frozenset([
+    ".git", ".hg", ".svn", "node_modules", "bower_components", "vendor", "third_party",
+    "__pycache__", ".venv", "venv", ".tox", ".nox", ".mypy_cache", ".pytest_cache",
+    ".next", ".nuxt", "dist", "build", "target", ".gradle", ".idea", ".vscode"
+])
+
+# Files larger than this are skipped; generated bundles and data dumps
+# tell an analysis little
+MAX_FILE_BYTES = int(float(os.getenv('GITHUB_MAX_FILE_KB', 1024)) * 1024)
+
+# Files past this total (in path order) are skipped
+MAX_TOTAL_BYTES = int(float(os.getenv('GITHUB_MAX_TOTAL_MB', 512)) * 1024 * 1024)
+
+WALK_WORKERS = int(os.getenv('GITHUB_WALK_WORKERS', 8))
+
+class IgnoreRule:
+    def __init__(self, base, pattern):
+        """
+        One .gitignore pattern
+
+        Args:
+            base (str): Directory of the .gitignore, relative to the repository root ("" at the root)
+            pattern (str): The pattern, without comments or trailing spaces
+        """
+        self.base = base
+        self.negated = pattern.startswith('!')
+        if self.negated:
+            pattern = pattern[1:]
+        elif pattern.startswith('\\'):
+            pattern = pattern[1:]
+
+        self.directory_only = pattern.endswith('/')
+        pattern = pattern.rstrip('/')
+
+        # A slash anywhere but the end ties the pattern to the .gitignore's directory
+        self.anchored = '/' in pattern
+        self.regex = re.compile(_translate(pattern.lstrip('/')) + r'\Z', re.DOTALL)
+
+    def matches(self, path, is_dir):
+        """
+        Check a path relative to the repository root
+        """
+        if self.directory_only and not is_dir:
+            return False
+        if self.base:
+            if not path.startswith(self.base + '/'):
+                return False
+            path = path[len(self.base) + 1:]
+        if self.anchored:
+            return bool(self.regex.match(path))
+        return bool(self.regex.match(path.rsplit('/', 1)[-1]))
+
+def _translate(pattern):
+    """
+    Translate a gitignore glob into a regular expression
+    """
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            parts.append(r'(?:.*/)?')
+            i += 3
+        elif pattern.startswith('/**', i) and i + 3 == len(pattern):
+            parts.append(r'/.*')
+            i += 3
+        elif pattern.startswith('**', i):
+            parts.append(r'.*')
+            i += 2
+        elif pattern[i] == '*':
+            parts.append(r'[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            parts.append(r'[^/]')
+            i += 1
+        elif pattern[i] == '[' and ']' in pattern[i + 2:]:
+            end = pattern.index(']', i + 2)
+            body = pattern[i + 1:end]
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            parts.append('[' + body.replace('\\', '\\\\') + ']')
+            i = end + 1
+        elif pattern[i] == '\\' and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return ''.join(parts)
+
+def read_gitignore(path, base):
+    """
+    Parse a .gitignore file
+
+    Returns:
+        list: IgnoreRules in file order
+    """
+    rules = []
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.rstrip('\n')
+                if not line.strip() or line.startswith('#'):
+                    continue
+                # Trailing spaces are ignored unless escaped
+                if not line.endswith('\\ '):
+                    line = line.rstrip()
+                rules.append(IgnoreRule(base, line))
+    except OSError as e:
+        print(f"Error reading {path}: {e}")
+    return rules
+
+def is_ignored(rules, path, is_dir):
+    """
+    Apply rules like git: the last matching pattern wins
+    """
+    for rule in reversed(rules):
+        if rule.matches(path, is_dir):
+            return not rule.negated
+    return False
+
+def walk_repo(root, max_file_bytes=None, max_total_bytes=None, workers=None):
+    """
+    List a repository's files in one pass
+
+    Directories are scanned with os.scandir on a thread pool, so wide
+    trees are read in parallel. .gitignore files are honored at every
+    level, SKIP_DIRS are never entered and symlinks aren't followed.
+
+    Args:
+        root (str): Repository checkout
+        max_file_bytes (int): Skip larger files (default: GITHUB_MAX_FILE_KB)
+        max_total_bytes (int): Stop adding files past this total (default: GITHUB_MAX_TOTAL_MB)
+        workers (int): Scanning threads (default: GITHUB_WALK_WORKERS)
+
+    Returns:
+        dict: files (path, relative with "/" separators, size and mtime,
+            sorted by path), directories scanned, total_bytes and counts of
+            skipped entries by reason
+    """
+    max_file_bytes = max_file_bytes or MAX_FILE_BYTES
+    max_total_bytes = max_total_bytes or MAX_TOTAL_BYTES
+
+    files = []
+    directories = 0
+    skipped = {"ignored": 0, "skipped_dirs": 0, "symlinks": 0, "too_large": 0, "over_total": 0, "unreadable": 0}
+
+    # Each scan reports back through the queue, and its subdirectories are
+    # submitted as it arrives; waiting on a set of futures instead costs
+    # time proportional to the number in flight
+    results = queue.Queue()
+
+    def scan(path, relative, rules):
+        try:
+            results.put(_scan_directory(path, relative, rules, max_file_bytes))
+        except BaseException as e:
+            results.put(e)
+
+    with ThreadPoolExecutor(max_workers=workers or WALK_WORKERS, thread_name_prefix="repo-walk") as pool:
+        pool.submit(scan, root, "", [])
+        outstanding = 1
+        while outstanding:
+            result = results.get()
+            outstanding -= 1
+            if isinstance(result, BaseException):
+                raise result
+            found, subdirectories, counts = result
+            directories += 1
+            files.extend(found)
+            for reason, count in counts.items():
+                skipped[reason] += count
+            for path, relative, rules in subdirectories:
+                pool.submit(scan, path, relative, rules)
+                outstanding += 1
+
+    # Apply the total cap in path order, so the same tree always keeps the same files
+    files.sort(key=lambda entry: entry['path'])
+    total = 0
+    kept = []
+    for entry in files:
+        if total + entry['size'] > max_total_bytes:
+            skipped["over_total"] += 1
+            continue
+        total += entry['size']
+        kept.append(entry)
+
+    return {
+        "files": kept,
+        "directories": directories,
+        "total_bytes": total,
+        "skipped": skipped
+    }
+
+def _scan_directory(path, relative, rules, max_file_bytes):
+    """
+    Scan one directory
+
+    Returns:
+        tuple: (files, subdirectories to scan with their rules, skip counts)
+    """
+    counts = {"ignored": 0, "skipped_dirs": 0, "symlinks": 0, "too_large": 0, "unreadable": 0}
+
+    gitignore = os.path.join(path, '.gitignore')
+    if os.path.isfile(gitignore):
+        rules = rules + read_gitignore(gitignore, relative)
+
+    files = []
+    subdirectories = []
+    try:
+        entries = list(os.scandir(path))
+    except OSError as e:
+        print(f"Error scanning {path}: {e}")
+        counts["unreadable"] += 1
+        return files, subdirectories, counts
+
+    for entry in entries:
+        # In a worktree or submodule .git is a file pointing at the repository
+        if entry.name == '.git':
+            counts["skipped_dirs"] += 1
+            continue
+        entry_path = f"{relative}/{entry.name}" if relative else entry.name
+        try:
+            if entry.is_symlink():
+                counts["symlinks"] += 1
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name in SKIP_DIRS:
+                    counts["skipped_dirs"] += 1
+                elif is_ignored(rules, entry_path, True):
+                    counts["ignored"] += 1
+                else:
+                    subdirectories.append((entry.path, entry_path, rules))
+                continue
+
+            info = entry.stat(follow_symlinks=False)
+            if not stat.S_ISREG(info.st_mode):
+                continue
+            if is_ignored(rules, entry_path, False):
+                counts["ignored"] += 1
+            elif info.st_size > max_file_bytes:
+                counts["too_large"] += 1
+            else:
+                files.append({"path": entry_path, "size": info.st_size, "mtime": info.st_mtime})
+        except OSError:
+            counts["unreadable"] += 1
+
+    return files, subdirectories, counts
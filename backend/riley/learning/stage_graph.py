@@ -0,0 +1,175 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Seconds a stage may run before its dependents are skipped
+STAGE_TIMEOUT = float(os.getenv('GITHUB_STAGE_TIMEOUT', 300))
+
+# Stages run at once
+STAGE_WORKERS = int(os.getenv('GITHUB_STAGE_WORKERS', 4))
+
+class Stage:
+    def __init__(self, name, run, requires=(), timeout=None):
+        """
+        One step of a pipeline
+
+        Args:
+            name (str): Unique name; the stage's result is stored under it
+            run (callable): Called as run(results), where results holds the
+                pipeline's inputs and the result of every stage it requires
+            requires (tuple): Names of stages whose results it needs
+            timeout (float): Seconds it may run (default: GITHUB_STAGE_TIMEOUT)
+        """
+        self.name = name
+        self.run = run
+        self.requires = tuple(requires)
+        self.timeout = float(timeout or STAGE_TIMEOUT)
+
+class StageGraph:
+    def __init__(self, stages=(), workers=None):
+        """
+        Run stages as a dependency graph
+
+        Every stage starts as soon as the stages it requires have finished,
+        so independent stages run side by side and the run takes as long as
+        its longest chain rather than the sum of its stages. A stage that
+        raises or times out only takes down the stages that depend on it;
+        everything else still finishes, so callers get partial results.
+
+        Args:
+            stages (iterable): Stages to add
+            workers (int): Stages run at once (default: GITHUB_STAGE_WORKERS)
+        """
+        self.stages = {}
+        self.workers = int(workers or STAGE_WORKERS)
+        for stage in stages:
+            self.add(stage)
+
+    def add(self, stage):
+        """
+        Add a stage; the stages it requires may be added later
+
+        Raises:
+            ValueError: If a stage of the same name exists
+        """
+        if stage.name in self.stages:
+            raise ValueError(f"Duplicate stage: {stage.name}")
+        self.stages[stage.name] = stage
+
+    def order(self):
+        """
+        Sort the stages so each comes after those it requires
+
+        Returns:
+            list: Stage names
+
+        Raises:
+            ValueError: For a missing requirement or a cycle
+        """
+        ordered = []
+        state = {}
+
+        def visit(name, path):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Stage cycle: {' -> '.join(path + [name])}")
+            if name not in self.stages:
+                raise ValueError(f"Stage {path[-1]} requires unknown stage {name}")
+            state[name] = "visiting"
+            for requirement in self.stages[name].requires:
+                visit(requirement, path + [name])
+            state[name] = "done"
+            ordered.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return ordered
+
+    def run(self, inputs=None, progress=None):
+        """
+        Run every stage
+
+        Args:
+            inputs (dict): Values available to every stage, e.g. paths
+            progress (callable): Called as progress(stage, status, duration_ms)
+                when a stage starts ("running") and ends ("done", "failed",
+                "timeout" or "skipped")
+
+        Returns:
+            dict: results (stage name -> result, for the stages that
+                finished), stages (stage name -> status, duration_ms and
+                any error), in dependency order, and abandoned (futures of
+                stages that timed out and are still running, which callers
+                must let finish before freeing anything the stages use)
+        """
+        order = self.order()
+        results = dict(inputs or {})
+        report = {name: {"status": "pending", "duration_ms": None} for name in order}
+
+        def finish(name, status, duration_ms=None, error=None):
+            report[name] = {"status": status, "duration_ms": duration_ms}
+            if error is not None:
+                report[name]["error"] = error
+            if progress is not None:
+                progress(name, status, duration_ms)
+
+        # Stages abandoned after a timeout keep their thread until they
+        # return, so the pool has a thread for every stage and at most
+        # workers are started at once; an abandoned stage never holds up
+        # the rest, and a stage's deadline starts when it does. The pool
+        # isn't waited for on the way out
+        pool = ThreadPoolExecutor(max_workers=max(1, len(order)), thread_name_prefix="stage")
+        running = {}
+        abandoned = []
+        try:
+            while True:
+                # Skip stages whose requirements can no longer be met, then
+                # start stages whose requirements are done while workers are free
+                for name in order:
+                    if report[name]["status"] != "pending":
+                        continue
+                    stage = self.stages[name]
+                    statuses = [report[requirement]["status"] for requirement in stage.requires]
+                    if any(status in ("failed", "timeout", "skipped") for status in statuses):
+                        finish(name, "skipped", error="A required stage did not finish")
+                    elif all(status == "done" for status in statuses) and len(running) < self.workers:
+                        report[name]["status"] = "running"
+                        if progress is not None:
+                            progress(name, "running", None)
+                        started = time.perf_counter()
+                        future = pool.submit(stage.run, dict(results))
+                        running[future] = (name, started, started + stage.timeout)
+
+                if not running:
+                    break
+
+                now = time.perf_counter()
+                done, _ = wait(running, timeout=max(0, min(deadline for _, _, deadline in running.values()) - now), return_when=FIRST_COMPLETED)
+                now = time.perf_counter()
+
+                for future in done:
+                    name, started, _ = running.pop(future)
+                    duration_ms = round((now - started) * 1000, 1)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        print(f"Error in stage {name}: {e}")
+                        finish(name, "failed", duration_ms, str(e))
+                    else:
+                        finish(name, "done", duration_ms)
+
+                for future, (name, started, deadline) in list(running.items()):
+                    if now >= deadline:
+                        del running[future]
+                        if not future.cancel():
+                            abandoned.append(future)
+                        finish(name, "timeout", round((now - started) * 1000, 1), f"Stage timed out after {self.stages[name].timeout:g} seconds")
+        finally:
+            pool.shutdown(wait=False)
+
+        return {
+            "results": {name: results[name] for name in order if name in results},
+            "stages": report,
+            "abandoned": abandoned
+        }
@@ -0,0 +1,81 @@
+import re
+import numpy as np
+
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by for from has have he her his i if in into is it its
+of on or she so than that the their them then there these they this to was were what
+when where which who whom why will with you your
+""".split())
+
+def tokenize(text):
+    """
+    Split text into lowercase terms, dropping stopwords and plural endings
+    """
+    return [stem(token) for token in TOKEN_PATTERN.findall(text.casefold()) if token not in STOPWORDS]
+
+def stem(token):
+    """
+    Minimal English stemmer that only removes plural endings
+
+    Follows Lucene's EnglishMinimalStemmer: "pythons" -> "python",
+    "libraries" -> "library", while "gas", "bus" and "class" are kept.
+    Queries and documents are stemmed alike, so odd stems still match.
+    """
+    if len(token) < 3 or token[-1] != 's':
+        return token
+    if token.endswith('ies') and not token.endswith(('eies', 'aies')):
+        return token[:-3] + 'y'
+    if token.endswith('es') and not token.endswith(('aes', 'ees', 'oes')):
+        return token[:-1]
+    if len(token) > 3 and token[-2] not in 'us':
+        return token[:-1]
+    return token
+
+def bm25_idf(document_frequency, document_count):
+    """
+    BM25 inverse document frequency (the non-negative Lucene variant)
+    """
+    document_frequency = np.asarray(document_frequency, dtype=np.float64)
+    return np.log1p((document_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+def bm25_term_scores(term_frequencies, document_lengths, average_length, idf, k1=BM25_K1, b=BM25_B):
+    """
+    Score one term across many documents
+
+    Args:
+        term_frequencies (array): Occurrences of the term in each document
+        document_lengths (array): Length in terms of each document
+        average_length (float): Mean document length in the collection
+        idf (float): The term's inverse document frequency
+
+    Returns:
+        numpy.ndarray: The term's BM25 contribution to each document's score
+    """
+    tf = np.asarray(term_frequencies, dtype=np.float64)
+    lengths = np.asarray(document_lengths, dtype=np.float64)
+    norm = k1 * (1 - b + b * lengths / max(average_length, 1e-9))
+    return idf * tf * (k1 + 1) / (tf + norm)
+
+# A sentence ends at . ! or ? (optionally followed by a closing quote or
+# bracket), then whitespace and an uppercase letter, digit or opening quote;
+# initials like "E. Robertson" are rejoined by split_sentences
+SENTENCE_BOUNDARY = re.compile(r'(?:(?<=[.!?])|(?<=[.!?]["\')\]]))\s+(?=[A-Z0-9"\'(])')
+
+def split_sentences(text):
+    """
+    Split prose into sentences
+    """
+    sentences = []
+    for part in SENTENCE_BOUNDARY.split(" ".join(text.split())):
+        # "Stephen E. Robertson" and "U.S." shouldn't end a sentence
+        if sentences and re.search(r'(\b[A-Z]|\b[A-Z]\.[A-Z])\.$', sentences[-1]):
+            sentences[-1] += " " + part
+        else:
+            sentences.append(part)
+    return [sentence for sentence in sentences if sentence]
@@ -0,0 +1,284 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from riley.learning.cache_paths import default_cache_path
+
+# Search results go stale after SEARCH_TTL seconds but are still served
+# for STALE_TTL more while a background refresh runs
+SEARCH_TTL = float(os.getenv('WIKIPEDIA_CACHE_SEARCH_TTL', 3600))
+STALE_TTL = float(os.getenv('WIKIPEDIA_CACHE_STALE_TTL', 86400))
+
+# Extracts and summaries are keyed by revision id, so they never go stale;
+# they're only dropped when a newer revision is seen or after CONTENT_TTL
+CONTENT_TTL = float(os.getenv('WIKIPEDIA_CACHE_CONTENT_TTL', 30 * 86400))
+
+# Remove expired rows from the persistent tier every N writes
+PRUNE_EVERY = 500
+
+class WikiCache:
+    def __init__(self, db_path=None, memory_size=None, refresh_workers=2):
+        """
+        Initialize a two-tier cache for Wikipedia data
+
+        Entries live in an in-process LRU backed by a SQLite table, so they
+        survive restarts and are shared between worker processes. Values
+        must be JSON serializable.
+
+        Args:
+            db_path (str): SQLite file for the persistent tier, or "" to
+                keep the cache in memory only (default: WIKIPEDIA_CACHE_DB,
+                else wiki_cache.db in the cache directory). The cache falls
+                back to memory only when the file can't be created.
+            memory_size (int): Entries kept in the in-process LRU
+            refresh_workers (int): Threads used for background revalidation
+        """
+        self.db_path = db_path if db_path is not None else os.getenv('WIKIPEDIA_CACHE_DB', default_cache_path('wiki_cache.db'))
+        self.memory_size = int(memory_size or os.getenv('WIKIPEDIA_CACHE_MEMORY_SIZE', 1024))
+        self.max_age = max(SEARCH_TTL + STALE_TTL, CONTENT_TTL)
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._refresh_pool = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="wiki-cache-refresh")
+        self._writes = 0
+        self._metrics = {
+            "memory_hits": 0,
+            "sqlite_hits": 0,
+            "misses": 0,
+            "stale_served": 0,
+            "refreshes": 0,
+            "refresh_failures": 0,
+            "invalidations": 0
+        }
+
+        if self.db_path:
+            self._init_db()
+
+    def _init_db(self):
+        """
+        Create the cache table, or keep the cache in memory if the file
+        can't be written (e.g. on a read-only filesystem)
+        """
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = self._connect()
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS wiki_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                stored_at REAL
+            )
+            ''')
+            conn.commit()
+            conn.close()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Wikipedia cache kept in memory only, {self.db_path} is not writable: {e}")
+            self.db_path = ""
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get(self, key):
+        """
+        Look up a key in memory, then in SQLite
+
+        Returns:
+            tuple: (value, age in seconds), or None on a miss
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._metrics["memory_hits"] += 1
+
+        if entry is None and self.db_path:
+            try:
+                conn = self._connect()
+                row = conn.execute("SELECT value, stored_at FROM wiki_cache WHERE key = ?", (key,)).fetchone()
+                conn.close()
+            except sqlite3.Error as e:
+                print(f"Error reading Wikipedia cache: {e}")
+                row = None
+
+            if row is not None:
+                entry = (row[0], row[1])
+                with self._lock:
+                    self._metrics["sqlite_hits"] += 1
+                    self._remember(key, entry)
+
+        if entry is None:
+            with self._lock:
+                self._metrics["misses"] += 1
+            return None
+
+        text, stored_at = entry
+        return json.loads(text), time.time() - stored_at
+
+    def set(self, key, value):
+        """
+        Store a value in both tiers
+        """
+        entry = (json.dumps(value), time.time())
+
+        with self._lock:
+            self._remember(key, entry)
+            self._writes += 1
+            prune = self._writes % PRUNE_EVERY == 0
+
+        if self.db_path:
+            try:
+                conn = self._connect()
+                conn.execute("INSERT OR REPLACE INTO wiki_cache (key, value, stored_at) VALUES (?, ?, ?)", (key, entry[0], entry[1]))
+                if prune:
+                    conn.execute("DELETE FROM wiki_cache WHERE stored_at < ?", (time.time() - self.max_age,))
+                conn.commit()
+                conn.close()
+            except sqlite3.Error as e:
+                print(f"Error writing Wikipedia cache: {e}")
+
+    def invalidate_prefix(self, prefix):
+        """
+        Drop every entry whose key starts with prefix
+        """
+        with self._lock:
+            for key in [key for key in self._memory if key.startswith(prefix)]:
+                del self._memory[key]
+            self._metrics["invalidations"] += 1
+
+        if self.db_path:
+            try:
+                # substr comparison avoids escaping LIKE wildcards in titles
+                conn = self._connect()
+                conn.execute("DELETE FROM wiki_cache WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+                conn.commit()
+                conn.close()
+            except sqlite3.Error as e:
+                print(f"Error invalidating Wikipedia cache: {e}")
+
+    def keys(self, prefix):
+        """
+        List the keys in either tier that start with prefix
+        """
+        with self._lock:
+            keys = {key for key in self._memory if key.startswith(prefix)}
+
+        if self.db_path:
+            try:
+                conn = self._connect()
+                keys.update(row[0] for row in conn.execute(
+                    "SELECT key FROM wiki_cache WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+                ))
+                conn.close()
+            except sqlite3.Error as e:
+                print(f"Error listing Wikipedia cache keys: {e}")
+
+        return sorted(keys)
+
+    def get_or_fetch(self, key, fetch, ttl, stale_ttl=0, cacheable=None):
+        """
+        Return a cached value, fetching it when it's missing or too old
+
+        Values older than ttl but within ttl + stale_ttl are returned right
+        away and refreshed on a background thread. Error results (dicts with
+        an "error" key, or values rejected by cacheable) are returned but
+        never stored.
+
+        Args:
+            key (str): Cache key
+            fetch (callable): Produces a fresh value
+            ttl (float): Seconds a value stays fresh
+            stale_ttl (float): Extra seconds a stale value may still be served
+            cacheable (callable): Optional check that a fetched value may be stored
+
+        Returns:
+            tuple: (value, status) where status is "hit", "stale" or "miss"
+        """
+        cached = self.get(key)
+        if cached is not None:
+            value, age = cached
+            if age <= ttl:
+                return value, "hit"
+            if age <= ttl + stale_ttl:
+                with self._lock:
+                    self._metrics["stale_served"] += 1
+                self._refresh_in_background(key, fetch, cacheable)
+                return value, "stale"
+
+        value = fetch()
+        if self._cacheable(value, cacheable):
+            self.set(key, value)
+        return value, "miss"
+
+    def get_metrics(self):
+        """
+        Get hit, miss and revalidation counters
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["memory_entries"] = len(self._memory)
+            metrics["refreshing"] = len(self._refreshing)
+
+        lookups = metrics["memory_hits"] + metrics["sqlite_hits"] + metrics["misses"]
+        metrics["hit_rate"] = (metrics["memory_hits"] + metrics["sqlite_hits"]) / lookups if lookups else None
+        metrics["persistent"] = bool(self.db_path)
+
+        return metrics
+
+    def _refresh_in_background(self, key, fetch, cacheable=None):
+        """
+        Schedule one refresh per key; concurrent stale reads share it
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                value = fetch()
+                if self._cacheable(value, cacheable):
+                    self.set(key, value)
+                    outcome = "refreshes"
+                else:
+                    outcome = "refresh_failures"
+            except Exception as e:
+                print(f"Error refreshing Wikipedia cache: {e}")
+                outcome = "refresh_failures"
+            with self._lock:
+                self._metrics[outcome] += 1
+                self._refreshing.discard(key)
+
+        self._refresh_pool.submit(refresh)
+
+    def _remember(self, key, entry):
+        """
+        Put an entry in the LRU; the caller holds the lock
+        """
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _cacheable(self, value, cacheable=None):
+        if value is None or (isinstance(value, dict) and 'error' in value):
+            return False
+        return cacheable is None or cacheable(value)
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+def get_wiki_cache():
+    """
+    Get the process-wide cache, so every caller shares one LRU
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = WikiCache()
+        return _shared_cache
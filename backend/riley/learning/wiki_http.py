@@ -0,0 +1,249 @@
+import os
+import time
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_API_URL = "https://en.wikipedia.org/w/api.php"
+
+DEFAULT_USER_AGENT = "RileyAI/1.0 (https://github.com/jackel3812/Project-Riley-Vercel) python-requests/" + requests.__version__
+
+# Responses worth retrying: rate limiting and transient upstream failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Wait before retrying a maxlag error that comes without Retry-After, as
+# suggested by https://www.mediawiki.org/wiki/Manual:Maxlag_parameter
+MAXLAG_RETRY_AFTER = 5
+
+class RateLimiter:
+    def __init__(self, rate, burst=None):
+        """
+        Token bucket shared by every thread of a client
+
+        Args:
+            rate (float): Requests allowed per second; 0 disables the limit
+            burst (int): Requests allowed back to back after a quiet spell
+                (default: one second's worth)
+        """
+        self.rate = float(rate)
+        self.burst = float(burst or max(self.rate, 1))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take one token, sleeping until it's available
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Reserve the token now so waiting threads queue up in order
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+        if wait:
+            time.sleep(wait)
+        return wait
+
+class WikiHTTPClient:
+    def __init__(self, base_url=None, connect_timeout=None, read_timeout=None, max_retries=None, pool_size=None, user_agent=None):
+        """
+        Initialize a pooled HTTP client for the MediaWiki API
+
+        One keep-alive session is shared by every call. Each request gets
+        connect/read timeouts and a bounded number of retries with jittered
+        exponential backoff. All requests, retries included, share one
+        global rate limit (WIKIPEDIA_MAX_REQUESTS_PER_SECOND). base_url can
+        point at a local stand-in server for tests and benchmarks.
+        """
+        self.base_url = base_url or os.getenv('WIKIPEDIA_API_URL', DEFAULT_API_URL)
+        self.connect_timeout = float(connect_timeout or os.getenv('WIKIPEDIA_CONNECT_TIMEOUT', 3.05))
+        self.read_timeout = float(read_timeout or os.getenv('WIKIPEDIA_READ_TIMEOUT', 10))
+        self.max_retries = int(max_retries if max_retries is not None else os.getenv('WIKIPEDIA_MAX_RETRIES', 3))
+        self.backoff = float(os.getenv('WIKIPEDIA_RETRY_BACKOFF', 0.5))
+        self.max_backoff = float(os.getenv('WIKIPEDIA_RETRY_MAX_BACKOFF', 8))
+        self.pool_size = int(pool_size or os.getenv('WIKIPEDIA_POOL_SIZE', 10))
+        self.rate_limiter = RateLimiter(float(os.getenv('WIKIPEDIA_MAX_REQUESTS_PER_SECOND', 10)))
+
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, max_retries=0)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.session.headers.update({
+            "User-Agent": user_agent or os.getenv('WIKIPEDIA_USER_AGENT', DEFAULT_USER_AGENT),
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate"
+        })
+
+        self._lock = threading.Lock()
+        self._metrics = {
+            "requests": 0,
+            "attempts": 0,
+            "retries": 0,
+            "failures": 0,
+            "timeouts": 0,
+            "maxlag_retries": 0,
+            "rate_limited": 0,
+            "rate_limit_wait_ms": 0.0,
+            "total_latency_ms": 0.0,
+            "status_codes": {}
+        }
+
+    def get(self, params):
+        """
+        Call the API with the given query parameters
+
+        A "maxlag" error (sent when params include maxlag and the database
+        replicas lag behind) is retried like a 503.
+
+        Args:
+            params (dict): MediaWiki API parameters
+
+        Returns:
+            dict: The decoded JSON response
+
+        Raises:
+            requests.RequestException: When the request still fails after
+                all retries
+        """
+        started = time.perf_counter()
+        self._count("requests")
+
+        attempt = 0
+        while True:
+            self._count("attempts")
+            self._wait_for_rate_limit()
+            try:
+                response = self.session.get(
+                    self.base_url,
+                    params=params,
+                    timeout=(self.connect_timeout, self.read_timeout)
+                )
+                self._count_status(response.status_code)
+
+                if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    self._sleep_before_retry(attempt, response.headers.get('Retry-After'))
+                    attempt += 1
+                    continue
+
+                response.raise_for_status()
+                data = response.json()
+
+                if _is_maxlag(data) and attempt < self.max_retries:
+                    self._count("maxlag_retries")
+                    self._sleep_before_retry(attempt, response.headers.get('Retry-After', MAXLAG_RETRY_AFTER))
+                    attempt += 1
+                    continue
+
+                self._add_latency(started)
+                return data
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if isinstance(e, requests.Timeout):
+                    self._count("timeouts")
+                if attempt < self.max_retries:
+                    self._sleep_before_retry(attempt)
+                    attempt += 1
+                    continue
+                self._count("failures")
+                self._add_latency(started)
+                raise
+            except requests.RequestException:
+                self._count("failures")
+                self._add_latency(started)
+                raise
+
+    def get_metrics(self):
+        """
+        Get request counters and connection pool statistics
+        """
+        with self._lock:
+            metrics = dict(self._metrics, status_codes=dict(self._metrics['status_codes']))
+
+        metrics["mean_latency_ms"] = metrics["total_latency_ms"] / metrics["requests"] if metrics["requests"] else None
+
+        # Per-host pools: connections opened, requests served and idle connections
+        pools = {}
+        pool_manager = self.adapter.poolmanager
+        for key in list(pool_manager.pools.keys()):
+            pool = pool_manager.pools.get(key)
+            if pool is None:
+                continue
+            # The pool queue is pre-filled with None placeholders
+            idle = sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool is not None else 0
+            pools[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+                "idle_connections": idle,
+                "max_size": self.pool_size
+            }
+
+        metrics["base_url"] = self.base_url
+        metrics["max_requests_per_second"] = self.rate_limiter.rate or None
+        metrics["pools"] = pools
+
+        return metrics
+
+    def _sleep_before_retry(self, attempt, retry_after=None):
+        """
+        Wait before the next attempt, honoring Retry-After when it's given
+        """
+        self._count("retries")
+
+        delay = None
+        if retry_after:
+            try:
+                delay = min(float(retry_after), self.max_backoff)
+            except ValueError:
+                delay = None
+
+        if delay is None:
+            # Full jitter keeps concurrent workers from retrying in lockstep
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+        time.sleep(delay)
+
+    def _wait_for_rate_limit(self):
+        waited = self.rate_limiter.acquire()
+        if waited:
+            with self._lock:
+                self._metrics["rate_limited"] += 1
+                self._metrics["rate_limit_wait_ms"] += waited * 1000
+
+    def _count(self, name):
+        with self._lock:
+            self._metrics[name] += 1
+
+    def _count_status(self, status_code):
+        with self._lock:
+            codes = self._metrics["status_codes"]
+            codes[str(status_code)] = codes.get(str(status_code), 0) + 1
+
+    def _add_latency(self, started):
+        with self._lock:
+            self._metrics["total_latency_ms"] += (time.perf_counter() - started) * 1000
+
+def _is_maxlag(data):
+    error = data.get('error') if isinstance(data, dict) else None
+    return isinstance(error, dict) and error.get('code') == 'maxlag'
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+def get_wiki_client():
+    """
+    Get the process-wide client, so every caller shares one connection pool
+    """
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = WikiHTTPClient()
+        return _shared_client
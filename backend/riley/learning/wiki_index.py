@@ -0,0 +1,299 @@
+import os
+import re
+import bz2
+import gzip
+import json
+import time
+import zlib
+import hashlib
+import argparse
+import xml.etree.ElementTree as ET
+from array import array
+from collections import Counter
+import numpy as np
+from riley.learning.text_ranking import tokenize, bm25_idf, bm25_term_scores
+
+INDEX_VERSION = 1
+
+# Term frequencies are stored as uint16
+MAX_TERM_FREQUENCY = 65535
+
+# Intro extracts longer than this are cut at a sentence boundary
+MAX_EXTRACT_LENGTH = 2000
+
+class WikiIndex:
+    def __init__(self, path):
+        """
+        Open an index built by build_index
+
+        Postings, document lengths, stored documents and the title lookup table
+        are memory-mapped, so opening is fast and the OS page cache is shared
+        between processes. Only the term lexicon is read into memory.
+
+        Args:
+            path (str): Index directory
+        """
+        self.path = path
+
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != INDEX_VERSION:
+            raise ValueError(f"Unsupported index version {self.meta.get('version')} in {path}")
+
+        with open(os.path.join(path, 'lexicon.json')) as f:
+            self.lexicon = json.load(f)
+
+        self.document_count = self.meta['documents']
+        self.average_length = self.meta['average_length']
+        self.revision = self.meta['revision']
+
+        self.postings_docs = self._map('postings_docs.u32', np.uint32)
+        self.postings_tf = self._map('postings_tf.u16', np.uint16)
+        self.lengths = self._map('doc_lengths.u32', np.uint32)
+        self.doc_offsets = self._map('doc_offsets.u64', np.uint64)
+        self.title_keys = self._map('title_keys.u64', np.uint64)
+        self.title_ids = self._map('title_ids.u32', np.uint32)
+        self.docs = self._map('docs.bin', np.uint8)
+
+    def _map(self, name, dtype):
+        filename = os.path.join(self.path, name)
+        # np.memmap refuses empty files
+        if os.path.getsize(filename) == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(filename, dtype=dtype, mode='r')
+
+    def search(self, query, limit=5):
+        """
+        Rank documents against a query with BM25
+
+        Returns:
+            list: Up to limit documents with pageid, title, extract and score,
+                best first
+        """
+        doc_parts = []
+        score_parts = []
+        for term in set(tokenize(query)):
+            entry = self.lexicon.get(term)
+            if entry is None:
+                continue
+            offset, document_frequency = entry
+            docs = self.postings_docs[offset:offset + document_frequency]
+            idf = bm25_idf(document_frequency, self.document_count)
+            doc_parts.append(docs)
+            score_parts.append(bm25_term_scores(
+                self.postings_tf[offset:offset + document_frequency],
+                self.lengths[docs],
+                self.average_length,
+                idf
+            ))
+
+        if not doc_parts:
+            return []
+
+        # Sum per-term scores for each candidate document
+        candidates, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+
+        if len(scores) > limit:
+            top = np.argpartition(-scores, limit)[:limit]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind='stable')]
+
+        results = []
+        for position in top:
+            doc_id = int(candidates[position])
+            title, extract = self.get_document(doc_id)
+            results.append({
+                "pageid": doc_id,
+                "title": title,
+                "extract": extract,
+                "score": float(scores[position])
+            })
+        return results
+
+    def get_document(self, doc_id):
+        """
+        Read a document's title and extract
+
+        Returns:
+            tuple: (title, extract)
+        """
+        start, end = int(self.doc_offsets[doc_id]), int(self.doc_offsets[doc_id + 1])
+        title, extract = json.loads(zlib.decompress(self.docs[start:end].tobytes()))
+        return title, extract
+
+    def get_page(self, title):
+        """
+        Look up a document by title, ignoring case
+
+        Returns:
+            dict: pageid, title and extract, or None when the title isn't indexed
+        """
+        key = np.uint64(_title_key(title))
+        position = int(np.searchsorted(self.title_keys, key))
+        while position < len(self.title_keys) and self.title_keys[position] == key:
+            doc_id = int(self.title_ids[position])
+            stored_title, extract = self.get_document(doc_id)
+            if stored_title.casefold() == title.casefold():
+                return {"pageid": doc_id, "title": stored_title, "extract": extract}
+            position += 1
+        return None
+
+def _title_key(title):
+    """
+    64-bit hash of a casefolded title, used for the title lookup table
+    """
+    return int.from_bytes(hashlib.blake2b(title.casefold().encode('utf-8'), digest_size=8).digest(), 'little')
+
+def _open_dump(path):
+    """
+    Open a dump file, decompressing .gz and .bz2 transparently
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    return open(path, 'rb')
+
+def _intro(text):
+    """
+    Take the first paragraph of an article, capped at MAX_EXTRACT_LENGTH
+    """
+    intro = text.strip().split("\n\n", 1)[0].strip()
+    if len(intro) <= MAX_EXTRACT_LENGTH:
+        return intro
+    cut = intro[:MAX_EXTRACT_LENGTH]
+    sentence_end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "))
+    return cut[:sentence_end + 1] if sentence_end > 0 else cut
+
+def read_dump(path):
+    """
+    Yield (title, extract, text) for every article in a dump
+
+    Supports the Wikipedia abstracts dump (enwiki-*-abstract.xml) and JSON
+    lines with "title" and "text" (or "extract"/"abstract") fields, such as
+    WikiExtractor --json output. Either may be gzip or bzip2 compressed.
+    """
+    name = re.sub(r'\.(gz|bz2)$', '', path)
+
+    if name.endswith('.xml'):
+        with _open_dump(path) as f:
+            for _, element in ET.iterparse(f, events=('end',)):
+                if element.tag != 'doc':
+                    continue
+                title = (element.findtext('title') or '').strip()
+                if title.startswith('Wikipedia: '):
+                    title = title[len('Wikipedia: '):]
+                text = (element.findtext('abstract') or '').strip()
+                element.clear()
+                if title and text:
+                    yield title, _intro(text), text
+        return
+
+    with _open_dump(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            article = json.loads(line)
+            title = (article.get('title') or '').strip()
+            text = (article.get('text') or article.get('extract') or article.get('abstract') or '').strip()
+            if title and text:
+                yield title, _intro(text), text
+
+def build_index(dump_path, output_dir):
+    """
+    Build an on-disk BM25 index from a dump
+
+    Article text and titles are indexed; titles and intro extracts are
+    stored zlib-compressed for display and summarization.
+
+    Returns:
+        dict: The index metadata, including build time
+    """
+    started = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+
+    postings = {}
+    lengths = array('I')
+    doc_offsets = array('Q', [0])
+    title_keys = []
+
+    with open(os.path.join(output_dir, 'docs.bin'), 'wb') as docs_file:
+        for doc_id, (title, extract, text) in enumerate(read_dump(dump_path)):
+            terms = Counter(tokenize(title + "\n" + text))
+            for term, frequency in terms.items():
+                entry = postings.get(term)
+                if entry is None:
+                    entry = postings[term] = (array('I'), array('H'))
+                entry[0].append(doc_id)
+                entry[1].append(min(frequency, MAX_TERM_FREQUENCY))
+            lengths.append(sum(terms.values()))
+
+            record = zlib.compress(json.dumps([title, extract]).encode('utf-8'))
+            docs_file.write(record)
+            doc_offsets.append(doc_offsets[-1] + len(record))
+            title_keys.append((_title_key(title), doc_id))
+
+    # Postings are written term by term; the lexicon maps term -> [offset, df]
+    lexicon = {}
+    offset = 0
+    with open(os.path.join(output_dir, 'postings_docs.u32'), 'wb') as docs_out, \
+            open(os.path.join(output_dir, 'postings_tf.u16'), 'wb') as tf_out:
+        for term in sorted(postings):
+            docs, frequencies = postings[term]
+            docs.tofile(docs_out)
+            frequencies.tofile(tf_out)
+            lexicon[term] = [offset, len(docs)]
+            offset += len(docs)
+
+    with open(os.path.join(output_dir, 'lexicon.json'), 'w') as f:
+        json.dump(lexicon, f, separators=(',', ':'))
+
+    with open(os.path.join(output_dir, 'doc_lengths.u32'), 'wb') as f:
+        lengths.tofile(f)
+    with open(os.path.join(output_dir, 'doc_offsets.u64'), 'wb') as f:
+        doc_offsets.tofile(f)
+
+    title_keys.sort()
+    np.array([key for key, _ in title_keys], dtype=np.uint64).tofile(os.path.join(output_dir, 'title_keys.u64'))
+    np.array([doc_id for _, doc_id in title_keys], dtype=np.uint32).tofile(os.path.join(output_dir, 'title_ids.u32'))
+
+    meta = {
+        "version": INDEX_VERSION,
+        "source": os.path.basename(dump_path),
+        "documents": len(lengths),
+        "terms": len(lexicon),
+        "postings": offset,
+        "average_length": sum(lengths) / len(lengths) if lengths else 0.0,
+        # Stands in for a revision id, so cached summaries reset on rebuild
+        "revision": int(time.time()),
+        "build_seconds": time.perf_counter() - started
+    }
+    with open(os.path.join(output_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    return meta
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build or query an offline Wikipedia index")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="Build an index from an abstracts XML or JSON lines dump")
+    build_parser.add_argument('dump')
+    build_parser.add_argument('output_dir')
+
+    search_parser = subparsers.add_parser('search', help="Query an index")
+    search_parser.add_argument('index_dir')
+    search_parser.add_argument('query')
+    search_parser.add_argument('--limit', type=int, default=5)
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        meta = build_index(args.dump, args.output_dir)
+        print(f"Indexed {meta['documents']} documents ({meta['terms']} terms) in {meta['build_seconds']:.2f}s")
+    else:
+        index = WikiIndex(args.index_dir)
+        for result in index.search(args.query, args.limit):
+            print(f"{result['score']:.3f}  {result['title']}")
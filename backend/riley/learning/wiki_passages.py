@@ -0,0 +1,191 @@
+import os
+import re
+from collections import Counter
+import numpy as np
+from riley.learning.text_ranking import tokenize, split_sentences, bm25_idf, bm25_term_scores
+
+# Target size of one chunk; paragraphs are merged up to it and longer
+# paragraphs are split between sentences
+CHUNK_TOKENS = int(os.getenv('WIKIPEDIA_CHUNK_TOKENS', 200))
+
+# Sections that are lists of links or citations rather than prose
+SKIPPED_SECTIONS = frozenset([
+    "references", "external links", "see also", "further reading", "notes",
+    "bibliography", "sources", "citations", "footnotes", "works cited"
+])
+
+# "== History ==" headings, as returned by prop=extracts with exsectionformat=wiki
+HEADING = re.compile(r'^(={2,6})\s*(.+?)\s*\1\s*$', re.MULTILINE)
+
+INTRODUCTION = "Introduction"
+
+def estimate_tokens(text):
+    """
+    Approximate the LLM token count of text (about four characters per token)
+    """
+    return max(1, (len(text) + 3) // 4)
+
+def chunk_article(text, max_tokens=CHUNK_TOKENS):
+    """
+    Split a plain-text article into section- and paragraph-level chunks
+
+    Args:
+        text (str): Article text with "== Heading ==" section markers
+        max_tokens (int): Target chunk size
+
+    Returns:
+        list: Chunks in article order, each with section (a " > " path such
+            as "History > Early life"), text and tokens
+    """
+    chunks = []
+    path = []
+    position = 0
+    sections = [(1, INTRODUCTION, None)]
+
+    for match in HEADING.finditer(text):
+        sections[-1] = sections[-1][:2] + (text[position:match.start()],)
+        sections.append((len(match.group(1)), match.group(2), None))
+        position = match.end()
+    sections[-1] = sections[-1][:2] + (text[position:],)
+
+    for level, heading, body in sections:
+        path = path[:max(level - 2, 0)] + [heading] if level > 1 else [heading]
+        if any(part.casefold() in SKIPPED_SECTIONS for part in path):
+            continue
+
+        section = " > ".join(path)
+        buffer = []
+        buffer_tokens = 0
+        for paragraph in re.split(r'\n\s*\n', body):
+            paragraph = " ".join(paragraph.split())
+            if not paragraph:
+                continue
+            for piece in _split_paragraph(paragraph, max_tokens):
+                tokens = estimate_tokens(piece)
+                if buffer and buffer_tokens + tokens > max_tokens:
+                    chunks.append(_chunk(section, buffer))
+                    buffer, buffer_tokens = [], 0
+                buffer.append(piece)
+                buffer_tokens += tokens
+        if buffer:
+            chunks.append(_chunk(section, buffer))
+
+    return chunks
+
+def _chunk(section, pieces):
+    text = "\n".join(pieces)
+    return {"section": section, "text": text, "tokens": estimate_tokens(text)}
+
+def _split_paragraph(paragraph, max_tokens):
+    """
+    Split a paragraph longer than max_tokens between sentences
+    """
+    if estimate_tokens(paragraph) <= max_tokens:
+        return [paragraph]
+
+    pieces = []
+    current = []
+    for sentence in split_sentences(paragraph):
+        if current and estimate_tokens(" ".join(current + [sentence])) > max_tokens:
+            pieces.append(" ".join(current))
+            current = []
+        current.append(sentence)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+class PassageIndex:
+    def __init__(self, chunks, terms=None):
+        """
+        Index chunks for BM25 scoring against queries
+
+        Each chunk's section heading counts as part of its text.
+
+        Args:
+            chunks (list): Chunks from chunk_article
+            terms (list): Precomputed term counts, one Counter per chunk
+        """
+        self.chunks = chunks
+        self.terms = terms if terms is not None else [
+            Counter(tokenize(chunk['section'] + "\n" + chunk['text'])) for chunk in chunks
+        ]
+        self.lengths = np.array([sum(counts.values()) for counts in self.terms], dtype=np.float64)
+
+    @classmethod
+    def combine(cls, indexes):
+        """
+        Merge indexes without re-tokenizing, e.g. to rank chunks across articles
+        """
+        return cls(
+            [chunk for index in indexes for chunk in index.chunks],
+            [counts for index in indexes for counts in index.terms]
+        )
+
+    def score(self, query):
+        """
+        Score every chunk with BM25, using the chunks as the collection
+
+        Returns:
+            numpy.ndarray: One score per chunk
+        """
+        scores = np.zeros(len(self.chunks))
+        if not self.chunks:
+            return scores
+
+        average_length = max(self.lengths.mean(), 1)
+        for term in set(tokenize(query)):
+            frequencies = np.array([counts[term] for counts in self.terms])
+            document_frequency = np.count_nonzero(frequencies)
+            if document_frequency:
+                idf = bm25_idf(document_frequency, len(self.chunks))
+                scores += bm25_term_scores(frequencies, self.lengths, average_length, idf)
+        return scores
+
+    @property
+    def tokens(self):
+        return sum(chunk['tokens'] for chunk in self.chunks)
+
+def select_passages(index, query, token_budget):
+    """
+    Choose the chunks that best answer a query within a token budget
+
+    Chunks are taken best first, skipping any that no longer fit. The lead
+    chunk, which usually defines the subject, is added when there's room.
+    With no matching chunks the article is taken from the start.
+
+    Args:
+        index (PassageIndex): The article's chunks
+        query (str): The query
+        token_budget (int): Maximum estimated tokens to select
+
+    Returns:
+        list: Indices of the chosen chunks in article order
+    """
+    chunks = index.chunks
+    scores = index.score(query)
+    if not scores.any():
+        order = range(len(chunks))
+    else:
+        order = [position for position in sorted(range(len(chunks)), key=lambda position: (-scores[position], position)) if scores[position] > 0]
+
+    chosen = []
+    used = 0
+    for position in order:
+        if used + chunks[position]['tokens'] <= token_budget:
+            chosen.append(position)
+            used += chunks[position]['tokens']
+
+    if chunks and 0 not in chosen and used + chunks[0]['tokens'] <= token_budget:
+        chosen.append(0)
+
+    # Never come back empty-handed, even if the best chunk overruns the budget
+    if not chosen and chunks:
+        chosen.append(int(np.argmax(scores)))
+
+    return sorted(chosen)
+
+def format_passages(chunks, indices):
+    """
+    Join chosen chunks into summarizer input, labelled with their sections
+    """
+    return "\n\n".join(f"[{chunks[index]['section']}]\n{chunks[index]['text']}" for index in indices)
@@ -0,0 +1,228 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from riley.learning.wiki_http import get_wiki_client
+
+# The API accepts at most 50 titles per request (500 for bots)
+MAX_TITLES_PER_REQUEST = 50
+
+# Seconds a partial batch waits for more titles before it's sent
+BATCH_WAIT = float(os.getenv('WIKIPEDIA_BATCH_WAIT', 0.05))
+
+# Background requests ask the API to refuse work while replicas lag more
+# than this many seconds; see https://www.mediawiki.org/wiki/Manual:Maxlag_parameter
+MAXLAG = int(os.getenv('WIKIPEDIA_MAXLAG', 5))
+
+class WikiPageScheduler:
+    def __init__(self, http_client=None, batch_size=None, workers=None):
+        """
+        Batch page lookups from background jobs into as few requests as possible
+
+        Titles submitted from any thread are queued, de-duplicated and sent
+        up to batch_size per request. Requests carry maxlag and go through
+        the client's global rate limit, so bulk jobs back off when Wikipedia
+        is under load and never crowd out interactive searches.
+
+        Args:
+            http_client (WikiHTTPClient): Client to use (default: the shared one)
+            batch_size (int): Titles per request (default: WIKIPEDIA_BATCH_SIZE, at most 50)
+            workers (int): Requests in flight at once (default: WIKIPEDIA_BATCH_WORKERS);
+                Wikimedia asks for one
+        """
+        self.http = http_client or get_wiki_client()
+        self.batch_size = min(int(batch_size or os.getenv('WIKIPEDIA_BATCH_SIZE', MAX_TITLES_PER_REQUEST)), MAX_TITLES_PER_REQUEST)
+        self.workers = int(workers or os.getenv('WIKIPEDIA_BATCH_WORKERS', 1))
+
+        # Pending title -> futures waiting on it
+        self._pending = OrderedDict()
+        self._condition = threading.Condition()
+        self._threads = []
+
+        self._metrics = {
+            "titles_submitted": 0,
+            "titles_fetched": 0,
+            "titles_missing": 0,
+            "batches": 0,
+            "requests": 0,
+            "failures": 0,
+            "max_batch_size": 0,
+            "max_queue_depth": 0,
+            "batch_sizes": {}
+        }
+
+    def submit(self, title):
+        """
+        Queue a title for the next batch
+
+        Returns:
+            Future: Resolves to the page (title, pageid, revid and intro
+                extract) or None when the page doesn't exist
+        """
+        future = Future()
+        with self._condition:
+            self._start_workers()
+            self._pending.setdefault(title, []).append(future)
+            self._metrics["titles_submitted"] += 1
+            self._metrics["max_queue_depth"] = max(self._metrics["max_queue_depth"], len(self._pending))
+            self._condition.notify()
+        return future
+
+    def fetch(self, titles, timeout=None):
+        """
+        Look up many titles, waiting for every batch
+
+        Returns:
+            dict: Requested title -> page, or None for missing pages
+
+        Raises:
+            Exception: The first batch error, e.g. requests.RequestException
+        """
+        futures = OrderedDict((title, self.submit(title)) for title in titles)
+        return {title: future.result(timeout) for title, future in futures.items()}
+
+    def get_metrics(self):
+        """
+        Get queue depth and batch size statistics
+        """
+        with self._condition:
+            metrics = dict(self._metrics, batch_sizes=dict(self._metrics["batch_sizes"]))
+            metrics["queue_depth"] = len(self._pending)
+
+        metrics["mean_batch_size"] = metrics["titles_fetched"] / metrics["batches"] if metrics["batches"] else None
+        metrics["batch_size_limit"] = self.batch_size
+        metrics["workers"] = self.workers
+        return metrics
+
+    def _start_workers(self):
+        # Called with the condition held
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, name="wiki-batch", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_batch(self):
+        """
+        Wait for titles, giving a partial batch BATCH_WAIT to fill up
+        """
+        with self._condition:
+            while not self._pending:
+                self._condition.wait()
+
+            deadline = time.monotonic() + BATCH_WAIT
+            while len(self._pending) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            batch = OrderedDict()
+            while self._pending and len(batch) < self.batch_size:
+                title, futures = self._pending.popitem(last=False)
+                batch[title] = futures
+
+            size = len(batch)
+            sizes = self._metrics["batch_sizes"]
+            sizes[str(size)] = sizes.get(str(size), 0) + 1
+            self._metrics["batches"] += 1
+            self._metrics["max_batch_size"] = max(self._metrics["max_batch_size"], size)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                pages = self._fetch_batch(list(batch))
+            except Exception as e:
+                print(f"Error fetching Wikipedia batch: {e}")
+                with self._condition:
+                    self._metrics["failures"] += 1
+                for futures in batch.values():
+                    for future in futures:
+                        future.set_exception(e)
+                continue
+
+            with self._condition:
+                self._metrics["titles_fetched"] += len(batch)
+                self._metrics["titles_missing"] += sum(1 for title in batch if pages.get(title) is None)
+            for title, futures in batch.items():
+                for future in futures:
+                    future.set_result(pages.get(title))
+
+    def _fetch_batch(self, titles):
+        """
+        Fetch intro extracts and revisions for up to batch_size titles
+
+        TextExtracts returns at most 20 intro extracts per response, so the
+        request is continued until every page has its extract.
+
+        Returns:
+            dict: Requested title -> page, or None for missing pages
+        """
+        params = {
+            "action": "query",
+            "format": "json",
+            "formatversion": 2,
+            "titles": "|".join(titles),
+            "prop": "extracts|info",
+            "exintro": 1,
+            "explaintext": 1,
+            "exlimit": "max",
+            "redirects": 1,
+            "maxlag": MAXLAG
+        }
+
+        pages = {}
+        aliases = {}
+        continuation = {}
+        while True:
+            data = self.http.get(dict(params, **continuation))
+            with self._condition:
+                self._metrics["requests"] += 1
+            if 'error' in data:
+                raise RuntimeError(f"{data['error'].get('code')}: {data['error'].get('info')}")
+
+            query = data.get('query', {})
+            # Requested titles may be normalized ("albert einstein") and then redirected
+            for mapping in query.get('normalized', []) + query.get('redirects', []):
+                aliases[mapping['from']] = mapping['to']
+
+            for page in query.get('pages', []):
+                stored = pages.setdefault(page['title'], {"title": page['title'], "extract": ""})
+                if page.get('missing') or page.get('invalid'):
+                    stored["missing"] = True
+                    continue
+                stored["pageid"] = page.get('pageid')
+                stored["revid"] = page.get('lastrevid', stored.get('revid'))
+                if page.get('extract'):
+                    stored["extract"] = page['extract']
+
+            if 'continue' not in data:
+                break
+            continuation = data['continue']
+
+        results = {}
+        for title in titles:
+            resolved = title
+            # Follow normalization, then the redirect (at most a couple of hops)
+            for _ in range(3):
+                if resolved not in aliases:
+                    break
+                resolved = aliases[resolved]
+            page = pages.get(resolved)
+            results[title] = None if page is None or page.get('missing') else page
+        return results
+
+_shared_scheduler = None
+_shared_scheduler_lock = threading.Lock()
+
+def get_wiki_scheduler():
+    """
+    Get the process-wide scheduler, so every background job shares its queue
+    """
+    global _shared_scheduler
+    with _shared_scheduler_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = WikiPageScheduler()
+        return _shared_scheduler
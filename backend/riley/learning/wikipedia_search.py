@@ -1,51 +1,200 @@
 import os
 import json
-import requests
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
 from openai import OpenAI
+from riley.learning.wiki_http import get_wiki_client
+from riley.learning.wiki_scheduler import WikiPageScheduler, get_wiki_scheduler
+from riley.learning.wiki_cache import get_wiki_cache, SEARCH_TTL, STALE_TTL, CONTENT_TTL
+from riley.learning.wiki_index import WikiIndex
+from riley.learning.extractive_summarizer import summarize as summarize_extractive, select_sentences
+from riley.learning.text_ranking import split_sentences
+from riley.learning.query_normalizer import QueryNormalizer
+from riley.learning.wiki_passages import PassageIndex, chunk_article, select_passages, format_passages
+
+# "combined" fetches ranked titles and intro extracts in one request,
+# "two_step" searches first and then fetches the top result's extract,
+# "offline" queries a local index built with riley.learning.wiki_index
+FETCH_MODES = ('combined', 'two_step', 'offline')
+
+# "llm" summarizes with OpenAI, "extractive" picks sentences locally, and
+# "auto" uses the LLM unless it would overrun the latency budget
+SUMMARIZERS = ('llm', 'extractive', 'auto')
+
+# Assumed LLM summarization latency until calls have been measured
+LLM_LATENCY_PRIOR_MS = 2500
+
+# Weight of the newest measurement in the LLM latency estimate
+LLM_LATENCY_SMOOTHING = 0.2
+
+# "passages" fetches whole articles and summarizes only their best chunks,
+# "intro" summarizes the intro extract (no extra request per article)
+CONTENT_MODES = ('passages', 'intro')
+
+# Estimated tokens of passages sent to the summarizer for a search, and for
+# all articles together in research mode
+PASSAGE_TOKEN_BUDGET = int(os.getenv('WIKIPEDIA_PASSAGE_TOKEN_BUDGET', 1200))
+RESEARCH_TOKEN_BUDGET = int(os.getenv('WIKIPEDIA_RESEARCH_TOKEN_BUDGET', 2000))
+
+# Chunked articles whose term counts are kept in memory
+PASSAGE_INDEX_CACHE_SIZE = 64
+
+# Research mode: articles fetched and most passages summarized
+RESEARCH_TOP_K = int(os.getenv('WIKIPEDIA_RESEARCH_TOP_K', 3))
+RESEARCH_MAX_PASSAGES = 8
+
+# Passages scoring below this share of the best passage are left out
+PASSAGE_MIN_SCORE_RATIO = 0.25
+
+# _find_results error when the search itself comes back empty
+NO_RESULTS_ERROR = "No Wikipedia results found"
+
+# _summarize_content returns its errors as text; they must not be cached
+SUMMARY_ERROR_PREFIX = "Error summarizing content: "
+
+# Titles waiting to be re-fetched across all refresh requests; titles
+# beyond it are dropped until the queue drains
+MAX_PENDING_REFRESHES = int(os.getenv('WIKIPEDIA_MAX_PENDING_REFRESHES', 10000))
+
+# Length of snippets cut from intro extracts in combined and offline modes
+SNIPPET_LENGTH = 200
 
 class WikipediaSearch:
-    def __init__(self):
+    def __init__(self, http_client=None, cache=None, index=None):
         """
         Initialize the Wikipedia search
+        
+        Args:
+            http_client (WikiHTTPClient): Optional client, e.g. one pointed at
+                a local stand-in server (default: the shared pooled client)
+            cache (WikiCache): Optional cache (default: the shared cache)
+            index (WikiIndex): Optional offline index; when given, or when
+                WIKIPEDIA_INDEX_PATH is set, the web API isn't used
         """
         self.api_key = os.getenv('OPENAI_API_KEY')
         self.client = OpenAI(api_key=self.api_key)
         self.model = os.getenv('RILEY_MODEL', 'gpt-4o')
+        self.http = http_client or get_wiki_client()
+        # Background refreshes share one batching queue per client
+        self.scheduler = WikiPageScheduler(http_client) if http_client else get_wiki_scheduler()
+        self.cache = cache or get_wiki_cache()
+        
+        # Spelling corrections draw on the titles of every cached article
+        self.normalizer = QueryNormalizer(key[len("revision|"):] for key in self.cache.keys("revision|"))
+        
+        index_path = os.getenv('WIKIPEDIA_INDEX_PATH')
+        self.index = index or (WikiIndex(index_path) if index_path else None)
+        self.fetch_mode = 'offline' if self.index else os.getenv('WIKIPEDIA_FETCH_MODE', 'combined')
+        
+        self._fetch_pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv('WIKIPEDIA_FETCH_WORKERS', 5)),
+            thread_name_prefix="wiki-fetch"
+        )
+        
+        # Offline indexes only hold intro extracts
+        self.content_mode = 'intro' if self.index else os.getenv('WIKIPEDIA_CONTENT', 'passages')
+        self._passage_indexes = OrderedDict()
+        self._passage_lock = threading.Lock()
+        
+        self.summarizer = os.getenv('WIKIPEDIA_SUMMARIZER', 'auto')
+        self.latency_budget_ms = float(os.getenv('WIKIPEDIA_LATENCY_BUDGET_MS', 0))
+        self._summary_lock = threading.Lock()
+        self._summary_metrics = {
+            "llm_latency_estimate_ms": LLM_LATENCY_PRIOR_MS,
+            "llm_calls": 0,
+            "llm_failures": 0,
+            "extractive_calls": 0
+        }
+        self._spelling_corrections = 0
+        
+        # Titles queued by queue_refresh and not yet stored
+        self._pending_refreshes = set()
+        self._refresh_lock = threading.Lock()
     
-    def search(self, query):
+    def search(self, query, summarizer=None, latency_budget_ms=None):
         """
         Search Wikipedia for information and summarize the results
+        
+        Search results, extracts and summaries are cached. Extracts and
+        summaries are keyed by the article's revision id, so an edit to the
+        article invalidates them.
+        
+        In passages mode the whole article is fetched once, chunked by
+        section and paragraph, and only the chunks that best match the query
+        (within PASSAGE_TOKEN_BUDGET) are summarized.
+        
+        Args:
+            query (str): The search query
+            summarizer (str): "llm", "extractive" or "auto"
+                (default: WIKIPEDIA_SUMMARIZER)
+            latency_budget_ms (float): Total time allowed for the search in
+                auto mode; 0 means no budget (default: WIKIPEDIA_LATENCY_BUDGET_MS)
         """
+        started = time.perf_counter()
         try:
-            # Search Wikipedia
-            search_results = self._search_wikipedia(query)
+            found, search_status, query_key = self._search_cached(query)
             
-            if not search_results or 'error' in search_results:
-                return {
-                    "error": "No Wikipedia results found",
-                    "query": query
-                }
+            if 'error' in found:
+                return dict(found, query=query)
             
-            # Get the page content for the first result
-            page_content = self._get_wikipedia_content(search_results[0]['title'])
+            title, revid = found['title'], found['revid']
             
-            if not page_content or 'error' in page_content:
+            # Get the page content for the first result
+            page = self._load_page(title, revid)
+            if 'error' in page:
                 return {
                     "error": "Failed to retrieve Wikipedia content",
                     "query": query,
-                    "search_results": search_results
+                    "search_results": found['search_results']
                 }
+            page_content, revid = page['extract'], page['revid']
+            plain_content = page_content
             
-            # Summarize the content
-            summary = self._summarize_content(page_content, query)
+            # Pick the passages worth summarizing
+            if self.content_mode == 'passages':
+                passages = self._passage_index(title, revid, page_content)
+                chosen = select_passages(passages, query_key, PASSAGE_TOKEN_BUDGET)
+                page_content = format_passages(passages.chunks, chosen)
+                plain_content = "\n\n".join(passages.chunks[index]['text'] for index in chosen)
+                content = {
+                    "mode": "passages",
+                    "tokens": sum(passages.chunks[index]['tokens'] for index in chosen),
+                    "article_tokens": passages.tokens,
+                    "sections": [passages.chunks[index]['section'] for index in chosen]
+                }
+            else:
+                content = {"mode": "intro"}
+            
+            # Summarize the content, once per revision and query
+            query_hash = hashlib.sha1(query_key.encode()).hexdigest()
+            summary, summarizer, summary_status = self._summarize(
+                lambda name: f"{self._page_key('summary', title, revid)}{name}|{self.content_mode}|{query_hash}",
+                lambda: self._summarize_content(page_content, query),
+                lambda: summarize_extractive(plain_content, query_key),
+                summarizer or self.summarizer,
+                self.latency_budget_ms if latency_budget_ms is None else float(latency_budget_ms),
+                started
+            )
             
             return {
                 "query": query,
-                "title": search_results[0]['title'],
+                "normalized_query": query_key,
+                "title": title,
+                "revid": revid,
                 "summary": summary,
+                "summarizer": summarizer,
                 "source": "Wikipedia",
-                "search_results": search_results
+                "fetch_mode": found['fetch_mode'],
+                "content": content,
+                "cache": {
+                    "search": search_status,
+                    "summary": summary_status
+                },
+                "search_results": found['search_results']
             }
         except Exception as e:
             print(f"Error in Wikipedia search: {e}")
@@ -54,12 +203,618 @@ class WikipediaSearch:
                 "details": str(e)
             }
     
+    def research(self, query, top_k=None, summarizer=None, latency_budget_ms=None):
+        """
+        Answer a query from several articles with one attributed summary
+        
+        The top_k results' articles are fetched concurrently (cached ones
+        aren't fetched at all), chunked, and re-ranked together against the
+        query with BM25. The best passages, within RESEARCH_TOKEN_BUDGET, go
+        to a single summarization call that cites its sources as [n].
+        
+        Args:
+            query (str): The research query
+            top_k (int): Articles to draw from (default: WIKIPEDIA_RESEARCH_TOP_K)
+            summarizer (str): "llm", "extractive" or "auto"
+            latency_budget_ms (float): Time budget for auto mode
+        """
+        started = time.perf_counter()
+        timings = {}
+        try:
+            found, search_status, query_key = self._search_cached(query)
+            timings["search"] = (time.perf_counter() - started) * 1000
+            
+            if 'error' in found:
+                return dict(found, query=query)
+            
+            # Fetch and chunk the candidate articles in parallel
+            fetch_started = time.perf_counter()
+            candidates = found['search_results'][:top_k or RESEARCH_TOP_K]
+            sources = [
+                dict(source, search_rank=rank)
+                for rank, source in enumerate(self._fetch_pool.map(self._load_source, candidates), 1)
+                if 'error' not in source
+            ]
+            timings["fetch"] = (time.perf_counter() - fetch_started) * 1000
+
+            if not sources:
+                return {
+                    "error": "Failed to retrieve Wikipedia content",
+                    "query": query,
+                    "search_results": found['search_results']
+                }
+            
+            rank_started = time.perf_counter()
+            cited = self._rank_passages(sources, query_key)
+            timings["rank"] = (time.perf_counter() - rank_started) * 1000
+            
+            # One summary per query and set of article revisions
+            fingerprint = hashlib.sha1("|".join(
+                [query_key, self.content_mode]
+                + [f"{source['title']}@{source['revid']}" for source in cited]
+            ).encode()).hexdigest()
+            
+            summarize_started = time.perf_counter()
+            summary, summarizer, summary_status = self._summarize(
+                lambda name: f"research|{fingerprint}|{name}",
+                lambda: self._summarize_sources(cited, query),
+                lambda: self._extract_from_sources(cited, query_key),
+                summarizer or self.summarizer,
+                self.latency_budget_ms if latency_budget_ms is None else float(latency_budget_ms),
+                started
+            )
+            timings["summarize"] = (time.perf_counter() - summarize_started) * 1000
+            timings["total"] = (time.perf_counter() - started) * 1000
+            
+            return {
+                "query": query,
+                "normalized_query": query_key,
+                "mode": "research",
+                "summary": summary,
+                "summarizer": summarizer,
+                "source": "Wikipedia",
+                "fetch_mode": found['fetch_mode'],
+                "cache": {
+                    "search": search_status,
+                    "summary": summary_status
+                },
+                "sources": [
+                    {key: value for key, value in source.items() if key != 'index'}
+                    for source in cited
+                ],
+                "search_results": found['search_results'],
+                "timings_ms": timings
+            }
+        except Exception as e:
+            print(f"Error in Wikipedia research: {e}")
+            return {
+                "error": "Failed to research Wikipedia",
+                "details": str(e)
+            }
+    
+    def queue_refresh(self, titles):
+        """
+        Queue articles to be re-fetched in the background
+        
+        Returns once the titles are queued on the shared scheduler, which
+        fetches them in batches; each article is stored as its batch comes
+        back, and articles edited since they were cached have their
+        extracts, chunks and summaries dropped. Titles already waiting
+        aren't queued again, and at most MAX_PENDING_REFRESHES titles wait
+        at once.
+        
+        Args:
+            titles (list): Article titles
+        
+        Returns:
+            dict: The number of titles requested, queued, already queued
+                and dropped because the queue is full, or an error dict
+        """
+        if self.index:
+            return {
+                "error": "Offline index pages can't be refreshed",
+                "details": "Rebuild the index with riley.learning.wiki_index instead"
+            }
+        
+        titles = list(OrderedDict.fromkeys(title for title in titles if title))
+        queued = []
+        with self._refresh_lock:
+            waiting = sum(1 for title in titles if title in self._pending_refreshes)
+            for title in titles:
+                if title in self._pending_refreshes or len(self._pending_refreshes) >= MAX_PENDING_REFRESHES:
+                    continue
+                self._pending_refreshes.add(title)
+                queued.append(title)
+        
+        for title in queued:
+            self.scheduler.submit(title).add_done_callback(lambda future, title=title: self._store_refreshed(title, future))
+        return {
+            "titles": len(titles),
+            "queued": len(queued),
+            "already_queued": waiting,
+            "dropped": len(titles) - len(queued) - waiting,
+            "status": "queued"
+        }
+    
+    def _store_refreshed(self, title, future):
+        """
+        Store an article fetched for queue_refresh (runs on a scheduler thread)
+        """
+        try:
+            page = future.result()
+            if page is not None:
+                self._store_page(title, page['revid'], page['extract'])
+        except Exception as e:
+            print(f"Error refreshing Wikipedia page {title}: {e}")
+        finally:
+            with self._refresh_lock:
+                self._pending_refreshes.discard(title)
+    
+    def _load_source(self, result):
+        """
+        Load one search result's extract and chunked article for research mode
+        """
+        page = self._load_page(result['title'], result.get('revid', self._UNKNOWN_REVISION))
+        if 'error' in page:
+            return page
+        
+        if self.content_mode == 'passages':
+            index = self._passage_index(result['title'], page['revid'], page['extract'])
+        else:
+            index = PassageIndex(chunk_article(page['extract']))
+        
+        return {
+            "title": result['title'],
+            "pageid": result['pageid'],
+            "revid": page['revid'],
+            "index": index
+        }
+    
+    def _rank_passages(self, sources, query):
+        """
+        Pick the passages that best answer the query across all sources
+        
+        Chunks from every source are scored together with BM25. Ties go to
+        the higher search result, then the earlier chunk. Chunks far below
+        the best score are left out.
+        
+        Returns:
+            list: Sources with at least one selected passage, best first,
+                numbered from 1 with their passages and best score
+        """
+        combined = PassageIndex.combine([source['index'] for source in sources])
+        owners = [position for position, source in enumerate(sources) for _ in source['index'].chunks]
+        scores = combined.score(query)
+        
+        order = sorted(range(len(combined.chunks)), key=lambda index: (-scores[index], owners[index], index))
+        
+        selected = {}
+        used = 0
+        for index in order:
+            chunk = combined.chunks[index]
+            if selected and (
+                len(selected) >= RESEARCH_MAX_PASSAGES
+                or scores[index] < PASSAGE_MIN_SCORE_RATIO * scores[order[0]]
+            ):
+                break
+            if selected and used + chunk['tokens'] > RESEARCH_TOKEN_BUDGET:
+                continue
+            selected[index] = float(scores[index])
+            used += chunk['tokens']
+        
+        cited = {}
+        for index, score in selected.items():
+            owner = owners[index]
+            if owner not in cited:
+                cited[owner] = dict(sources[owner], id=len(cited) + 1, score=score, passages=[])
+            chunk = combined.chunks[index]
+            cited[owner]['passages'].append({"section": chunk['section'], "text": chunk['text']})
+        return list(cited.values())
+    
+    def _summarize_sources(self, cited, query):
+        """
+        Summarize passages from several articles with OpenAI, citing them as [n]
+        """
+        try:
+            system_prompt = f"""
+            You are Riley, an advanced AI specialized in research and summarization.
+            Answer the query "{query}" using only the numbered Wikipedia passages below.
+            
+            Cite the passages you use inline as [n]. If the passages don't answer
+            the query, say so. Provide a concise but comprehensive answer.
+            """
+            
+            content = "\n\n".join(
+                f"[{source['id']}] {source['title']}\n" + "\n".join(
+                    f"({passage['section']}) {passage['text']}" for passage in source['passages']
+                )
+                for source in cited
+            )
+            
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": content}
+                ]
+            )
+            
+            return response.choices[0].message.content
+        except Exception as e:
+            print(f"Error in research summarization: {e}")
+            return f"{SUMMARY_ERROR_PREFIX}{str(e)}"
+    
+    def _extract_from_sources(self, cited, query, max_sentences=4):
+        """
+        Build an extractive answer from the cited passages, tagging each sentence with [n]
+        """
+        sentences = []
+        for source in cited:
+            for passage in source['passages']:
+                sentences.extend((source['id'], sentence) for sentence in split_sentences(passage['text']))
+        
+        selected = select_sentences([sentence for _, sentence in sentences], query, max_sentences)
+        return " ".join(f"{sentences[index][1]} [{sentences[index][0]}]" for index in selected)
+    
+    def _summarize(self, summary_key, summarize_llm, summarize_local, summarizer, latency_budget_ms, started):
+        """
+        Summarize with the requested or automatically chosen summarizer
+        
+        In auto mode a cached LLM summary is always used. Otherwise the LLM
+        runs only if its estimated latency fits in what's left of the budget,
+        and the extractive summary is used if the LLM call fails.
+        
+        Args:
+            summary_key (callable): Maps a summarizer name to its cache key
+            summarize_llm (callable): Produces the LLM summary
+            summarize_local (callable): Produces the extractive summary
+            summarizer (str): "llm", "extractive" or "auto"
+            latency_budget_ms (float): Time budget for auto mode, 0 for none
+            started (float): perf_counter() when the request started
+        
+        Returns:
+            tuple: (summary, summarizer used, cache status)
+        """
+        if summarizer not in SUMMARIZERS:
+            raise ValueError(f"Unknown summarizer {summarizer!r}, expected one of {', '.join(SUMMARIZERS)}")
+        
+        automatic = summarizer == 'auto'
+        if automatic:
+            cached = self.cache.get(summary_key('llm'))
+            if cached is not None:
+                return cached[0], 'llm', "hit"
+            
+            summarizer = 'llm'
+            if latency_budget_ms > 0:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                with self._summary_lock:
+                    estimate_ms = self._summary_metrics["llm_latency_estimate_ms"]
+                if elapsed_ms + estimate_ms > latency_budget_ms:
+                    summarizer = 'extractive'
+        
+        if summarizer == 'llm':
+            summary, status = self.cache.get_or_fetch(
+                summary_key('llm'),
+                lambda: self._timed_llm_summary(summarize_llm),
+                CONTENT_TTL,
+                cacheable=lambda summary: not summary.startswith(SUMMARY_ERROR_PREFIX)
+            )
+            if not (automatic and summary.startswith(SUMMARY_ERROR_PREFIX)):
+                return summary, 'llm', status
+            summarizer = 'extractive'
+        
+        summary, status = self.cache.get_or_fetch(
+            summary_key('extractive'),
+            lambda: self._counted_extractive_summary(summarize_local),
+            CONTENT_TTL
+        )
+        return summary, 'extractive', status
+    
+    def _counted_extractive_summary(self, summarize_local):
+        with self._summary_lock:
+            self._summary_metrics["extractive_calls"] += 1
+        return summarize_local()
+    
+    def _timed_llm_summary(self, summarize_llm):
+        """
+        Summarize with the LLM and update the latency estimate
+        """
+        call_started = time.perf_counter()
+        summary = summarize_llm()
+        elapsed_ms = (time.perf_counter() - call_started) * 1000
+        
+        with self._summary_lock:
+            self._summary_metrics["llm_calls"] += 1
+            if summary.startswith(SUMMARY_ERROR_PREFIX):
+                self._summary_metrics["llm_failures"] += 1
+            else:
+                estimate = self._summary_metrics["llm_latency_estimate_ms"]
+                self._summary_metrics["llm_latency_estimate_ms"] = estimate + LLM_LATENCY_SMOOTHING * (elapsed_ms - estimate)
+        
+        return summary
+    
+    def _search_cached(self, query):
+        """
+        Search under the query's normalized key, serving cached results while they're revalidated
+        
+        "Albert Einstein", " albert  einstein" and "Einstein, Albert" share
+        one key. A spelling-corrected key is searched only when the query as
+        typed finds nothing.
+        
+        Returns:
+            tuple: (search results or an error dict, cache status, the key searched)
+        """
+        scope = self._search_scope()
+        normalized = query_key = self._query_key(query)
+        corrected = self.normalizer.correct(normalized)
+        
+        found, status = self.cache.get_or_fetch(
+            f"search|{scope}|{query_key}", lambda key=query_key: self._find_results(key), SEARCH_TTL, STALE_TTL
+        )
+        
+        if found.get('error') == NO_RESULTS_ERROR and corrected != query_key:
+            query_key = corrected
+            found, status = self.cache.get_or_fetch(
+                f"search|{scope}|{query_key}", lambda key=query_key: self._find_results(key), SEARCH_TTL, STALE_TTL
+            )
+        
+        if query_key != normalized:
+            with self._summary_lock:
+                self._spelling_corrections += 1
+        
+        return found, status, query_key
+    
+    def _find_results(self, query):
+        """
+        Search Wikipedia and cache the top result's extract
+        
+        Returns:
+            dict: fetch_mode, search_results and the top result's title and
+                revid, or an error dict
+        """
+        fetch_mode = self.fetch_mode
+        search_results = None
+        
+        # Air-gapped deployments never fall back to the web API
+        if fetch_mode == 'offline':
+            search_results = self._search_offline(query)
+        
+        # Search and fetch extracts in a single round trip
+        if fetch_mode == 'combined':
+            search_results = self._search_with_extracts(query)
+            if isinstance(search_results, dict):
+                fetch_mode = 'two_step'
+        
+        # Fall back to searching first, then fetching the top result
+        if fetch_mode not in ('combined', 'offline'):
+            fetch_mode = 'two_step'
+            search_results = self._search_wikipedia(query)
+        
+        if not search_results or 'error' in search_results:
+            return {"error": NO_RESULTS_ERROR}
+        
+        title = search_results[0]['title']
+        
+        if fetch_mode in ('combined', 'offline'):
+            page = {"extract": search_results[0]['extract'], "revid": search_results[0]['revid']}
+            # Keep the other extracts too, for research mode and rephrased queries
+            for result in search_results[1:]:
+                self._store_page(result['title'], result['revid'], result.pop('extract'))
+            del search_results[0]['extract']
+        else:
+            page = self._get_wikipedia_page(title)
+        
+        if 'error' in page or not page['extract']:
+            return {
+                "error": "Failed to retrieve Wikipedia content",
+                "search_results": search_results
+            }
+        
+        self._store_page(title, page['revid'], page['extract'])
+        
+        return {
+            "fetch_mode": fetch_mode,
+            "search_results": search_results,
+            "title": title,
+            "revid": page['revid']
+        }
+    
+    # Marks that a page's revision isn't known yet
+    _UNKNOWN_REVISION = object()
+    
+    def _load_page(self, title, revid=_UNKNOWN_REVISION):
+        """
+        Get a page's extract from the cache, fetching it on a miss
+        
+        Without a revid, the most recently seen revision of the title is used.
+        
+        Returns:
+            dict: extract and revid, or an error dict
+        """
+        if revid is self._UNKNOWN_REVISION:
+            cached = self.cache.get(f"revision|{title}")
+            if cached is not None:
+                revid = cached[0]
+        
+        if revid is not self._UNKNOWN_REVISION:
+            cached = self.cache.get(self._page_key("extract", title, revid))
+            if cached is not None:
+                return {"extract": cached[0], "revid": revid}
+        
+        page = self._get_wikipedia_page(title)
+        if 'error' in page or not page['extract']:
+            return {"error": page.get('error', f"{title} has no extract")}
+        
+        self._store_page(title, page['revid'], page['extract'])
+        return page
+    
+    def _passage_index(self, title, revid, extract):
+        """
+        Get the chunked, indexed article, fetching the full text once per revision
+        
+        Chunks are cached with the extracts; term counts are kept in a small
+        in-process LRU. If the full article can't be fetched, the intro
+        extract is chunked instead (and not cached).
+        """
+        key = self._page_key("chunks", title, revid)
+        with self._passage_lock:
+            index = self._passage_indexes.get(key)
+            if index is not None:
+                self._passage_indexes.move_to_end(key)
+                return index
+        
+        cached = self.cache.get(key)
+        if cached is not None:
+            chunks = cached[0]
+        else:
+            article = self._get_wikipedia_article(title)
+            if 'error' in article or not article['text']:
+                return PassageIndex(chunk_article(extract))
+            chunks = chunk_article(article['text'])
+            self.cache.set(key, chunks)
+        
+        index = PassageIndex(chunks)
+        with self._passage_lock:
+            self._passage_indexes[key] = index
+            while len(self._passage_indexes) > PASSAGE_INDEX_CACHE_SIZE:
+                self._passage_indexes.popitem(last=False)
+        return index
+    
+    def _store_page(self, title, revid, extract):
+        """
+        Cache an extract, dropping extracts and summaries of older revisions
+        """
+        revision_key = f"revision|{title}"
+        cached = self.cache.get(revision_key)
+        if cached is not None and cached[0] != revid:
+            self.cache.invalidate_prefix(f"extract|{title}|")
+            self.cache.invalidate_prefix(f"chunks|{title}|")
+            self.cache.invalidate_prefix(f"summary|{title}|")
+        
+        self.cache.set(revision_key, revid)
+        self.cache.set(self._page_key("extract", title, revid), extract)
+        self.normalizer.add_titles([title])
+    
+    def _page_key(self, kind, title, revid):
+        # "|" can't appear in MediaWiki titles, so it safely separates fields
+        return f"{kind}|{title}|{revid}|"
+    
+    def _query_key(self, query):
+        return self.normalizer.normalize(query)
+    
+    def _search_scope(self):
+        # A rebuilt offline index must not serve results cached from the old one
+        if self.index:
+            return f"offline-{self.index.revision}"
+        return self.fetch_mode
+    
+    def get_metrics(self):
+        """
+        Get HTTP and connection pool metrics for Wikipedia calls
+        """
+        with self._summary_lock:
+            summaries = dict(self._summary_metrics)
+            spelling_corrections = self._spelling_corrections
+        with self._refresh_lock:
+            pending_refreshes = len(self._pending_refreshes)
+        
+        return {
+            "http": self.http.get_metrics(),
+            "cache": self.cache.get_metrics(),
+            "scheduler": dict(self.scheduler.get_metrics(), pending_refreshes=pending_refreshes),
+            "query": dict(self.normalizer.get_metrics(), spelling_corrections=spelling_corrections),
+            "summarizer": summaries
+        }
+    
+    def _search_with_extracts(self, query):
+        """
+        Search Wikipedia and fetch intro extracts and revision ids in one request
+        
+        Uses generator=search with prop=extracts|info. Generated pages come
+        back unordered, so they are sorted by their search index.
+        
+        Returns:
+            list: Ranked results with title, snippet, pageid, revid and extract,
+                or an error dict
+        """
+        try:
+            params = {
+                "action": "query",
+                "format": "json",
+                "formatversion": 2,
+                "generator": "search",
+                "gsrsearch": query,
+                "gsrlimit": 5,
+                "prop": "extracts|info",
+                "exintro": 1,
+                "explaintext": 1,
+                "exlimit": "max",
+                "utf8": 1
+            }
+            
+            data = self.http.get(params)
+            
+            if 'error' in data:
+                return {"error": data['error'].get('info', 'MediaWiki API error')}
+            
+            pages = data.get('query', {}).get('pages', [])
+            pages = sorted(pages, key=lambda page: page.get('index', 0))
+            
+            results = []
+            for page in pages:
+                if page.get('missing') or 'extract' not in page:
+                    continue
+                results.append({
+                    "title": page['title'],
+                    "snippet": self._snippet(page['extract']),
+                    "pageid": page['pageid'],
+                    "revid": page.get('lastrevid'),
+                    "extract": page['extract']
+                })
+            return results
+        except Exception as e:
+            print(f"Error searching Wikipedia with extracts: {e}")
+            return {"error": str(e)}
+    
+    def _search_offline(self, query):
+        """
+        Search the local index
+        
+        The index build time stands in for revision ids, so rebuilding the
+        index invalidates cached extracts and summaries.
+        
+        Returns:
+            list: Ranked results in the same shape as _search_with_extracts
+        """
+        try:
+            return [
+                {
+                    "title": document['title'],
+                    "snippet": self._snippet(document['extract']),
+                    "pageid": document['pageid'],
+                    "revid": self.index.revision,
+                    "extract": document['extract']
+                }
+                for document in self.index.search(query, limit=5)
+            ]
+        except Exception as e:
+            print(f"Error searching offline Wikipedia index: {e}")
+            return {"error": str(e)}
+    
+    def _snippet(self, extract):
+        """
+        Cut a search snippet from the start of an intro extract
+        """
+        text = " ".join(extract.split())
+        if len(text) <= SNIPPET_LENGTH:
+            return text
+        return text[:SNIPPET_LENGTH].rsplit(" ", 1)[0] + " ..."
+    
     def _search_wikipedia(self, query):
         """
         Search Wikipedia API for articles related to the query
         """
         try:
-            url = "https://en.wikipedia.org/w/api.php"
             params = {
                 "action": "query",
                 "format": "json",
@@ -69,8 +824,7 @@ class WikipediaSearch:
                 "srlimit": 5
             }
             
-            response = requests.get(url, params=params)
-            data = response.json()
+            data = self.http.get(params)
             
             if 'query' in data and 'search' in data['query']:
                 results = []
@@ -91,31 +845,75 @@ class WikipediaSearch:
         """
         Get the content of a Wikipedia page by title
         """
+        page = self._get_wikipedia_page(title)
+        return page if 'error' in page else page['extract']
+    
+    def _get_wikipedia_page(self, title):
+        """
+        Get the intro extract and latest revision id of a Wikipedia page
+        
+        Returns:
+            dict: extract and revid, or an error dict
+        """
+        if self.index:
+            page = self.index.get_page(title)
+            if page is None:
+                return {"error": f"{title} is not in the offline index"}
+            return {"extract": page['extract'], "revid": self.index.revision}
+        
         try:
-            url = "https://en.wikipedia.org/w/api.php"
             params = {
                 "action": "query",
                 "format": "json",
                 "titles": title,
-                "prop": "extracts",
+                "prop": "extracts|info",
                 "exintro": 1,
                 "explaintext": 1
             }
             
-            response = requests.get(url, params=params)
-            data = response.json()
+            data = self.http.get(params)
             
             pages = data['query']['pages']
             page_id = list(pages.keys())[0]
             
-            if 'extract' in pages[page_id]:
-                return pages[page_id]['extract']
-            else:
-                return ""
+            return {
+                "extract": pages[page_id].get('extract', ""),
+                "revid": pages[page_id].get('lastrevid')
+            }
         except Exception as e:
             print(f"Error getting Wikipedia content: {e}")
             return {"error": str(e)}
     
+    def _get_wikipedia_article(self, title):
+        """
+        Get the full plain text of a Wikipedia page, with "== Heading ==" markers
+        
+        Returns:
+            dict: text and revid, or an error dict
+        """
+        try:
+            params = {
+                "action": "query",
+                "format": "json",
+                "titles": title,
+                "prop": "extracts|info",
+                "explaintext": 1,
+                "exsectionformat": "wiki"
+            }
+            
+            data = self.http.get(params)
+            
+            pages = data['query']['pages']
+            page_id = list(pages.keys())[0]
+            
+            return {
+                "text": pages[page_id].get('extract', ""),
+                "revid": pages[page_id].get('lastrevid')
+            }
+        except Exception as e:
+            print(f"Error getting Wikipedia article: {e}")
+            return {"error": str(e)}
+    
     def _summarize_content(self, content, query):
         """
         Summarize content using OpenAI
@@ -149,4 +947,4 @@ class WikipediaSearch:
             return summary
         except Exception as e:
             print(f"Error in content summarization: {e}")
-            return f"Error summarizing content: {str(e)}"
+            return f"{SUMMARY_ERROR_PREFIX}{str(e)}"
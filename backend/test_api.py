@@ -56,6 +56,52 @@ def test_equation():
     print(json.dumps(response.json(), indent=2))
     print()
 
+def test_equation_batch():
+    """Test the batch equation endpoint"""
+    data = {
+        "user_id": TEST_USER_ID,
+        "equations": ["2*x + 3 = 7", "x**2 - 4 = 0", "x**3 = 8"],
+        "format": "text"
+    }
+    response = requests.post(f"{BASE_URL}/api/equation/batch", json=data, stream=True)
+    print("Equation Batch:", response.status_code)
+    for line in response.iter_lines():
+        if line:
+            print(json.dumps(json.loads(line), indent=2))
+    print()
+
+def test_equation_evaluate():
+    """Test the expression evaluation endpoint"""
+    data = {
+        "user_id": TEST_USER_ID,
+        "expression": "y = x^2 + 1",
+        "grid": {"x": {"start": 0, "stop": 1, "num": 5}}
+    }
+    response = requests.post(f"{BASE_URL}/api/equation/evaluate", json=data)
+    print("Equation Evaluate:", response.status_code)
+    print(json.dumps(response.json(), indent=2))
+    print()
+
+def test_equation_matrix():
+    """Test the linear algebra endpoint"""
+    data = {
+        "user_id": TEST_USER_ID,
+        "operation": "solve",
+        "matrix": "2 1; 1 3",
+        "rhs": [3, 5]
+    }
+    response = requests.post(f"{BASE_URL}/api/equation/matrix", json=data)
+    print("Equation Matrix:", response.status_code)
+    print(json.dumps(response.json(), indent=2))
+    print()
+
+def test_equation_metrics():
+    """Test the equation metrics endpoint"""
+    response = requests.get(f"{BASE_URL}/api/equation/metrics")
+    print("Equation Metrics:", response.status_code)
+    print(json.dumps(response.json(), indent=2))
+    print()
+
 def test_search():
     """Test the search endpoint"""
     data = {
@@ -67,6 +113,83 @@ def test_search():
     print(json.dumps(response.json(), indent=2))
     print()
 
+def test_search_extractive():
+    """Test the search endpoint with the local extractive summarizer"""
+    data = {
+        "user_id": TEST_USER_ID,
+        "query": "alan turing",
+        "summarizer": "extractive"
+    }
+    response = requests.post(f"{BASE_URL}/api/search", json=data)
+    print("Search (extractive):", response.status_code)
+    print(json.dumps(response.json(), indent=2))
+    print()
+
+def test_search_research():
+    """Test the search endpoint in research mode"""
+    data = {
+        "user_id": TEST_USER_ID,
+        "query": "who invented the light bulb",
+        "mode": "research",
+        "top_k": 3
+    }
+    response = requests.post(f"{BASE_URL}/api/search", json=data)
+    print("Search (research):", response.status_code)
+    print(json.dumps(response.json(), indent=2))
+    print()
+
+def test_search_metrics():
+    """Test the search metrics endpoint"""
+    response = requests.get(f"{BASE_URL}/api/search/metrics")
+    print("Search Metrics:", response.status_code)
+    print(json.dumps(response.json(), indent=2))
+    print()
+
+def test_search_refresh():
+    """Test the search refresh endpoint"""
+    data = {
+        "titles": ["Albert Einstein", "Python (programming language)", "Marie Curie"]
+    }
+    response = requests.post(f"{BASE_URL}/api/search/refresh", json=data)
+    print("Search Refresh:", response.status_code)
+    print(json.dumps(response.json(), indent=2))
+    print()
+
+def test_github_job():
+    """Test the background GitHub analysis job endpoints"""
+    data = {
+        "user_id": TEST_USER_ID,
+        "repo_url": "https://github.com/pallets/flask"
+    }
+    response = requests.post(f"{BASE_URL}/api/github/jobs", json=data)
+    print("GitHub Job:", response.status_code)
+    print(json.dumps(response.json(), indent=2))
+    
+    job_id = response.json().get('job_id')
+    if job_id:
+        response = requests.get(f"{BASE_URL}/api/github/jobs/{job_id}/events", stream=True)
+        print("GitHub Job Events:", response.status_code)
+        for line in response.iter_lines():
+            if line.startswith(b"data: "):
+                print(json.dumps(json.loads(line[len(b"data: "):]), indent=2)[:500])
+        
+        response = requests.get(f"{BASE_URL}/api/github/jobs/{job_id}", params={"result": "false"})
+        print("GitHub Job Status:", response.status_code)
+        print(json.dumps(response.json(), indent=2))
+    print()
+
+def test_github_tree():
+    """Test the GitHub tree expansion endpoint"""
+    params = {
+        "repo_url": "https://github.com/pallets/flask",
+        "path": "src",
+        "depth": 2
+    }
+    response = requests.get(f"{BASE_URL}/api/github/tree", params=params)
+    print("GitHub Tree:", response.status_code)
+    print(json.dumps(response.json(), indent=2)[:2000])
+    print()
+
 def test_mode_switch():
     """Test the mode switch endpoint"""
     data = {
@@ -116,7 +239,17 @@ def run_tests():
     test_chat()
     test_invention()
     test_equation()
+    test_equation_batch()
+    test_equation_evaluate()
+    test_equation_matrix()
+    test_equation_metrics()
     test_search()
+    test_search_extractive()
+    test_search_research()
+    test_search_refresh()
+    test_search_metrics()
+    test_github_job()
+    test_github_tree()
     test_mode_switch()
     test_joke()
     test_settings()
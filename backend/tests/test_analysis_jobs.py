@@ -0,0 +1,97 @@
+import time
+import threading
+import pytest
+from riley.learning.analysis_jobs import AnalysisJobQueue, JobQueueFull
+from riley.learning.analysis_store import AnalysisStore
+
+class FakeLearning:
+    """
+    Stands in for GitHubLearning: every ref resolves to one commit, and
+    analyses wait for release
+    """
+    def __init__(self):
+        self.release = threading.Event()
+        self.analyses = []
+
+    def resolve_commit(self, repo_url, ref=None):
+        return repo_url, "c0ffee"
+
+    def analyze_repo(self, repo_url, commit, force=False, progress=None):
+        self.analyses.append((repo_url, commit))
+        progress("walk", "running", None)
+        self.release.wait(5)
+        progress("walk", "done", 1.0)
+        return {"repo_url": repo_url, "commit": commit}
+
+def eventually(check, timeout=5):
+    # Jobs are stored and their callbacks run just after they finish
+    deadline = time.monotonic() + timeout
+    while not check() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return check()
+
+@pytest.fixture
+def learning():
+    learning = FakeLearning()
+    yield learning
+    learning.release.set()
+
+@pytest.fixture
+def jobs(learning, tmp_path):
+    return AnalysisJobQueue(learning, workers=2, queue_limit=2, store=AnalysisStore(str(tmp_path / "jobs.db")))
+
+def test_identical_submissions_share_a_job(jobs, learning):
+    calls = []
+    first = jobs.submit("https://github.com/Owner/Repo.git", on_complete=calls.append)
+    second = jobs.submit("https://github.com/owner/repo", on_complete=calls.append)
+    assert first is second
+    learning.release.set()
+    assert first.wait(5)["commit"] == "c0ffee"
+    assert len(learning.analyses) == 1
+    assert eventually(lambda: len(calls) == 2)
+    assert first.to_dict()["deduplicated"] == 1
+
+def test_refs_resolving_to_one_commit_are_analyzed_once(jobs, learning):
+    branch = jobs.submit("https://github.com/owner/repo", ref="main")
+    tag = jobs.submit("https://github.com/owner/repo", ref="v1")
+    assert branch is not tag
+    learning.release.set()
+    results = [branch.wait(5), tag.wait(5)]
+    assert len(learning.analyses) == 1
+    assert sum(1 for result in results if result.get("cached")) == 1
+
+def test_full_queue_refuses_jobs(jobs):
+    jobs.submit("https://github.com/owner/a")
+    jobs.submit("https://github.com/owner/b")
+    with pytest.raises(JobQueueFull):
+        jobs.submit("https://github.com/owner/c")
+
+def test_events_arrive_in_order_and_end_with_the_final_status(jobs, learning):
+    job = jobs.submit("https://github.com/owner/repo")
+    received = []
+    index = 0
+    while True:
+        events, finished = job.events_after(index, timeout=5)
+        received.extend(events)
+        index += len(events)
+        if any(event["type"] == "stage" and event["stage"] == "walk" for event in events):
+            learning.release.set()
+        if finished:
+            break
+
+    assert [event["seq"] for event in received] == list(range(len(received)))
+    steps = [(event.get("stage"), event["status"]) for event in received]
+    assert steps[0] == (None, "queued")
+    assert steps.index(("queue", "done")) < steps.index((None, "running")) < steps.index(("walk", "running")) < steps.index(("walk", "done"))
+    assert steps[-1] == (None, "completed")
+
+def test_finished_jobs_are_read_back_from_the_store(jobs, learning, tmp_path):
+    job = jobs.submit("https://github.com/owner/repo")
+    learning.release.set()
+    job.wait(5)
+    reopened = AnalysisJobQueue(learning, store=AnalysisStore(str(tmp_path / "jobs.db")))
+    assert eventually(lambda: reopened.get_status(job.id) is not None)
+    stored = reopened.get_status(job.id)
+    assert stored["status"] == "completed"
+    assert [event["seq"] for event in stored["events"]] == list(range(len(stored["events"])))
+    assert "result" not in reopened.get_status(job.id, include_result=False)
@@ -0,0 +1,13 @@
+from riley.learning.code_extractor import extract_javascript
+
+def functions(source):
+    return {function["name"]: function for function in extract_javascript("a.js", source)["functions"]}
+
+def test_export_async_function_is_exported():
+    found = functions("export async function main() {}\nexport default async function run() {}\nasync function hidden() {}")
+    assert [found[name]["exported"] for name in ("main", "run", "hidden")] == [True, True, False]
+    assert all(function["async"] for function in found.values())
+
+def test_expression_bodied_arrow_complexity():
+    found = functions("const f = async (x) => x ?? 1\nconst g = y => y || z;\nconst h = (x) => x\nconst k = () => { return a && b }")
+    assert [found[name]["complexity"] for name in ("f", "g", "h", "k")] == [2, 2, 1, 2]
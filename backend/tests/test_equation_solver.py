@@ -0,0 +1,7 @@
+from jarvis.equation_solver import solve_locally_traced
+
+def test_abs_is_solved_numerically():
+    result, trace = solve_locally_traced("abs(x) = 3")
+    assert result["method"] == "numeric"
+    assert result["roots"] == [-3.0, 3.0]
+    assert trace[-1][0] == "numeric" and trace[-1][2]
@@ -0,0 +1,16 @@
+from riley.learning.line_counter import count_lines
+
+def count(source, language="Python"):
+    return count_lines(source.encode().splitlines(), language)
+
+def test_assigned_multiline_string_is_code():
+    source = 'SQL = """\nselect *\nfrom t\n"""\ndef f():\n    return 1\nx = 2\ny = 3'
+    assert count(source) == (8, 0, 0)
+
+def test_docstrings_are_comments():
+    source = 'def f():\n    """One line."""\n    s = """a\n    b"""\n    """Multi\n    doc\n    """\n    return s'
+    assert count(source) == (4, 4, 0)
+
+def test_c_block_comments():
+    source = "/* a\n * b */ int x; // c\n\n// only\nint y = 1; /* c */ /* d\n e */"
+    assert count(source, "C") == (2, 3, 1)
@@ -0,0 +1,47 @@
+from riley.learning.path_trie import build_path_trie, find_subtree, trim_trie, outline_trie
+
+ENTRIES = [
+    {"path": "README.md", "size": 10},
+    {"path": "src/main/java/App.java", "size": 100},
+    {"path": "src/main/java/util/Strings.java", "size": 50},
+    {"path": "docs/guide.md", "size": 20},
+    {"path": "docs/api/index.md", "size": 5}
+]
+
+def test_single_child_directories_are_merged():
+    root = build_path_trie(ENTRIES)
+    assert (root["files"], root["bytes"]) == (5, 185)
+    assert [child["name"] for child in root["dirs"]] == ["docs", "src/main/java"]
+    assert root["leaves"] == [["README.md", 10]]
+    java = root["dirs"][1]
+    assert (java["files"], java["bytes"]) == (2, 150)
+    assert java["leaves"] == [["App.java", 100]]
+
+def test_lookups_reach_into_merged_directories():
+    root = build_path_trie(ENTRIES)
+    path, node = find_subtree(root, "src/main/java/util")
+    assert path == "src/main/java/util"
+    assert node["leaves"] == [["Strings.java", 50]]
+    # Part of a merged name finds the merged node
+    path, node = find_subtree(root, "src/main")
+    assert path == "src/main/java"
+    assert find_subtree(root, "/docs/api/")[0] == "docs/api"
+    assert find_subtree(root, "lib") is None
+    assert find_subtree(root, "docs/missing") is None
+
+def test_trimming_marks_unexpanded_directories():
+    trimmed = trim_trie(build_path_trie(ENTRIES), depth=1)
+    docs = trimmed["dirs"][0]
+    assert docs == {"name": "docs", "files": 2, "bytes": 25, "truncated": True}
+
+def test_trimming_keeps_within_the_entry_budget():
+    trimmed = trim_trie(build_path_trie(ENTRIES), depth=5, max_entries=2)
+    assert [child["name"] for child in trimmed["dirs"]] == ["docs", "src/main/java"]
+    assert trimmed["leaves"] == []
+    assert trimmed["omitted"] == 1
+    assert all(child["truncated"] for child in trimmed["dirs"])
+
+def test_outline_drops_sizes():
+    outline = outline_trie(trim_trie(build_path_trie(ENTRIES), depth=1))
+    assert outline["leaves"] == ["README.md"]
+    assert "bytes" not in outline and "bytes" not in outline["dirs"][0]
@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+import pytest
+from riley.learning.query_normalizer import QueryNormalizer
+from riley.learning.wiki_cache import WikiCache
+from riley.learning.wikipedia_search import WikipediaSearch, NO_RESULTS_ERROR
+
+def test_spellings_of_a_query_share_a_key():
+    normalizer = QueryNormalizer(["Albert Einstein", "Paris"])
+    keys = {normalizer.normalize(query) for query in ["Albert Einstein", "  albert   EINSTEIN? ", "Einstein, Albert"]}
+    assert keys == {"albert einstein"}
+    assert normalizer.normalize("Paris, Texas") == "paris texas"
+
+def test_unknown_words_are_corrected():
+    normalizer = QueryNormalizer(["Albert Einstein", "Quantum mechanics"])
+    assert normalizer.correct("albert einstien") == "albert einstein"
+    assert normalizer.correct("quantum mechanisc") == "quantum mechanics"
+    # Short words and words with no close match are kept
+    assert normalizer.correct("the zebra") == "the zebra"
+
+@pytest.fixture
+def search(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    search = WikipediaSearch(cache=WikiCache(db_path=""), index=SimpleNamespace(revision=1))
+    search.normalizer.add_titles(["Albert Einstein"])
+    return search
+
+def searched_keys(search, found_keys):
+    calls = []
+
+    def find_results(key):
+        calls.append(key)
+        return {"title": key} if key in found_keys else {"error": NO_RESULTS_ERROR}
+
+    search._find_results = find_results
+    return calls
+
+def test_correction_is_searched_when_the_query_finds_nothing(search):
+    calls = searched_keys(search, {"albert einstein"})
+    found, _, key = search._search_cached("Albert Einstien")
+    assert calls == ["albert einstien", "albert einstein"]
+    assert found == {"title": "albert einstein"} and key == "albert einstein"
+    assert search.get_metrics()["query"]["spelling_corrections"] == 1
+
+def test_correction_is_not_searched_when_the_query_finds_results(search):
+    calls = searched_keys(search, {"albert einstien", "albert einstein"})
+    found, _, key = search._search_cached("Albert Einstien")
+    assert calls == ["albert einstien"]
+    assert key == "albert einstien"
+    assert search.get_metrics()["query"]["spelling_corrections"] == 0
@@ -0,0 +1,38 @@
+import os
+from riley.learning.repo_walker import walk_repo
+
+def write(root, path, text="x"):
+    full = os.path.join(root, *path.split('/'))
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    with open(full, 'w') as f:
+        f.write(text)
+
+def walked(root, **kwargs):
+    return [entry["path"] for entry in walk_repo(str(root), **kwargs)["files"]]
+
+def test_negation_keeps_a_file_an_earlier_pattern_ignored(tmp_path):
+    write(tmp_path, ".gitignore", "*.log\n!keep.log\n")
+    for path in ["a.log", "keep.log", "main.py", "sub/b.log", "sub/keep.log"]:
+        write(tmp_path, path)
+    assert walked(tmp_path) == [".gitignore", "keep.log", "main.py", "sub/keep.log"]
+
+def test_nested_gitignore_can_negate_a_parent_pattern(tmp_path):
+    write(tmp_path, ".gitignore", "*.txt\n")
+    write(tmp_path, "docs/.gitignore", "!notes.txt\n")
+    for path in ["a.txt", "docs/notes.txt", "docs/other.txt"]:
+        write(tmp_path, path)
+    assert walked(tmp_path) == [".gitignore", "docs/.gitignore", "docs/notes.txt"]
+
+def test_files_in_an_ignored_directory_cannot_be_negated(tmp_path):
+    write(tmp_path, ".gitignore", "build/\n!build/keep.js\n")
+    write(tmp_path, "build/keep.js")
+    write(tmp_path, "src/app.js")
+    assert walked(tmp_path) == [".gitignore", "src/app.js"]
+
+def test_skipped_directories_and_large_files(tmp_path):
+    write(tmp_path, "node_modules/pkg/index.js")
+    write(tmp_path, "big.bin", "x" * 2048)
+    write(tmp_path, "small.py")
+    result = walk_repo(str(tmp_path), max_file_bytes=1024)
+    assert [entry["path"] for entry in result["files"]] == ["small.py"]
+    assert result["skipped"]["too_large"] == 1
@@ -0,0 +1,43 @@
+import threading
+import pytest
+from riley.learning.stage_graph import Stage, StageGraph
+
+def test_stages_get_their_requirements_results():
+    graph = StageGraph([
+        Stage("a", lambda results: results["base"] + 1),
+        Stage("b", lambda results: results["a"] * 2, requires=("a",)),
+        Stage("c", lambda results: results["a"] + results["b"], requires=("a", "b"))
+    ])
+    run = graph.run({"base": 1})
+    assert run["results"] == {"a": 2, "b": 4, "c": 6}
+    assert all(stage["status"] == "done" for stage in run["stages"].values())
+
+def test_failure_skips_only_dependents():
+    graph = StageGraph([
+        Stage("boom", lambda results: 1 / 0),
+        Stage("after", lambda results: 1, requires=("boom",)),
+        Stage("other", lambda results: 2)
+    ])
+    stages = graph.run()["stages"]
+    assert [stages[name]["status"] for name in ("boom", "after", "other")] == ["failed", "skipped", "done"]
+
+def test_hanging_stage_does_not_hold_up_the_next_with_one_worker():
+    release = threading.Event()
+    graph = StageGraph([
+        Stage("hang", lambda results: release.wait(5), timeout=0.2),
+        Stage("next", lambda results: "ran", timeout=0.2),
+        Stage("after", lambda results: results["next"], requires=("next",), timeout=0.2)
+    ], workers=1)
+    try:
+        run = graph.run()
+    finally:
+        release.set()
+    assert run["stages"]["hang"]["status"] == "timeout"
+    assert run["stages"]["next"]["status"] == "done"
+    assert run["results"]["after"] == "ran"
+    assert len(run["abandoned"]) == 1
+
+def test_cycles_are_rejected():
+    graph = StageGraph([Stage("a", len, requires=("b",)), Stage("b", len, requires=("a",))])
+    with pytest.raises(ValueError):
+        graph.order()
@@ -0,0 +1,58 @@
+import time
+import threading
+from types import SimpleNamespace
+import pytest
+from riley.learning import wiki_cache
+from riley.learning.wiki_cache import WikiCache
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(wiki_cache, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+def wait_for_refreshes(cache):
+    deadline = time.monotonic() + 5
+    while cache.get_metrics()["refreshing"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+def test_fresh_values_are_hits(clock):
+    cache = WikiCache(db_path="")
+    assert cache.get_or_fetch("k", lambda: 1, ttl=10) == (1, "miss")
+    clock[0] += 5
+    assert cache.get_or_fetch("k", lambda: 2, ttl=10) == (1, "hit")
+
+def test_stale_values_are_served_while_refreshing(clock):
+    cache = WikiCache(db_path="")
+    cache.get_or_fetch("k", lambda: 1, ttl=10, stale_ttl=100)
+    clock[0] += 50
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return 2
+
+    assert cache.get_or_fetch("k", fetch, ttl=10, stale_ttl=100) == (1, "stale")
+    assert cache.get_or_fetch("k", fetch, ttl=10, stale_ttl=100) == (1, "stale")
+    release.set()
+    wait_for_refreshes(cache)
+    assert len(calls) == 1
+    assert cache.get("k")[0] == 2
+
+def test_values_past_the_stale_window_are_fetched(clock):
+    cache = WikiCache(db_path="")
+    cache.get_or_fetch("k", lambda: 1, ttl=10, stale_ttl=100)
+    clock[0] += 200
+    assert cache.get_or_fetch("k", lambda: 2, ttl=10, stale_ttl=100) == (2, "miss")
+
+def test_errors_are_not_stored(clock):
+    cache = WikiCache(db_path="")
+    assert cache.get_or_fetch("k", lambda: {"error": "down"}, ttl=10) == ({"error": "down"}, "miss")
+    assert cache.get("k") is None
+
+def test_persistent_tier_survives_a_new_cache(clock, tmp_path):
+    path = str(tmp_path / "wiki.db")
+    WikiCache(db_path=path).set("k", {"v": 1})
+    assert WikiCache(db_path=path).get("k") == ({"v": 1}, 0.0)
@@ -0,0 +1,26 @@
+import os
+import pytest
+from riley.learning.wiki_index import WikiIndex, build_index
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'fixtures', 'wiki_abstracts.xml')
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    output_dir = str(tmp_path_factory.mktemp("wiki_index"))
+    build_index(FIXTURE, output_dir)
+    return WikiIndex(output_dir)
+
+def test_search_ranks_the_matching_article_first(index):
+    results = index.search("okapi bm25 ranking", limit=3)
+    assert results[0]["title"] == "Okapi BM25"
+    assert len(results) <= 3
+    assert [result["score"] for result in results] == sorted((result["score"] for result in results), reverse=True)
+
+def test_unknown_terms_find_nothing(index):
+    assert index.search("zzzxqv") == []
+
+def test_pages_are_found_by_title_ignoring_case(index):
+    page = index.get_page("alan turing")
+    assert page["title"] == "Alan Turing"
+    assert page["extract"]
+    assert index.get_page("Not an article") is None